@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+自适应并发基准测试脚本
+功能：在本进程启动OpenAI桩服务，分三个阶段（正常 -> 注入429 -> 恢复正常）持续发送LLM请求，
+      记录AIMD并发上限的变化，确认429能到达并发控制并使上限下降、恢复后重新增长
+
+用法:
+  python benchmark_adaptive_concurrency.py [--threads 16] [--phase-seconds 12] [--rate-limit-rate 0.2] [--latency fixed:0.05]
+
+关闭LLM缓存、限流器和熔断器，只观察并发控制本身；不访问真实API。
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from typing import List, Tuple
+sys.path.append('.')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="注入429观察AIMD并发上限的下降和恢复")
+    parser.add_argument("--threads", type=int, default=16, help="并发发送请求的线程数")
+    parser.add_argument("--phase-seconds", type=float, default=12.0, help="每个阶段的持续时间（秒）")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.2, help="注入阶段返回429的请求比例")
+    parser.add_argument("--latency", default="fixed:0.05", help="桩服务延迟分布，格式同 openai_stub_server.py --latency")
+    parser.add_argument("--port", type=int, default=8019, help="桩服务端口")
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    os.environ.update({
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.port}/v1",
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "stub",
+        "LLM_CACHE_ENABLED": "false",
+        "LLM_RATE_LIMIT_ENABLED": "false",
+        "LLM_CIRCUIT_BREAKER_ENABLED": "false",
+        "LLM_USAGE_TRACKING_ENABLED": "false",
+        "LLM_SINGLEFLIGHT_ENABLED": "false",
+        "LLM_ADAPTIVE_CONCURRENCY_ENABLED": "true",
+        "LLM_MAX_RETRIES": "0",
+    })
+
+    from openai_stub_server import StubState, LatencyModel, create_server
+    from utils.openai_client_manager import OpenAIClientManager
+
+    state = StubState(0.0, latency=LatencyModel(args.latency), seed=0)
+    server = create_server("127.0.0.1", args.port, state=state)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    running = True
+    counter = [0]
+    counter_lock = threading.Lock()
+
+    def worker():
+        while running:
+            with counter_lock:
+                counter[0] += 1
+                index = counter[0]
+            try:
+                OpenAIClientManager.chat_completion([{"role": "user", "content": f"ping {index}"}], use_cache=False)
+            except Exception:
+                pass
+
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(args.threads)]
+    for thread in workers:
+        thread.start()
+
+    phases = [("正常", 0.0), ("注入429", args.rate_limit_rate), ("恢复", 0.0)]
+    print(f"{args.threads} 个线程, 每阶段 {args.phase_seconds:.0f}秒, 注入阶段429比例 {args.rate_limit_rate:.0%}")
+    print(f"{'阶段':<8}{'开始上限':>8}{'最低':>6}{'最高':>6}{'结束上限':>8}{'降低次数':>8}{'429次数':>8}")
+    for name, rate in phases:
+        state.rate_limit_rate = rate
+        before = OpenAIClientManager.get_concurrency_stats()
+        injected_before = state.get_stats()['injected_429']
+        samples: List[Tuple[float, int]] = []
+        deadline = time.time() + args.phase_seconds
+        while time.time() < deadline:
+            samples.append((time.time(), OpenAIClientManager.get_concurrency_stats()['limit']))
+            time.sleep(0.1)
+        after = OpenAIClientManager.get_concurrency_stats()
+        limits = [limit for _, limit in samples]
+        print(f"{name:<8}{before['limit']:>10}{min(limits):>8}{max(limits):>8}{after['limit']:>10}"
+              f"{after['decreases'] - before['decreases']:>10}{state.get_stats()['injected_429'] - injected_before:>10}")
+
+    running = False
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+句向量微批处理基准测试脚本
+功能：多个线程同时编码小批量文本，对比各线程直接调用共享模型与经过 EmbeddingBatcher 合并批量编码的吞吐量
+
+用法:
+  python benchmark_embedding_batcher.py [--threads 1,4,8,16] [--requests 50] [--texts-per-request 4] [--max-wait-ms 5]
+
+不经过句向量缓存，测试文本取自固定词表。
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from typing import Callable, List
+sys.path.append('.')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="句向量微批处理吞吐量测试")
+    parser.add_argument("--threads", default="1,4,8,16", help="并发线程数，逗号分隔")
+    parser.add_argument("--requests", type=int, default=50, help="每个线程的请求数")
+    parser.add_argument("--texts-per-request", type=int, default=4, help="每个请求的文本数")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="微批处理最长等待时间（毫秒）")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="微批处理单批最多文本数")
+    return parser.parse_args()
+
+
+def run(encode: Callable[[List[str]], object], threads: int, requests: int, texts_per_request: int,
+        pool: List[str]) -> float:
+    """threads个线程各发出requests个请求，返回每秒编码的文本数"""
+    rng = random.Random(0)
+    workloads = [[rng.sample(pool, texts_per_request) for _ in range(requests)] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(workload):
+        barrier.wait()
+        for texts in workload:
+            encode(texts)
+
+    workers = [threading.Thread(target=worker, args=(workload,)) for workload in workloads]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return threads * requests * texts_per_request / (time.perf_counter() - start)
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+
+    from extraction.vocabulary import VOCABULARY
+    from utils.embedding_batcher import EmbeddingBatcher
+    from utils.sentence_model_manager import SentenceModelManager
+
+    pool = [item for corpus in VOCABULARY.values() for item in corpus]
+    model = SentenceModelManager.get_model()
+
+    def direct(texts: List[str]):
+        return model.encode(texts, convert_to_tensor=False, normalize_embeddings=True)
+
+    batcher = EmbeddingBatcher(direct, args.max_batch_size, args.max_wait_ms)
+    direct(pool[:8])  # 预热
+
+    print(f"每个线程 {args.requests} 个请求, 每个请求 {args.texts_per_request} 条文本, 微批等待 {args.max_wait_ms}ms")
+    print(f"{'线程数':>6}{'直接调用':>14}{'微批处理':>14}{'加速':>8}")
+    for threads in [int(value) for value in args.threads.split(",")]:
+        direct_rate = run(direct, threads, args.requests, args.texts_per_request, pool)
+        batched_rate = run(batcher.encode, threads, args.requests, args.texts_per_request, pool)
+        print(f"{threads:>6}{direct_rate:>11.1f}/s{batched_rate:>11.1f}/s{batched_rate / direct_rate:>7.2f}x")
+
+    stats = batcher.get_stats()
+    print(f"\n微批处理: {stats['requests']} 个请求合并为 {stats['batches']} 批, 平均每批 {stats['avg_batch_requests']:.1f} 个请求")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+标签对齐基准测试脚本
+功能：对比 semantic_resume_match 逐条编码查询（旧实现）与当前实现（词表/别名查表，未命中的每条记录一次批量编码、
+      矩阵运算取最大值）的吞吐量（records/sec），并检查两者输出是否一致（别名命中的结果可能与旧实现不同）
+
+用法:
+  python benchmark_semantic_match.py [--records 200] [--seed 0]
+
+样本为从固定词表随机抽取并加入变体和无关词的合成记录，不调用LLM；两种实现使用相同的预计算词表向量，
+当前实现同时经过句向量缓存（EMBEDDING_CACHE_ENABLED=false 可单独测量批量编码的效果）。
+"""
+
+import argparse
+import copy
+import random
+import sys
+import time
+from typing import Dict, List, Any
+import numpy as np
+sys.path.append('.')
+
+NOISE_WORDS = ["沟通能力", "英语六级", "团队管理", "excel", "项目交付", "linux", "篮球", "敏捷开发"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="标签对齐吞吐量基准测试")
+    parser.add_argument("--records", type=int, default=200, help="简历和职位记录各生成多少条")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    return parser.parse_args()
+
+
+def _variants(rng: random.Random, corpus: List[str], count: int) -> List[str]:
+    """从词表抽取count项，部分改写或替换为无关词"""
+    result = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.2:
+            result.append(rng.choice(NOISE_WORDS))
+        elif roll < 0.4:
+            result.append(rng.choice(corpus).upper() + " 经验")
+        else:
+            result.append(rng.choice(corpus))
+    return result
+
+
+def build_records(count: int, seed: int):
+    """生成合成的简历和职位标签记录（LLM输出格式）"""
+    from extraction.vocabulary import (
+        CATEGORY_CORPUS, MARKET_CORPUS, EDUCATION_CORPUS, VOCABULARY, category_skill_corpus_name, market_field_corpus_name
+    )
+    rng = random.Random(seed)
+    resumes, positions = [], []
+    for _ in range(count):
+        category = rng.choice(CATEGORY_CORPUS)
+        market = rng.choice(MARKET_CORPUS)
+        skills = VOCABULARY[category_skill_corpus_name(category)]
+        fields = VOCABULARY[market_field_corpus_name(market)]
+        resumes.append({
+            "category": category, "category_skills": _variants(rng, skills, rng.randint(1, 6)),
+            "market": market, "market_field": _variants(rng, fields, rng.randint(1, 6)),
+            "education": _variants(rng, EDUCATION_CORPUS, rng.randint(1, 3)),
+            "title": "工程师", "skills": [], "others": []
+        })
+        positions.append({
+            "category": category, "market": market,
+            "market_field": {key: _variants(rng, fields, rng.randint(0, 4)) for key in ("required", "recommended", "exclude")},
+            "education": {key: _variants(rng, EDUCATION_CORPUS, rng.randint(0, 2)) for key in ("required", "recommended", "exclude")},
+            "work_experience": {"required": [], "recommended": [], "exclude": []},
+            "others": {"required": [], "recommended": [], "exclude": []}
+        })
+    return resumes, positions
+
+
+def _match_one(model, corpus_embeddings: np.ndarray, corpus: List[str], item: str):
+    """旧实现：单条编码，与词表逐个求相似度"""
+    query_embedding = model.encode(item, convert_to_tensor=False, normalize_embeddings=True)
+    cos_sim = np.dot(corpus_embeddings, query_embedding)  # shape: [N]
+    top_idx = np.argmax(cos_sim)
+    return corpus[top_idx], cos_sim[top_idx]
+
+
+def _match_list(model, corpus_embeddings: np.ndarray, corpus: List[str], items: List[str]) -> List[str]:
+    tags = set()
+    for item in items:
+        tag, score = _match_one(model, corpus_embeddings, corpus, item)
+        if score > 0.8:
+            tags.add(tag)
+    return list(tags)
+
+
+def legacy_resume_match(model, embeddings, json_content: Dict[str, Any]) -> Dict[str, Any]:
+    """旧版 ResumeProcessor.semantic_resume_match（词表向量已预计算）"""
+    from extraction.resume_processor import lowercase_json
+    from extraction.vocabulary import (
+        CATEGORY_CORPUS, MARKET_CORPUS, EDUCATION_CORPUS, VOCABULARY, category_skill_corpus_name, market_field_corpus_name
+    )
+    json_content = lowercase_json(json_content)
+    json_content['category'] = _match_one(model, embeddings.matrix("category"), CATEGORY_CORPUS, json_content['category'])[0]
+    name = category_skill_corpus_name(json_content['category'])
+    json_content["category_skills"] = _match_list(model, embeddings.matrix(name), VOCABULARY[name], json_content["category_skills"])
+    json_content['market'] = _match_one(model, embeddings.matrix("market"), MARKET_CORPUS, json_content['market'])[0]
+    name = market_field_corpus_name(json_content['market'])
+    json_content["market_field"] = _match_list(model, embeddings.matrix(name), VOCABULARY[name], json_content["market_field"])
+    json_content["education"] = _match_list(model, embeddings.matrix("education"), EDUCATION_CORPUS, json_content["education"])
+    return json_content
+
+
+def legacy_position_match(model, embeddings, json_content: Dict[str, Any]) -> Dict[str, Any]:
+    """旧版 PositionProcessor.semantic_resume_match（词表向量已预计算）"""
+    from extraction.position_processor import lowercase_json
+    from extraction.vocabulary import CATEGORY_CORPUS, MARKET_CORPUS, EDUCATION_CORPUS, VOCABULARY, market_field_corpus_name
+    json_content = lowercase_json(json_content)
+    json_content['category'] = _match_one(model, embeddings.matrix("category"), CATEGORY_CORPUS, json_content['category'])[0]
+    json_content['market'] = _match_one(model, embeddings.matrix("market"), MARKET_CORPUS, json_content['market'])[0]
+    name = market_field_corpus_name(json_content['market'])
+    for item in json_content["market_field"]:
+        json_content["market_field"][item] = _match_list(model, embeddings.matrix(name), VOCABULARY[name],
+                                                         json_content["market_field"][item])
+    for item in json_content["education"]:
+        json_content["education"][item] = _match_list(model, embeddings.matrix("education"), EDUCATION_CORPUS,
+                                                      json_content["education"][item])
+    return json_content
+
+
+def _normalize(value: Any) -> Any:
+    """比较输出时忽略标签列表顺序"""
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return sorted(value)
+    return value
+
+
+def run(label: str, fn, records: List[Dict[str, Any]]):
+    fn(copy.deepcopy(records[0]))  # 预热
+    inputs = copy.deepcopy(records)
+    start = time.perf_counter()
+    outputs = [fn(record) for record in inputs]
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<6} {len(records) / elapsed:>9.1f} records/sec  ({elapsed:.2f}秒)")
+    return outputs
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+
+    from extraction.resume_processor import ResumeProcessor
+    from extraction.position_processor import PositionProcessor
+    from utils.sentence_model_manager import SentenceModelManager
+
+    resume_processor = ResumeProcessor()
+    position_processor = PositionProcessor()
+    model = resume_processor.sentence_model
+    embeddings = resume_processor.vocabulary.corpus_embeddings
+    resumes, positions = build_records(args.records, args.seed)
+
+    for name, records, legacy, current in (
+        ("简历", resumes, lambda record: legacy_resume_match(model, embeddings, record), resume_processor.semantic_resume_match),
+        ("职位", positions, lambda record: legacy_position_match(model, embeddings, record), position_processor.semantic_resume_match),
+    ):
+        queries = sum(len(record["category_skills"]) + len(record["market_field"]) + len(record["education"]) + 2
+                      if name == "简历" else
+                      sum(len(items) for items in record["market_field"].values())
+                      + sum(len(items) for items in record["education"].values()) + 2
+                      for record in records)
+        print(f"=== {name}: {len(records)} 条记录, 平均每条 {queries / len(records):.1f} 个查询 ===")
+        before = run("旧实现", legacy, records)
+        after = run("当前", current, records)
+        mismatched = sum(_normalize(a) != _normalize(b) for a, b in zip(before, after))
+        print(f"  输出不一致: {mismatched} 条")
+
+    path_stats = resume_processor.vocabulary.get_stats()
+    print(f"匹配路径: 词表原词 {path_stats['exact']}, 别名 {path_stats['alias']}, 句向量 {path_stats['embedding']}, "
+          f"句向量未达阈值 {path_stats['rejected']} (查表命中 {path_stats['fast_path_rate']:.1%})")
+    cache_stats = SentenceModelManager.get_cache_stats()
+    if cache_stats:
+        print(f"句向量缓存命中率: {cache_stats['hit_rate']:.1%} (命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+句向量后端对比脚本
+功能：对比全精度PyTorch与int8量化ONNX（onnxruntime）两个后端
+      - 一致性：同一文本两个后端向量的余弦相似度；标签对齐（与固定词表取相似度最高的一项、0.8阈值）结果是否相同
+      - 吞吐量：不同batch大小下每秒编码的文本数
+
+用法:
+  python benchmark_sentence_backends.py [--quantization avx512_vnni] [--repeat 3]
+
+测试文本为固定词表和常见技能、学历写法，不访问数据库；ONNX模型尚未导出时先导出到 cache/onnx。
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List
+import numpy as np
+sys.path.append('.')
+
+SAMPLE_TEXTS = [
+    "java", "golang", "python开发", "后端工程师", "前端", "全栈开发工程师", "区块链开发", "solidity智能合约", "运维开发",
+    "产品经理", "市场营销", "商务拓展", "defi协议", "以太坊", "layer2扩容", "零知识证明", "大语言模型", "rag检索增强",
+    "量化交易", "做市商", "订单簿撮合", "本科", "硕士研究生", "985高校", "海外留学", "清华大学", "专科", "ai agent",
+    "负责交易所撮合引擎的设计与开发", "熟悉Spring Boot、Kafka和Redis", "带领团队完成公链节点的性能优化",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="对比PyTorch与int8 ONNX句向量后端的一致性和吞吐量")
+    parser.add_argument("--quantization", help="ONNX量化配置（arm64、avx2、avx512、avx512_vnni），默认使用 SENTENCE_ONNX_QUANTIZATION")
+    parser.add_argument("--repeat", type=int, default=3, help="吞吐量测试重复编码的轮数")
+    return parser.parse_args()
+
+
+def encode(model, texts: List[str], batch_size: int = 32) -> np.ndarray:
+    return np.asarray(model.encode(texts, batch_size=batch_size, convert_to_tensor=False, normalize_embeddings=True))
+
+
+def throughput(model, texts: List[str], batch_size: int, repeat: int) -> float:
+    """每秒编码的文本数"""
+    encode(model, texts[:batch_size], batch_size)  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encode(model, texts, batch_size)
+    return len(texts) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    if args.quantization:
+        os.environ["SENTENCE_ONNX_QUANTIZATION"] = args.quantization
+
+    from config.settings import SENTENCE_ONNX_QUANTIZATION
+    from extraction.vocabulary import VOCABULARY
+    from utils.sentence_model_manager import SentenceModelManager
+
+    print("加载模型...")
+    start = time.perf_counter()
+    torch_model = SentenceModelManager.load_model("torch")
+    print(f"  torch: {time.perf_counter() - start:.1f}秒")
+    start = time.perf_counter()
+    onnx_model = SentenceModelManager.load_model("onnx-int8")
+    print(f"  onnx-int8 ({SENTENCE_ONNX_QUANTIZATION}): {time.perf_counter() - start:.1f}秒")
+
+    # 一致性
+    corpus_texts = [item for corpus in VOCABULARY.values() for item in corpus]
+    texts = SAMPLE_TEXTS + corpus_texts
+    torch_embeddings = encode(torch_model, texts)
+    onnx_embeddings = encode(onnx_model, texts)
+    similarity = np.sum(torch_embeddings * onnx_embeddings, axis=1)
+    print(f"\n=== 一致性（{len(texts)} 条文本） ===")
+    print(f"向量余弦相似度: 平均 {similarity.mean():.4f}, 最小 {similarity.min():.4f}")
+
+    same_top, same_accept, total = 0, 0, 0
+    for name, corpus in VOCABULARY.items():
+        torch_corpus = encode(torch_model, corpus)
+        onnx_corpus = encode(onnx_model, corpus)
+        torch_sim = torch_embeddings[:len(SAMPLE_TEXTS)] @ torch_corpus.T
+        onnx_sim = onnx_embeddings[:len(SAMPLE_TEXTS)] @ onnx_corpus.T
+        torch_top, onnx_top = np.argmax(torch_sim, axis=1), np.argmax(onnx_sim, axis=1)
+        torch_accept = torch_sim.max(axis=1) > 0.8
+        onnx_accept = onnx_sim.max(axis=1) > 0.8
+        same_top += int(np.sum(torch_top == onnx_top))
+        same_accept += int(np.sum((torch_accept == onnx_accept) & (~torch_accept | (torch_top == onnx_top))))
+        total += len(SAMPLE_TEXTS)
+    print(f"词表最相似项相同: {same_top / total:.1%}")
+    print(f"标签对齐结果相同（含0.8阈值）: {same_accept / total:.1%}")
+
+    # 吞吐量
+    print(f"\n=== 吞吐量（texts/sec，{len(texts)} 条文本 x {args.repeat} 轮） ===")
+    print(f"{'batch':>6}{'torch':>12}{'onnx-int8':>12}{'加速':>8}")
+    for batch_size in (1, 8, 32):
+        torch_rate = throughput(torch_model, texts, batch_size, args.repeat)
+        onnx_rate = throughput(onnx_model, texts, batch_size, args.repeat)
+        print(f"{batch_size:>6}{torch_rate:>12.1f}{onnx_rate:>12.1f}{onnx_rate / torch_rate:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+词表向量预计算脚本
+功能：用句向量模型对 extraction/vocabulary.py 中的固定词表编码，归一化向量保存为.npy文件，
+      简历和职位标签提取启动时以内存映射方式加载，不再每次处理都重新编码词表
+
+用法:
+  python build_corpus_embeddings.py [--model sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2] [--backend onnx-int8] [--output-dir cache/embeddings]
+
+输出目录为 <output-dir>/<模型名（含后端）>/<词表哈希>/，修改词表或更换模型后重新运行即可，旧目录不再使用。
+"""
+
+import argparse
+import os
+import sys
+sys.path.append('.')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="预计算固定词表的句向量")
+    parser.add_argument("--model", help="句向量模型名，默认使用 SENTENCE_MODEL_NAME")
+    parser.add_argument("--backend", choices=["torch", "onnx-int8"], help="推理后端，默认使用 SENTENCE_MODEL_BACKEND")
+    parser.add_argument("--output-dir", help="输出根目录，默认使用 CORPUS_EMBEDDINGS_DIR")
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    if args.model:
+        os.environ["SENTENCE_MODEL_NAME"] = args.model
+    if args.backend:
+        os.environ["SENTENCE_MODEL_BACKEND"] = args.backend
+    if args.output_dir:
+        os.environ["CORPUS_EMBEDDINGS_DIR"] = args.output_dir
+
+    from config.settings import SENTENCE_EMBEDDING_KEY, CORPUS_EMBEDDINGS_DIR
+    from extraction.corpus_embeddings import build_corpus_embeddings
+    from extraction.vocabulary import VOCABULARY, vocabulary_hash
+
+    print(f"模型: {SENTENCE_EMBEDDING_KEY}")
+    print(f"词表: {len(VOCABULARY)} 个, 共 {sum(len(corpus) for corpus in VOCABULARY.values())} 项, 哈希 {vocabulary_hash()}")
+    output_dir = build_corpus_embeddings(CORPUS_EMBEDDINGS_DIR, SENTENCE_EMBEDDING_KEY)
+    print(f"已生成: {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
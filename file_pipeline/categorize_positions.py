@@ -12,6 +12,9 @@ sys.path.append('.')
 
 from utils.database import DatabaseManager
 from utils.openai_client_manager import OpenAIClientManager
+from utils.rate_limiter import PRIORITY_BACKFILL
+from utils.batch_runner import BatchRequestDeferred, is_collecting
+from utils.usage_tracker import usage_context
 from utils.logger import setup_logger
 
 logger = setup_logger("position_categorizer")
@@ -81,8 +84,9 @@ class PositionCategorizer:
 分类结果:"""
 
             # 调用OpenAI API
-            response = self.openai_manager.get_client().chat.completions.create(
+            category = self.openai_manager.chat_completion(
                 model="gpt-4o-mini",
+                stage="position_categorize",
                 messages=[
                     {"role": "system", "content": "你是一个专业的职位分类专家，能够准确识别和分类各种工作职位。"},
                     {"role": "user", "content": prompt}
@@ -91,7 +95,7 @@ class PositionCategorizer:
                 max_tokens=50
             )
             
-            category = response.choices[0].message.content.strip()
+            category = (category or "").strip()
             
             # 验证返回的类别是否在预定义列表中
             if category not in self.categories:
@@ -101,6 +105,8 @@ class PositionCategorizer:
             logger.info(f"职位 '{position.get('position', 'Unknown')}' 被分类为: {category}")
             return category
             
+        except BatchRequestDeferred:
+            raise
         except Exception as e:
             logger.error(f"LLM分类失败: {e}")
             return "其他"  # 默认分类
@@ -177,8 +183,8 @@ class PositionCategorizer:
             logger.error(f"更新职位分类异常: {e}")
             return False
     
-    def categorize_all_positions(self, limit: Optional[int] = None):
-        """对所有职位进行分类"""
+    def categorize_all_positions(self, limit: Optional[int] = None, batch_mode: bool = False):
+        """对所有职位进行分类，batch_mode为True时通过OpenAI Batch API执行LLM调用"""
         logger.info("开始职位分类任务")
         
         # 1. 确保分类存在
@@ -196,6 +202,24 @@ class PositionCategorizer:
             return
         
         # 3. 处理每个职位
+        if batch_mode:
+            success_count, failed_count = self.openai_manager.run_batch_job(
+                lambda: self._categorize_positions(positions)
+            )
+        else:
+            success_count, failed_count = self._categorize_positions(positions)
+        
+        # 4. 输出最终结果
+        logger.info(f"职位分类任务完成!")
+        logger.info(f"总处理数量: {len(positions)}")
+        logger.info(f"成功数量: {success_count}")
+        logger.info(f"失败数量: {failed_count}")
+        
+        # 5. 显示分类统计
+        self.show_category_statistics()
+    
+    def _categorize_positions(self, positions: List[Dict]):
+        """逐个分类并更新职位，返回(成功数, 失败数)"""
         success_count = 0
         failed_count = 0
         
@@ -207,7 +231,12 @@ class PositionCategorizer:
                 logger.info(f"处理职位 {i}/{len(positions)}: {position_name}")
                 
                 # LLM分类
-                category_name = self.categorize_position_with_llm(position)
+                with usage_context(entity_type="position", entity_id=position_id):
+                    category_name = self.categorize_position_with_llm(position)
+                
+                # 批处理收集阶段只登记请求，不写数据库
+                if is_collecting():
+                    continue
                 
                 # 获取分类ID
                 category_id = self.get_category_id(category_name)
@@ -222,19 +251,14 @@ class PositionCategorizer:
                 if i % 10 == 0:
                     logger.info(f"进度: {i}/{len(positions)}, 成功: {success_count}, 失败: {failed_count}")
                     
+            except BatchRequestDeferred:
+                continue
             except Exception as e:
                 logger.error(f"处理职位失败 {i}: {e}")
                 failed_count += 1
                 continue
         
-        # 4. 输出最终结果
-        logger.info(f"职位分类任务完成!")
-        logger.info(f"总处理数量: {len(positions)}")
-        logger.info(f"成功数量: {success_count}")
-        logger.info(f"失败数量: {failed_count}")
-        
-        # 5. 显示分类统计
-        self.show_category_statistics()
+        return success_count, failed_count
     
     def show_category_statistics(self):
         """显示分类统计信息"""
@@ -267,6 +291,8 @@ def main():
     """主函数"""
     import sys
     
+    # 离线批量任务，让出限流额度给在线pipeline
+    OpenAIClientManager.set_default_priority(PRIORITY_BACKFILL)
     categorizer = PositionCategorizer()
     
     # 检查命令行参数
@@ -276,8 +302,9 @@ def main():
             categorizer.categorize_all_positions(limit=3)
             return
         elif sys.argv[1] == 'all':
-            print("=== 处理所有职位 ===")
-            categorizer.categorize_all_positions()
+            batch_mode = '--batch' in sys.argv[2:]
+            print(f"=== 处理所有职位{'（Batch API模式）' if batch_mode else ''} ===")
+            categorizer.categorize_all_positions(batch_mode=batch_mode)
             return
         elif sys.argv[1] == 'stats':
             print("=== 显示分类统计 ===")
@@ -288,6 +315,7 @@ def main():
     print("用法:")
     print("  python categorize_positions.py test   # 测试模式（处理前3个职位）")
     print("  python categorize_positions.py all    # 处理所有职位")
+    print("  python categorize_positions.py all --batch  # 使用Batch API处理所有职位")
     print("  python categorize_positions.py stats  # 显示分类统计")
     print("")
     print("直接运行测试模式...")
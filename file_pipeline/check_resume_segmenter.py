@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+简历章节切分检查脚本
+功能：用内置的简历样例检查章节标题识别、章节切分和时间区间预提取，
+      样例包含"项目：支付系统"、"学历：本科"这类标签行，它们属于正文，不能被识别为章节标题
+
+用法:
+  python check_resume_segmenter.py
+"""
+
+import sys
+sys.path.append('.')
+
+from modules.resume_pre_extractor import ResumePreExtractor
+from modules.resume_segmenter import ResumeSegmenter
+
+SAMPLE_RESUME = """# 张三
+学历：本科
+联系方式：13800138000
+邮箱：zhangsan@example.com
+
+## 工作经历
+### A公司 高级工程师 2019.07-2022.03
+项目：支付系统
+项目名称：风控
+职责：
+负责支付网关和风控规则引擎开发
+### B公司 架构师 2022.04-至今
+负责交易撮合系统架构
+
+## 项目经历
+### 订单簿撮合引擎
+负责撮合核心模块
+
+## 教育经历
+清华大学 计算机科学 硕士 2016.09-2019.06
+
+专业技能：
+Java、Go、Kafka
+"""
+
+# 行 -> 期望的章节（None表示正文）
+HEADING_CASES = {
+    "## 工作经历": "work",
+    "工作经历：": "work",
+    "**项目经历**": "projects",
+    "教育背景": "education",
+    "专业技能：": "skills",
+    "项目：支付系统": None,
+    "项目名称：风控": None,
+    "学历：本科": None,
+    "联系方式：138 0013 8000": None,
+    "**职责**：负责支付网关": None,
+    "### 项目：支付系统": None,
+    "### B公司 架构师 2022.04-至今": None,
+}
+
+
+def check(name: str, ok: bool, detail: str = "") -> bool:
+    print(f"{'✅' if ok else '❌'} {name}{f': {detail}' if detail else ''}")
+    return ok
+
+
+def main():
+    """主函数"""
+    results = []
+
+    print("1. 章节标题识别")
+    for line, expected in HEADING_CASES.items():
+        actual = ResumeSegmenter.classify_heading(line)
+        results.append(check(f"{line!r} -> {expected}", actual == expected, "" if actual == expected else f"实际为{actual}"))
+
+    print("\n2. 章节切分")
+    sections = ResumeSegmenter().segment(SAMPLE_RESUME) or {}
+    results.append(check("识别到全部章节", set(sections) == {"basic", "work", "projects", "education", "skills"}, str(list(sections))))
+    results.append(check("第二段工作经历在work中", "B公司" in sections.get("work", "")))
+    results.append(check("项目标签行留在work中", "项目：支付系统" in sections.get("work", "")))
+    results.append(check("联系方式在basic中", "13800138000" in sections.get("basic", "")))
+
+    print("\n3. 时间区间预提取")
+    date_ranges = ResumePreExtractor().extract(SAMPLE_RESUME)["date_ranges"]
+    results.append(check("work有2个区间", len(date_ranges.get("work", [])) == 2, str(len(date_ranges.get("work", [])))))
+    results.append(check("education有1个区间", len(date_ranges.get("education", [])) == 1, str(len(date_ranges.get("education", [])))))
+
+    print(f"\n通过 {sum(results)}/{len(results)}")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
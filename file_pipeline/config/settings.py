@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 
@@ -30,10 +31,141 @@ MAX_WORKERS = 3     # 最大并发处理数
 # Supabase配置
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
+DB_REQUEST_TIMEOUT = float(os.getenv("DB_REQUEST_TIMEOUT", "30"))  # 单次数据库请求超时（秒）
 
 # OpenAI配置
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))  # 单次LLM请求超时（秒）
+# LLM请求失败（429、超时、连接错误、5xx）后的重试次数；OpenAI SDK自带重试已关闭，每次重试重新经过限流、并发控制和熔断
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# 单个文件的处理时间预算（秒），OCR、LLM和数据库调用以剩余预算作为超时，0表示不限制
+FILE_DEADLINE_SECONDS = float(os.getenv("FILE_DEADLINE_SECONDS", "600"))
+
+# LLM响应缓存配置
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "false").lower() == "true"  # 调试prompt时跳过缓存读取
+LLM_CACHE_PATH = BASE_DIR / 'cache' / 'llm_cache.sqlite3'
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # 秒
+
+# LLM限流配置
+LLM_RATE_LIMIT_ENABLED = os.getenv("LLM_RATE_LIMIT_ENABLED", "true").lower() == "true"
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+LLM_RATE_LIMIT_SHARED = os.getenv("LLM_RATE_LIMIT_SHARED", "false").lower() == "true"  # 多进程共享限流状态
+LLM_RATE_LIMIT_STATE_PATH = BASE_DIR / 'cache' / 'rate_limit_state.json'
+LLM_BACKFILL_SHARE = float(os.getenv("LLM_BACKFILL_SHARE", "0.5"))  # 回填脚本可使用的突发额度比例
+
+# LLM批处理配置（离线回填任务使用OpenAI Batch API）
+LLM_BATCH_MODE = os.getenv("LLM_BATCH_MODE", "false").lower() == "true"
+LLM_BATCH_DIR = BASE_DIR / 'cache' / 'batches'
+LLM_BATCH_POLL_INTERVAL = int(os.getenv("LLM_BATCH_POLL_INTERVAL", "30"))  # 秒
+LLM_BATCH_MAX_WAIT = int(os.getenv("LLM_BATCH_MAX_WAIT", "7200"))  # 秒，超时后取消batch任务，未完成的请求改为同步调用
+
+# LLM用量记录配置（每次调用的token数、耗时和费用按文件/职位和阶段写入本地SQLite）
+LLM_USAGE_TRACKING_ENABLED = os.getenv("LLM_USAGE_TRACKING_ENABLED", "true").lower() == "true"
+LLM_USAGE_DB_PATH = BASE_DIR / 'cache' / 'llm_usage.sqlite3'
+# 每百万token单价（美元），可用JSON格式的环境变量LLM_MODEL_PRICING覆盖
+LLM_MODEL_PRICING = json.loads(os.getenv("LLM_MODEL_PRICING", json.dumps({
+    "gpt-4.1-nano": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00}
+})))
+
+# LLM自适应并发配置（AIMD：健康时逐步提高并发上限，遇到429/超时减半）
+LLM_ADAPTIVE_CONCURRENCY_ENABLED = os.getenv("LLM_ADAPTIVE_CONCURRENCY_ENABLED", "false").lower() == "true"
+LLM_CONCURRENCY_INITIAL = int(os.getenv("LLM_CONCURRENCY_INITIAL", str(MAX_WORKERS)))
+LLM_CONCURRENCY_MIN = int(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+LLM_CONCURRENCY_MAX = int(os.getenv("LLM_CONCURRENCY_MAX", "16"))
+LLM_CONCURRENCY_LATENCY_TOLERANCE = float(os.getenv("LLM_CONCURRENCY_LATENCY_TOLERANCE", "2.0"))  # 耗时超过基线该倍数时停止增长
+
+# LLM服务熔断：最近LLM_CIRCUIT_WINDOW次请求中故障（429/超时/连接失败/5xx）占比达到阈值时熔断
+LLM_CIRCUIT_BREAKER_ENABLED = os.getenv("LLM_CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+LLM_CIRCUIT_FAILURE_THRESHOLD = float(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "0.5"))
+LLM_CIRCUIT_MIN_CALLS = int(os.getenv("LLM_CIRCUIT_MIN_CALLS", "5"))
+LLM_CIRCUIT_WINDOW = int(os.getenv("LLM_CIRCUIT_WINDOW", "20"))
+LLM_CIRCUIT_OPEN_SECONDS = float(os.getenv("LLM_CIRCUIT_OPEN_SECONDS", "60"))
+
+# 降级模式：熔断期间OCR和文件记录照常，LLM任务存入持久队列，恢复后按限定速率处理
+DEGRADED_MODE_ENABLED = os.getenv("DEGRADED_MODE_ENABLED", "true").lower() == "true"
+DEFERRED_QUEUE_PATH = BASE_DIR / 'cache' / 'deferred_llm.sqlite3'
+DEFERRED_DRAIN_PER_MINUTE = int(os.getenv("DEFERRED_DRAIN_PER_MINUTE", "6"))
+DEFERRED_RETRY_DELAY = float(os.getenv("DEFERRED_RETRY_DELAY", "120"))  # 恢复处理时再次遇到熔断的重试间隔（秒）
+DEFERRED_MAX_ATTEMPTS = int(os.getenv("DEFERRED_MAX_ATTEMPTS", "5"))
+
+# 合并进行中的重复请求（OCR按文件内容摘要，LLM按prompt哈希）
+OCR_SINGLEFLIGHT_ENABLED = os.getenv("OCR_SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+LLM_SINGLEFLIGHT_ENABLED = os.getenv("LLM_SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+
+# LLM对冲请求配置（请求超过同类请求滚动p95耗时仍未返回时发出副本，取先返回的结果）
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))    # 秒，对冲延迟下限
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))  # 样本数不足时不对冲
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.05"))        # 对冲请求占总请求的最大比例
+LLM_HEDGE_BASE_URL = os.getenv("LLM_HEDGE_BASE_URL")                   # 副本发往的备用网关，为空时使用OPENAI_BASE_URL
+
+# LLM流式输出配置（简历解析时边生成边解析字段，标签分析所需字段到齐即提前开始）
+LLM_STREAMING_ENABLED = os.getenv("LLM_STREAMING_ENABLED", "false").lower() == "true"
+
+# Markdown压缩配置（LLM解析前去掉图片、HTML、页眉页脚等）
+MARKDOWN_COMPACTION_ENABLED = os.getenv("MARKDOWN_COMPACTION_ENABLED", "true").lower() == "true"
+MARKDOWN_SECTION_MAX_CHARS = int(os.getenv("MARKDOWN_SECTION_MAX_CHARS", "0"))  # 单个章节最大字符数，0表示不截断（默认，截断会丢失经历内容）
+
+# 简历预提取配置（正则提取邮箱、电话和经历时间区间，邮箱电话不再由LLM生成）
+PRE_EXTRACTION_ENABLED = os.getenv("PRE_EXTRACTION_ENABLED", "true").lower() == "true"
+
+# 长简历分章节并行解析配置（压缩后markdown超过阈值时按章节拆成多个小schema并发解析）
+SECTION_PARSE_ENABLED = os.getenv("SECTION_PARSE_ENABLED", "true").lower() == "true"
+SECTION_PARSE_MIN_CHARS = int(os.getenv("SECTION_PARSE_MIN_CHARS", "6000"))
+SECTION_PARSE_MIN_SECTIONS = int(os.getenv("SECTION_PARSE_MIN_SECTIONS", "3"))  # 识别出的章节数（含基本信息）下限
+
+# 简历解析模型路由：按估算token数、中英文比例和OCR质量选择模型，关闭时统一使用gpt-4o-mini
+LLM_ROUTING_ENABLED = os.getenv("LLM_ROUTING_ENABLED", "false").lower() == "true"
+LLM_ROUTES = json.loads(os.getenv("LLM_ROUTES", json.dumps({
+    "light": {"model": "gpt-4.1-nano", "concurrency": 4},     # 短且OCR质量好的中文简历
+    "standard": {"model": "gpt-4o-mini", "concurrency": 3},
+    "heavy": {"model": "gpt-4o", "concurrency": 2}            # 长简历或OCR质量差
+})))
+LLM_ROUTE_LIGHT_MAX_TOKENS = int(os.getenv("LLM_ROUTE_LIGHT_MAX_TOKENS", "2000"))
+LLM_ROUTE_HEAVY_MIN_TOKENS = int(os.getenv("LLM_ROUTE_HEAVY_MIN_TOKENS", "8000"))
+LLM_ROUTE_LIGHT_MIN_OCR_QUALITY = float(os.getenv("LLM_ROUTE_LIGHT_MIN_OCR_QUALITY", "0.9"))
+LLM_ROUTE_HEAVY_MAX_OCR_QUALITY = float(os.getenv("LLM_ROUTE_HEAVY_MAX_OCR_QUALITY", "0.7"))  # 低于该质量走heavy
+
+# 句向量模型（标签对齐、标签预筛、本地标签分析共用）
+SENTENCE_MODEL_NAME = os.getenv("SENTENCE_MODEL_NAME", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+# 推理后端：torch 全精度PyTorch；onnx-int8 导出为ONNX并做int8动态量化，用onnxruntime在CPU上推理（需安装onnxruntime、optimum）
+SENTENCE_MODEL_BACKEND = os.getenv("SENTENCE_MODEL_BACKEND", "torch").lower()
+SENTENCE_ONNX_QUANTIZATION = os.getenv("SENTENCE_ONNX_QUANTIZATION", "avx512_vnni")  # 量化配置：arm64、avx2、avx512、avx512_vnni
+SENTENCE_ONNX_DIR = BASE_DIR / 'cache' / 'onnx'  # 导出的ONNX模型目录，首次使用时自动导出
+# 服务启动后在后台线程预加载句向量模型和词表向量（模型和torch在首次使用时才导入，不阻塞启动）
+SENTENCE_MODEL_WARMUP = os.getenv("SENTENCE_MODEL_WARMUP", "true").lower() == "true"
+# 句向量的标识（模型名+后端），预计算词表向量和句向量缓存按此区分，不同后端的向量不混用
+SENTENCE_EMBEDDING_KEY = SENTENCE_MODEL_NAME if SENTENCE_MODEL_BACKEND == "torch" else \
+    f"{SENTENCE_MODEL_NAME}@{SENTENCE_MODEL_BACKEND}-{SENTENCE_ONNX_QUANTIZATION}"
+# 短文本句向量LRU缓存（按规范化文本缓存技能、领域、学历等查询的向量），可选持久化到SQLite
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "20000"))
+EMBEDDING_CACHE_PERSIST = os.getenv("EMBEDDING_CACHE_PERSIST", "false").lower() == "true"
+EMBEDDING_CACHE_PATH = BASE_DIR / 'cache' / 'embedding_cache.sqlite3'
+# 句向量微批处理：各线程的编码请求最多等待EMBEDDING_BATCH_MAX_WAIT_MS毫秒合并为一批，由后台线程统一调用模型
+EMBEDDING_BATCHING_ENABLED = os.getenv("EMBEDDING_BATCHING_ENABLED", "true").lower() == "true"
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))  # 单批最多文本数
+# 固定词表的预计算向量目录，由 build_corpus_embeddings.py 生成，按模型名和词表哈希分子目录
+CORPUS_EMBEDDINGS_DIR = Path(os.getenv("CORPUS_EMBEDDINGS_DIR", str(BASE_DIR / 'cache' / 'embeddings')))
+
+# 标签预筛配置（analyze_resume_tags只把相似度最高的候选标签放入prompt）
+TAG_SHORTLIST_ENABLED = os.getenv("TAG_SHORTLIST_ENABLED", "true").lower() == "true"
+TAG_SHORTLIST_TOP_K = int(os.getenv("TAG_SHORTLIST_TOP_K", "15"))  # 每个分类保留的候选标签数
+
+# 标签分析模式：llm 调用LLM选择标签；local 使用句向量相似度，不调用LLM
+TAGGING_MODE = os.getenv("TAGGING_MODE", "llm").lower()
+LOCAL_TAG_THRESHOLD = float(os.getenv("LOCAL_TAG_THRESHOLD", "0.6"))     # 标签相似度阈值
+LOCAL_CATEGORY_MARGIN = float(os.getenv("LOCAL_CATEGORY_MARGIN", "0.0"))  # 判为技术类所需的得分领先量
+LOCAL_MAX_TAGS = int(os.getenv("LOCAL_MAX_TAGS", "5"))
 
 # 文件处理配置
 SUPPORTED_EXTENSIONS = {'.pdf'}
@@ -42,4 +174,5 @@ MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 # 日志配置
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FILE = BASE_DIR / 'logs' / 'pipeline.log'
-LOG_FILE.parent.mkdir(exist_ok=True)
\ No newline at end of file
+LOG_FILE.parent.mkdir(exist_ok=True)
+COMPACTION_STATS_FILE = LOG_FILE.parent / 'markdown_compaction.jsonl'  # 每个文件压缩前后的token统计
\ No newline at end of file
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+本地标签分析评估脚本
+功能：以LLM标签分析结果为参照，评估LocalTagger的一致性和吞吐量，并可网格搜索校准相似度阈值
+
+用法:
+  python evaluate_local_tagger.py [--limit 50] [--no-cache] [--calibrate]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Any
+sys.path.append('.')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="评估本地标签分析与LLM标签分析的一致性")
+    parser.add_argument("--limit", type=int, default=50, help="评估的简历数量")
+    parser.add_argument("--no-cache", action="store_true", help="LLM调用跳过响应缓存，用于测量真实吞吐")
+    parser.add_argument("--calibrate", action="store_true", help="网格搜索tag_threshold和category_margin")
+    return parser.parse_args()
+
+
+def tag_metrics(pairs: List[Dict[str, Any]]) -> Dict[str, float]:
+    """计算分类一致率和标签的precision/recall/F1（以LLM结果为参照）"""
+    category_agree = 0
+    true_positive = 0
+    predicted = 0
+    expected = 0
+    exact = 0
+
+    for pair in pairs:
+        llm_result, local_result = pair["llm"], pair["local"]
+        if local_result and local_result["category"] == llm_result["category"]:
+            category_agree += 1
+        llm_tags = set(llm_result["tags"])
+        local_tags = set(local_result["tags"]) if local_result else set()
+        true_positive += len(llm_tags & local_tags)
+        predicted += len(local_tags)
+        expected += len(llm_tags)
+        if local_result and local_result["category"] == llm_result["category"] and llm_tags == local_tags:
+            exact += 1
+
+    precision = true_positive / predicted if predicted else 0.0
+    recall = true_positive / expected if expected else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    total = len(pairs) or 1
+    return {
+        "category_agreement": category_agree / total,
+        "tag_precision": precision,
+        "tag_recall": recall,
+        "tag_f1": f1,
+        "exact_match": exact / total
+    }
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    if args.no_cache:
+        os.environ["LLM_CACHE_BYPASS"] = "true"
+
+    from utils.database import DatabaseManager
+    from modules.llm_processor import LLMProcessor
+
+    db = DatabaseManager()
+    rows = db.client.table("resume").select("id, raw_json").limit(args.limit).execute().data or []
+    samples = [row for row in rows if isinstance(row.get("raw_json"), dict)]
+    if not samples:
+        print("没有可评估的简历数据")
+        return
+    print(f"=== 评估样本: {len(samples)} 份简历 ===")
+
+    processor = LLMProcessor()
+    processor._load_available_tags()
+    available_tags = processor.available_tags
+    local_tagger = processor.local_tagger
+
+    # 1. LLM标签分析（参照结果）
+    processor.set_tagging_mode("llm")
+    llm_results = {}
+    llm_start = time.time()
+    for row in samples:
+        result = processor.analyze_resume_tags(row["raw_json"])
+        if result:
+            llm_results[row["id"]] = result
+    llm_seconds = max(time.time() - llm_start, 1e-6)
+
+    # 2. 本地标签分析（先预热标签向量，不计入吞吐）
+    local_tagger.tag_embeddings.get_matrix([tag for tags in available_tags.values() for tag in tags])
+    local_results = {}
+    local_scores = {}
+    local_start = time.time()
+    for row in samples:
+        scores = local_tagger.score(row["raw_json"], available_tags)
+        local_scores[row["id"]] = scores
+        local_results[row["id"]] = local_tagger.decide(scores, available_tags) if scores else None
+    local_seconds = max(time.time() - local_start, 1e-6)
+
+    pairs = [
+        {"llm": llm_results[resume_id], "local": local_results.get(resume_id), "scores": local_scores.get(resume_id)}
+        for resume_id in llm_results
+    ]
+    if not pairs:
+        print("LLM标签分析全部失败，无法评估")
+        return
+
+    metrics = tag_metrics(pairs)
+    print("\n=== 一致性（以LLM结果为参照） ===")
+    print(f"分类一致率: {metrics['category_agreement']:.1%}")
+    print(f"标签Precision: {metrics['tag_precision']:.1%}")
+    print(f"标签Recall: {metrics['tag_recall']:.1%}")
+    print(f"标签F1: {metrics['tag_f1']:.1%}")
+    print(f"完全一致: {metrics['exact_match']:.1%}")
+
+    print("\n=== 吞吐量 ===")
+    print(f"LLM: {len(samples) / llm_seconds:.2f} 份/秒 (共{llm_seconds:.1f}秒)")
+    print(f"本地: {len(samples) / local_seconds:.2f} 份/秒 (共{local_seconds:.1f}秒)")
+    print(f"加速比: {llm_seconds / local_seconds:.1f}x")
+
+    if args.calibrate:
+        print("\n=== 阈值校准（按标签F1排序，取前5） ===")
+        grid = []
+        for threshold in [round(0.40 + 0.05 * i, 2) for i in range(9)]:
+            for margin in [-0.05, -0.02, 0.0, 0.02, 0.05]:
+                calibrated = [
+                    {
+                        "llm": pair["llm"],
+                        "local": local_tagger.decide(pair["scores"], available_tags, threshold, margin) if pair["scores"] else None
+                    }
+                    for pair in pairs
+                ]
+                grid.append((tag_metrics(calibrated), threshold, margin))
+
+        grid.sort(key=lambda item: (item[0]["tag_f1"], item[0]["category_agreement"]), reverse=True)
+        for result, threshold, margin in grid[:5]:
+            print(f"LOCAL_TAG_THRESHOLD={threshold} LOCAL_CATEGORY_MARGIN={margin}: "
+                  f"分类一致率 {result['category_agreement']:.1%}, 标签F1 {result['tag_f1']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
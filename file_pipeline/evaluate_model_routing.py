@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+模型路由评估脚本
+功能：对一批OCR得到的markdown简历分别用 standard（当前默认模型）、按路由选择的模型 和 heavy 模型解析，
+      以heavy模型的解析结果为参照，对比各方案的耗时、费用和字段一致率
+
+用法:
+  python evaluate_model_routing.py --input-dir uploads/processing/temp_ocr [--limit 30]
+
+LLM调用始终跳过响应缓存读取，费用取自llm_usage用量记录（关闭用量记录时按token数估算）。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+sys.path.append('.')
+
+RUNS = ("standard", "routed", "heavy")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="评估简历解析模型路由的耗时、费用和准确率")
+    parser.add_argument("--input-dir", required=True, help="markdown简历所在目录（递归查找*.md）")
+    parser.add_argument("--limit", type=int, default=30, help="评估的简历数量")
+    return parser.parse_args()
+
+
+def _norm(value: Any) -> str:
+    return str(value or "").strip().lower()
+
+
+def _set_f1(reference: set, candidate: set) -> float:
+    if not reference and not candidate:
+        return 1.0
+    common = len(reference & candidate)
+    if common == 0:
+        return 0.0
+    precision = common / len(candidate)
+    recall = common / len(reference)
+    return 2 * precision * recall / (precision + recall)
+
+
+def _entries(data: Dict[str, Any], field: str, keys: List[str]) -> set:
+    items = data.get(field)
+    if not isinstance(items, list):
+        return set()
+    return {tuple(_norm(item.get(key)) for key in keys) for item in items if isinstance(item, dict)}
+
+
+def estimate_cost(pricing: Dict[str, Dict[str, float]], model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """关闭用量记录时按token数估算费用（美元）"""
+    price = pricing.get(model, {})
+    return (prompt_tokens * price.get("input", 0.0) + completion_tokens * price.get("output", 0.0)) / 1_000_000
+
+
+def extraction_agreement(reference: Dict[str, Any], candidate: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """按字段计算与参照解析结果的一致率，overall为各字段平均"""
+    if not candidate:
+        return {"basic_info": 0.0, "education": 0.0, "work_experience": 0.0, "projects": 0.0, "skills": 0.0, "overall": 0.0}
+
+    ref_basic = reference.get("basic_info") if isinstance(reference.get("basic_info"), dict) else {}
+    cand_basic = candidate.get("basic_info") if isinstance(candidate.get("basic_info"), dict) else {}
+    basic_keys = ("name", "email", "phone")
+    scores = {
+        "basic_info": sum(_norm(ref_basic.get(key)) == _norm(cand_basic.get(key)) for key in basic_keys) / len(basic_keys),
+        "education": _set_f1(_entries(reference, "education", ["school", "start_date"]),
+                             _entries(candidate, "education", ["school", "start_date"])),
+        "work_experience": _set_f1(_entries(reference, "work_experience", ["company", "start_date"]),
+                                   _entries(candidate, "work_experience", ["company", "start_date"])),
+        "projects": _set_f1(_entries(reference, "projects", ["name"]), _entries(candidate, "projects", ["name"])),
+        "skills": _set_f1({_norm(skill) for skill in reference.get("skills") or [] if isinstance(skill, str)},
+                          {_norm(skill) for skill in candidate.get("skills") or [] if isinstance(skill, str)})
+    }
+    scores["overall"] = sum(scores.values()) / len(scores)
+    return scores
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    os.environ["LLM_CACHE_BYPASS"] = "true"
+
+    from config.settings import (
+        LLM_ROUTES, LLM_ROUTE_LIGHT_MAX_TOKENS, LLM_ROUTE_HEAVY_MIN_TOKENS,
+        LLM_ROUTE_LIGHT_MIN_OCR_QUALITY, LLM_ROUTE_HEAVY_MAX_OCR_QUALITY, LLM_MODEL_PRICING
+    )
+    from modules.llm_processor import LLMProcessor
+    from modules.model_router import ModelRouter
+    from utils.openai_client_manager import OpenAIClientManager
+    from utils.token_counter import count_tokens
+    from utils.usage_tracker import usage_context
+
+    files = sorted(Path(args.input_dir).rglob("*.md"))[:args.limit]
+    samples = [(path, path.read_text(encoding="utf-8", errors="ignore")) for path in files]
+    samples = [(path, text) for path, text in samples if len(text) >= 50]
+    if not samples:
+        print(f"没有可评估的markdown简历: {args.input_dir}")
+        return
+    print(f"=== 评估样本: {len(samples)} 份简历 ===")
+
+    router = ModelRouter(
+        LLM_ROUTES,
+        light_max_tokens=LLM_ROUTE_LIGHT_MAX_TOKENS,
+        heavy_min_tokens=LLM_ROUTE_HEAVY_MIN_TOKENS,
+        light_min_quality=LLM_ROUTE_LIGHT_MIN_OCR_QUALITY,
+        heavy_max_quality=LLM_ROUTE_HEAVY_MAX_OCR_QUALITY
+    )
+    for name in ("standard", "heavy"):
+        if name not in router.routes:
+            print(f"路由配置缺少 {name}，无法评估")
+            return
+    processor = LLMProcessor()
+    tracker = OpenAIClientManager.get_usage_tracker()
+
+    chosen = {path: router.route(text) for path, text in samples}
+    results: Dict[str, Dict[Path, Any]] = {run: {} for run in RUNS}
+    latency: Dict[str, List[float]] = {run: [] for run in RUNS}
+    estimated_cost: Dict[str, float] = {run: 0.0 for run in RUNS}
+    run_start = time.time()
+
+    for run in RUNS:
+        for path, text in samples:
+            route = chosen[path] if run == "routed" else router.routes[run]
+            start = time.time()
+            with usage_context(entity_type="routing_eval", entity_id=f"{run}:{path.name}"):
+                parsed = processor.parse_resume_content(text, route=route)
+            latency[run].append(time.time() - start)
+            results[run][path] = parsed
+            output_tokens = count_tokens(json.dumps(parsed, ensure_ascii=False)) if parsed else 0
+            estimated_cost[run] += estimate_cost(LLM_MODEL_PRICING, route.model, count_tokens(text), output_tokens)
+
+    # 费用优先使用实际用量记录
+    cost = dict(estimated_cost)
+    if tracker is not None:
+        cost = {run: 0.0 for run in RUNS}
+        for item in tracker.entity_report(run_start, entity_type="routing_eval"):
+            cost[item["entity_id"].split(":", 1)[0]] += item["cost_usd"]
+
+    print("\n=== 路由分布 ===")
+    distribution: Dict[str, int] = {}
+    for route in chosen.values():
+        distribution[route.name] = distribution.get(route.name, 0) + 1
+    for name, count in sorted(distribution.items()):
+        print(f"{name} ({router.routes[name].model}): {count} 份")
+
+    references = results["heavy"]
+    print(f"\n=== 对比（以heavy模型 {router.routes['heavy'].model} 的解析结果为参照） ===")
+    print(f"{'方案':<10}{'平均耗时':>10}{'p95耗时':>10}{'总费用($)':>12}{'单份费用($)':>13}"
+          f"{'整体一致率':>11}{'基本信息':>9}{'工作经历':>9}{'教育':>7}{'项目':>7}{'技能':>7}")
+    for run in RUNS:
+        agreements = [extraction_agreement(references[path], results[run][path])
+                      for path, _ in samples if references[path]]
+        if not agreements:
+            print("heavy模型解析全部失败，无法评估一致率")
+            return
+        mean = {key: sum(item[key] for item in agreements) / len(agreements) for key in agreements[0]}
+        ordered = sorted(latency[run])
+        p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+        print(f"{run:<10}{sum(ordered) / len(ordered):>9.2f}s{p95:>9.2f}s{cost[run]:>12.4f}{cost[run] / len(samples):>13.5f}"
+              f"{mean['overall']:>11.1%}{mean['basic_info']:>9.1%}{mean['work_experience']:>9.1%}"
+              f"{mean['education']:>7.1%}{mean['projects']:>7.1%}{mean['skills']:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
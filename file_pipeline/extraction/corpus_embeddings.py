@@ -0,0 +1,121 @@
+import json
+import re
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List
+import numpy as np
+
+from config.settings import SENTENCE_EMBEDDING_KEY, CORPUS_EMBEDDINGS_DIR
+from extraction.vocabulary import VOCABULARY, vocabulary_hash
+from utils.sentence_model_manager import SentenceModelManager
+from utils.logger import setup_logger
+
+logger = setup_logger("corpus_embeddings")
+
+MANIFEST_NAME = "manifest.json"
+
+
+def embeddings_dir(base_dir: Path, model_name: str, vocab_hash: str) -> Path:
+    """向量文件目录：<base_dir>/<模型名（含后端）>/<词表哈希>/"""
+    model_slug = re.sub(r'[^A-Za-z0-9._-]+', '__', model_name)
+    return Path(base_dir) / model_slug / vocab_hash
+
+
+def build_corpus_embeddings(base_dir: Path = CORPUS_EMBEDDINGS_DIR, model_name: str = SENTENCE_EMBEDDING_KEY,
+                            corpora: Dict[str, List[str]] = VOCABULARY) -> Path:
+    """离线计算词表的归一化句向量，每个词表保存为一个.npy文件，返回输出目录"""
+    output_dir = embeddings_dir(base_dir, model_name, vocabulary_hash())
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    model = SentenceModelManager.get_model()
+    manifest = {"model": model_name, "vocabulary_hash": vocabulary_hash(), "created_at": time.time(), "corpora": {}}
+    for name, corpus in corpora.items():
+        embeddings = np.asarray(model.encode(corpus, convert_to_tensor=False, normalize_embeddings=True), dtype=np.float32)
+        np.save(output_dir / f"{name}.npy", embeddings)
+        manifest["corpora"][name] = {"size": len(corpus), "dim": int(embeddings.shape[1])}
+        logger.info(f"词表向量: {name} {embeddings.shape}")
+
+    with open(output_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return output_dir
+
+
+def encode_groups(groups: List[List[str]]) -> List[np.ndarray]:
+    """把多组查询文本合并为一次批量编码（经过句向量缓存），按组拆分返回归一化向量 shape: [组内文本数, 维度]"""
+    texts = [text for group in groups for text in group]
+    embeddings = SentenceModelManager.encode(texts)
+    result, offset = [], 0
+    for group in groups:
+        result.append(embeddings[offset:offset + len(group)])
+        offset += len(group)
+    return result
+
+
+def best_matches(query_embeddings: np.ndarray, corpus_embeddings: np.ndarray):
+    """每个查询在词表中相似度最高的下标和相似度（一次矩阵乘法）"""
+    cos_sim = query_embeddings @ corpus_embeddings.T  # shape: [查询数, 词表长度]
+    top_idx = np.argmax(cos_sim, axis=1)
+    return top_idx, cos_sim[np.arange(len(top_idx)), top_idx]
+
+
+class CorpusEmbeddings:
+    """固定词表的归一化句向量
+
+    启动时以内存映射方式加载 build_corpus_embeddings.py 预先生成的.npy文件（按模型名和词表哈希区分），
+    多个进程共享同一份页缓存；文件不存在时退回到首次使用时编码一次并保存在内存中。
+    """
+
+    _instance = None
+    _lock = Lock()
+
+    def __init__(self, base_dir: Path = CORPUS_EMBEDDINGS_DIR, model_name: str = SENTENCE_EMBEDDING_KEY):
+        self.directory = embeddings_dir(base_dir, model_name, vocabulary_hash())
+        self._matrices: Dict[str, np.ndarray] = {}
+        self._encode_lock = Lock()
+        self.stats = {
+            'mapped': 0,
+            'encoded': 0
+        }
+
+        for name, corpus in VOCABULARY.items():
+            path = self.directory / f"{name}.npy"
+            if not path.exists():
+                continue
+            matrix = np.load(path, mmap_mode="r")
+            if matrix.shape[0] != len(corpus):
+                logger.warning(f"词表向量文件与词表不一致，忽略: {path}")
+                continue
+            self._matrices[name] = matrix
+            self.stats['mapped'] += 1
+
+        if self.stats['mapped'] < len(VOCABULARY):
+            logger.warning(f"词表向量文件不完整({self.stats['mapped']}/{len(VOCABULARY)})，缺少的词表将在首次使用时编码，"
+                           f"可运行 python build_corpus_embeddings.py 预先生成: {self.directory}")
+        else:
+            logger.info(f"已映射词表向量: {self.directory}")
+
+    @classmethod
+    def get_instance(cls) -> "CorpusEmbeddings":
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def matrix(self, name: str) -> np.ndarray:
+        """词表向量矩阵 shape: [词表长度, 维度]，行顺序与词表一致"""
+        matrix = self._matrices.get(name)
+        if matrix is not None:
+            return matrix
+        with self._encode_lock:
+            if name not in self._matrices:
+                model = SentenceModelManager.get_model()
+                self._matrices[name] = np.asarray(
+                    model.encode(VOCABULARY[name], convert_to_tensor=False, normalize_embeddings=True), dtype=np.float32
+                )
+                self.stats['encoded'] += 1
+            return self._matrices[name]
+
+    def get_stats(self) -> dict:
+        return self.stats.copy()
@@ -3,13 +3,15 @@ from queue import Queue
 import threading
 import time
 
-from numpy.f2py.auxfuncs import throw_error
-
 from extraction.position_processor import PositionProcessor
 from extraction.resume_processor import ResumeProcessor
 # from match.match_service import MatchService  # 暂时取消匹配服务
 from utils.database import DatabaseManager
 from utils.logger import setup_logger
+from utils.openai_client_manager import OpenAIClientManager
+from utils.batch_runner import BatchRequestDeferred, is_collecting
+from utils.usage_tracker import usage_context
+from config.settings import LLM_BATCH_MODE
 
 logger = setup_logger("extraction_service")
 
@@ -22,8 +24,12 @@ class ExtractionService:
         self.queue = Queue()
         self._running = False
         self.db_manager = DatabaseManager()
-        self.resume_processor = ResumeProcessor()
-        self.position_processor = PositionProcessor()
+        # 标签提取处理器在首次处理消息时才创建
+        self._resume_processor = None
+        self._position_processor = None
+        self._processor_lock = threading.Lock()
+        # Batch API回填任务在单独的线程中执行，不阻塞队列中的实时消息
+        self._batch_thread = None
         # self.match_service = MatchService().get_instance()  # 暂时取消匹配服务
 
     @classmethod
@@ -34,6 +40,22 @@ class ExtractionService:
                     cls._instance = cls()
         return cls._instance
 
+    @property
+    def resume_processor(self) -> ResumeProcessor:
+        if self._resume_processor is None:
+            with self._processor_lock:
+                if self._resume_processor is None:
+                    self._resume_processor = ResumeProcessor()
+        return self._resume_processor
+
+    @property
+    def position_processor(self) -> PositionProcessor:
+        if self._position_processor is None:
+            with self._processor_lock:
+                if self._position_processor is None:
+                    self._position_processor = PositionProcessor()
+        return self._position_processor
+
 
     def start_worker(self):
         self._running = True
@@ -55,7 +77,13 @@ class ExtractionService:
                 continue  # timeout, continue looping
 
 
-    def handle_scan_resume(self):
+    def handle_scan_resume(self, batch_mode: bool = LLM_BATCH_MODE):
+        if batch_mode:
+            OpenAIClientManager.run_batch_job(self._scan_resume)
+        else:
+            self._scan_resume()
+
+    def _scan_resume(self):
         scan_result = self.db_manager.get_unextracted_resume()
         for item in scan_result:
             resume_json = item['raw_json']
@@ -64,6 +92,10 @@ class ExtractionService:
 
 
     def handle_single_resume(self, resume_json, resume_id):
+        with usage_context(entity_type="resume", entity_id=resume_id):
+            self._handle_single_resume(resume_json, resume_id)
+
+    def _handle_single_resume(self, resume_json, resume_id):
         try:
             print(f"开始处理简历标签提取: {resume_id}")
             parsed_tags = self.resume_processor.parse_resume_content(resume_json)
@@ -72,6 +104,10 @@ class ExtractionService:
                 print(f"简历 {resume_id} 标签提取返回None，跳过处理")
                 return
             
+            # 批处理收集阶段只登记请求，不写数据库
+            if is_collecting():
+                return
+            
             print(f"简历 {resume_id} 标签提取成功，准备存储到数据库")
             result = self.db_manager.create_resume_tags_record(parsed_tags, resume_id)
             
@@ -80,18 +116,30 @@ class ExtractionService:
             else:
                 print(f"简历 {resume_id} 标签存储失败")
                 
+        except BatchRequestDeferred:
+            return
         except Exception as e:
             print(f"处理简历 {resume_id} 时出错: {e}")
             import traceback
             traceback.print_exc()
 
 
-    def handle_scan_position(self):
+    def handle_scan_position(self, batch_mode: bool = LLM_BATCH_MODE):
+        if batch_mode:
+            OpenAIClientManager.run_batch_job(self._scan_position)
+        else:
+            self._scan_position()
+
+    def _scan_position(self):
         scan_result = self.db_manager.get_unextracted_position()
         for item in scan_result:
             self.handle_single_position(item)
 
     def handle_single_position(self, position_record):
+        with usage_context(entity_type="position", entity_id=position_record.get('id')):
+            self._handle_single_position(position_record)
+
+    def _handle_single_position(self, position_record):
         try:
             print(f"开始处理职位标签提取: {position_record['id']}")
             print(f"职位数据: {position_record}")
@@ -113,6 +161,10 @@ class ExtractionService:
             if parsed_tags is None:
                 print(f"职位 {position_record['id']} 标签提取返回None，跳过处理")
                 return
+            
+            # 批处理收集阶段只登记请求，不写数据库
+            if is_collecting():
+                return
                 
             print(f"职位 {position_record['id']} 标签提取成功，准备存储到数据库")
             result = self.db_manager.create_position_tags_record(parsed_tags, position_record['id'])
@@ -122,6 +174,8 @@ class ExtractionService:
             else:
                 print(f"职位 {position_record['id']} 标签存储失败")
                 
+        except BatchRequestDeferred:
+            return
         except Exception as e:
             print(f"处理职位 {position_record['id']} 时出错: {e}")
             import traceback
@@ -182,12 +236,32 @@ class ExtractionService:
             return str(position_record)
 
 
+    def _start_batch_scan(self):
+        """在后台线程以批处理模式扫描简历和职位，已有批处理扫描在运行时跳过本次"""
+        if self._batch_thread is not None and self._batch_thread.is_alive():
+            logger.info("批处理扫描仍在进行，跳过本次调度")
+            return
+
+        def run():
+            try:
+                self.handle_scan_resume(True)
+                self.handle_scan_position(True)
+            except Exception as e:
+                logger.error(f"批处理扫描失败: {e}")
+
+        self._batch_thread = threading.Thread(target=run, daemon=True, name="batch-scan")
+        self._batch_thread.start()
+
     def handle_message(self, message):
         print(f"Processing message: {message}")
         param = message['starter']
         if param == 'scheduler':
-            self.handle_scan_resume()
-            self.handle_scan_position()
+            batch_mode = message.get('batch', LLM_BATCH_MODE)
+            if batch_mode:
+                self._start_batch_scan()
+            else:
+                self.handle_scan_resume(False)
+                self.handle_scan_position(False)
         elif param == 'pipeline':
             self.handle_single_resume(message['payload']['data'], message['payload']['id'])
             # self.match_service.push({'source': "upload", "payload": {"id": message['payload']['id']}})  # 暂时取消匹配服务
@@ -1,8 +1,10 @@
 import json
 from typing import Optional, Dict, Any
-import numpy as np
 from utils.openai_client_manager import OpenAIClientManager
+from utils.batch_runner import BatchRequestDeferred
 from utils.sentence_model_manager import SentenceModelManager
+from extraction.vocabulary import market_field_corpus_name
+from extraction.vocabulary_engine import VocabularyEngine
 
 
 # logger = setup_logger("llm_processor")
@@ -22,7 +24,6 @@ class PositionProcessor:
     """LLM解析处理器"""
     def __init__(self):
         self.client = OpenAIClientManager.get_client()
-        self.sentence_model = SentenceModelManager.get_model()
     # JSON Schema定义
         self.polish_schema = {
             "type": "object",
@@ -80,61 +81,36 @@ class PositionProcessor:
             "required": ["category", "market", "market_field","education", "work_experience", "others"]
         }
 
+    @property
+    def sentence_model(self):
+        """句向量模型，首次使用时加载"""
+        return SentenceModelManager.get_model()
+
+    @property
+    def vocabulary(self) -> VocabularyEngine:
+        """标签对齐引擎，首次使用时加载词表向量"""
+        return VocabularyEngine.get_instance()
+
     def semantic_resume_match(self, json_content) -> Optional[Dict[str, Any]]:
         json_content = lowercase_json(json_content)
         """用小模型匹配和筛选固定领域的token"""
-        # 技术类别：技术类/非技术类
-        category_corpus = ["技术类", "非技术类"]
-        content_category = json_content['category']
-        category_embeddings = self.sentence_model.encode(category_corpus, convert_to_tensor=False, normalize_embeddings=True)
-        query_embedding = self.sentence_model.encode(content_category, convert_to_tensor=False, normalize_embeddings=True)
-        cos_sim = np.dot(category_embeddings, query_embedding)  # shape: [N]
-        top_idx = np.argmax(cos_sim)
-        json_content['category'] = category_corpus[top_idx]
-
-
-        # 业务场景：web3, AI, 金融
-        market_corpus = ["web3", "AI", "金融"]
-        content_market = json_content['market']
-        market_embeddings = self.sentence_model.encode(market_corpus, convert_to_tensor=False, normalize_embeddings=True)
-        query_embedding = self.sentence_model.encode(content_market, convert_to_tensor=False, normalize_embeddings=True)
-        cos_sim = np.dot(market_embeddings, query_embedding)  # shape: [N]
-        top_idx = np.argmax(cos_sim)
-        json_content['market'] = market_corpus[top_idx]
-
-        market_field_corpus = []
-        if json_content['market'] == "web3":
-            market_field_corpus = ["defi", "dex", "layer1", "layer2", "zk", "rpc", "钱包", "质押", "借贷", "lending", "staking", "restaking", "支付", "amm", "mev", "挖矿", "tokenomics", "铭文", "meme", "法币", "c2c", "理财", "did", "perp", "perpetual", "indexer", "evm", "nft", "eth", "btc", "solana", "ton", "波卡", "cosmos", "ethereum", "流动性"]
-        elif json_content['market'] == "AI":
-            market_field_corpus = ["ai", "ai agent", "大模型", "大语言模型", "rag", "生成式ai", "多模态", "向量数据库", "langchain", "智能体"]
-        elif json_content['market'] == "金融":
-            market_field_corpus = ["做市", "交易", "低延迟", "套利", "回测", "订单簿", "撮合", "滑点", "流动性", "合约", "现货", "期权", "衍生品", "永续", "期货", "风控", "杠杆", "量化", "网格", "外汇", "日内", "波段"]
-
-        market_field_embeddings = self.sentence_model.encode(market_field_corpus, convert_to_tensor=False, normalize_embeddings=True)
-        for item in json_content["market_field"]:
-            market_field_tag = set()
-            for i in json_content["market_field"][item]:
-                query_embedding = self.sentence_model.encode(i, convert_to_tensor=False, normalize_embeddings=True)
-                cos_sim = np.dot(market_field_embeddings, query_embedding)  # shape: [N]
-                top_idx = np.argmax(cos_sim)
-                if cos_sim[top_idx] > 0.8:
-                    market_field_tag.add(market_field_corpus[top_idx])
-            json_content["market_field"][item] = list(market_field_tag)
-
-
-        # 教育标签：985高校，211高校，本科，硕士，博士，海外学历，QS50, 清北，QS100，专科，专升本
-        education_corpus = ["985高校", "211高校", "本科", "硕士", "博士", "海外学历", "qs50", "清北", "qs100", "专科", "专升本"]
-        education_embeddings = self.sentence_model.encode(education_corpus, convert_to_tensor=False, normalize_embeddings=True)
+        # 技术类别和业务场景先查词表和别名，未命中的一次批量编码取相似度最高的一项
+        json_content['category'], json_content['market'] = self.vocabulary.choose(
+            [("category", json_content['category']), ("market", json_content['market'])]
+        )
 
-        for item in json_content["education"]:
-            education_tag = set()
-            for i in json_content["education"][item]:
-                query_embedding = self.sentence_model.encode(i, convert_to_tensor=False, normalize_embeddings=True)
-                cos_sim = np.dot(education_embeddings, query_embedding)  # shape: [N]
-                top_idx = np.argmax(cos_sim)
-                if cos_sim[top_idx] > 0.8:
-                    education_tag.add(education_corpus[top_idx])
-            json_content["education"][item] = list(education_tag)
+        # 细分领域、学历的required/recommended/exclude各为一组，词表和别名未命中的文本合并为一次批量编码
+        market_field_name = market_field_corpus_name(json_content['market'])
+        field_keys = list(json_content["market_field"])
+        education_keys = list(json_content["education"])
+        matched = self.vocabulary.match(
+            [(market_field_name, json_content["market_field"][key]) for key in field_keys]
+            + [("education", json_content["education"][key]) for key in education_keys]
+        )
+        for key, tags in zip(field_keys, matched[:len(field_keys)]):
+            json_content["market_field"][key] = tags
+        for key, tags in zip(education_keys, matched[len(field_keys):]):
+            json_content["education"][key] = tags
         return json_content
 
 
@@ -146,8 +122,9 @@ class PositionProcessor:
             content_str = str(input_content)
             print(f"转换后内容: {content_str[:200]}...")
             
-            response = self.client.chat.completions.create(
+            json_result = OpenAIClientManager.chat_completion(
                 model="gpt-4o-mini",
+                stage="position_polish",
                 messages=[
                     {
                         "role": "system",
@@ -166,8 +143,6 @@ class PositionProcessor:
 
             print("OpenAI API调用成功，开始解析响应...")
             
-            # 获取JSON响应
-            json_result = response.choices[0].message.content
             print(f"API返回内容长度: {len(json_result) if json_result else 0}")
             print(f"API返回内容前200字符: {json_result[:200] if json_result else 'Empty'}")
             
@@ -181,6 +156,8 @@ class PositionProcessor:
             print(f"JSON解析错误: {e}")
             print(f"原始响应内容: {json_result if 'json_result' in locals() else 'API响应为空'}")
             return None
+        except BatchRequestDeferred:
+            raise
         except Exception as e:
             print(f"润色职位内容失败: {e}")
             import traceback
@@ -198,8 +175,9 @@ class PositionProcessor:
             content_str = str(input_content)
             print(f"转换后内容长度: {len(content_str)}")
             
-            response = self.client.chat.completions.create(
+            json_result = OpenAIClientManager.chat_completion(
                 model="gpt-4o-mini",
+                stage="position_tag_extraction",
                 messages=[
                     {
                         "role": "system",
@@ -250,7 +228,6 @@ others.
             
             print("OpenAI API调用成功，开始解析响应...")
             
-            json_result = response.choices[0].message.content
             print(f"API返回内容长度: {len(json_result) if json_result else 0}")
             print(f"API返回内容前200字符: {json_result[:200] if json_result else 'Empty'}")
 
@@ -268,6 +245,8 @@ others.
             print(f"JSON解析错误: {e}")
             print(f"原始响应内容: {json_result if 'json_result' in locals() else 'API响应为空'}")
             return None
+        except BatchRequestDeferred:
+            raise
         except Exception as e:
             print(f"LLM职位解析失败: {e}")
             import traceback
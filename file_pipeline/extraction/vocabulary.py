@@ -0,0 +1,99 @@
+"""标签提取使用的固定词表
+
+简历和职位标签提取（semantic_resume_match）把LLM输出的标签对齐到这些词表，
+词表的句向量由 build_corpus_embeddings.py 离线计算，见 extraction/corpus_embeddings.py。
+修改词表后需要重新运行该脚本（词表哈希变化后旧的向量文件不再使用）。
+ALIASES 收录常见的同义写法，由 extraction/vocabulary_engine.py 在句向量匹配之前直接查表对齐，修改别名不需要重新生成向量。
+"""
+
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+# 技术类别
+CATEGORY_CORPUS = ["技术类", "非技术类"]
+
+# 岗位技能，按技术类别区分
+CATEGORY_SKILL_CORPUS_TECH = ["java", "go", "python", "rust", "c++", "后端", "前端", "全栈", "架构师", "cto", "sre", "android", "ios", "flutter", "cocos", "运维", "测试", "dba", "数据开发", "数据分析", "区块链开发", "合约", "solidity", "密码学", "安全", "量化开发", "量化策略"]
+CATEGORY_SKILL_CORPUS_NON_TECH = ["市场", "运营", "增长", "cmo", "pr", "公关", "销售", "bd", "产品", "设计", "行政", "法务", "风控", "合规", "devrel", "投资", "项目经理", "财务", "会计", "上币", "listing"]
+
+# 业务场景
+MARKET_CORPUS = ["web3", "AI", "金融"]
+
+# 细分领域，按业务场景区分
+MARKET_FIELD_CORPUS_WEB3 = ["defi", "dex", "layer1", "layer2", "zk", "rpc", "钱包", "质押", "借贷", "lending", "staking", "restaking", "支付", "amm", "mev", "挖矿", "tokenomics", "铭文", "meme", "法币", "c2c", "理财", "did", "perp", "perpetual", "indexer", "evm", "nft", "eth", "btc", "solana", "ton", "波卡", "cosmos", "ethereum", "流动性"]
+MARKET_FIELD_CORPUS_AI = ["ai", "ai agent", "大模型", "大语言模型", "rag", "生成式ai", "多模态", "向量数据库", "langchain", "智能体"]
+MARKET_FIELD_CORPUS_FINANCE = ["做市", "交易", "低延迟", "套利", "回测", "订单簿", "撮合", "滑点", "流动性", "合约", "现货", "期权", "衍生品", "永续", "期货", "风控", "杠杆", "量化", "网格", "外汇", "日内", "波段"]
+
+# 教育标签
+EDUCATION_CORPUS = ["985高校", "211高校", "本科", "硕士", "博士", "海外学历", "qs50", "清北", "qs100", "专科", "专升本"]
+
+# 词表名 -> 词表，词表名同时用作向量文件名
+VOCABULARY: Dict[str, List[str]] = {
+    "category": CATEGORY_CORPUS,
+    "category_skill_tech": CATEGORY_SKILL_CORPUS_TECH,
+    "category_skill_non_tech": CATEGORY_SKILL_CORPUS_NON_TECH,
+    "market": MARKET_CORPUS,
+    "market_field_web3": MARKET_FIELD_CORPUS_WEB3,
+    "market_field_ai": MARKET_FIELD_CORPUS_AI,
+    "market_field_finance": MARKET_FIELD_CORPUS_FINANCE,
+    "education": EDUCATION_CORPUS,
+}
+
+# 常见同义写法 -> 词表项，按词表名区分（键在匹配时同样做全角转半角、小写、合并空白）
+ALIASES: Dict[str, Dict[str, str]] = {
+    "category": {
+        "技术": "技术类", "tech": "技术类", "technical": "技术类",
+        "非技术": "非技术类", "non-tech": "非技术类", "non-technical": "非技术类",
+    },
+    "category_skill_tech": {
+        "golang": "go", "cpp": "c++", "c/c++": "c++", "后端开发": "后端", "前端开发": "前端", "全栈开发": "全栈",
+        "架构": "架构师", "devops": "运维", "测试开发": "测试", "qa": "测试", "安卓": "android",
+        "数据工程": "数据开发", "智能合约": "合约", "网络安全": "安全", "量化研究": "量化策略",
+    },
+    "category_skill_non_tech": {
+        "市场营销": "市场", "marketing": "市场", "商务拓展": "bd", "business development": "bd", "产品经理": "产品",
+        "设计师": "设计", "法律": "法务", "compliance": "合规", "公共关系": "公关", "developer relations": "devrel",
+        "项目管理": "项目经理",
+    },
+    "market": {
+        "web 3": "web3", "区块链": "web3", "crypto": "web3", "加密货币": "web3",
+        "人工智能": "AI", "finance": "金融", "金融科技": "金融", "fintech": "金融",
+    },
+    "market_field_web3": {
+        "去中心化金融": "defi", "去中心化交易所": "dex", "零知识证明": "zk", "wallet": "钱包",
+        "以太坊": "ethereum", "比特币": "btc", "polkadot": "波卡", "nfts": "nft",
+    },
+    "market_field_ai": {
+        "llm": "大语言模型", "大型语言模型": "大语言模型", "agent": "ai agent", "aigc": "生成式ai",
+        "检索增强生成": "rag", "multimodal": "多模态", "vector database": "向量数据库",
+    },
+    "market_field_finance": {
+        "market making": "做市", "做市商": "做市", "arbitrage": "套利", "backtesting": "回测", "order book": "订单簿",
+        "撮合引擎": "撮合", "options": "期权", "futures": "期货", "外汇交易": "外汇", "量化交易": "量化",
+    },
+    "education": {
+        "研究生": "硕士", "硕士研究生": "硕士", "master": "硕士", "博士研究生": "博士", "phd": "博士", "ph.d.": "博士",
+        "学士": "本科", "bachelor": "本科", "大专": "专科", "985": "985高校", "211": "211高校",
+        "清华大学": "清北", "北京大学": "清北", "北大": "清北", "留学": "海外学历",
+    },
+}
+
+_CATEGORY_SKILL_CORPORA = {"技术类": "category_skill_tech", "非技术类": "category_skill_non_tech"}
+_MARKET_FIELD_CORPORA = {"web3": "market_field_web3", "AI": "market_field_ai", "金融": "market_field_finance"}
+
+
+def category_skill_corpus_name(category: str) -> Optional[str]:
+    """技术类别对应的岗位技能词表名，未知类别返回None"""
+    return _CATEGORY_SKILL_CORPORA.get(category)
+
+
+def market_field_corpus_name(market: str) -> Optional[str]:
+    """业务场景对应的细分领域词表名，未知场景返回None"""
+    return _MARKET_FIELD_CORPORA.get(market)
+
+
+def vocabulary_hash() -> str:
+    """词表内容（含顺序）的哈希，用于区分不同版本词表的向量文件"""
+    payload = json.dumps(VOCABULARY, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,132 @@
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from extraction.corpus_embeddings import CorpusEmbeddings, encode_groups, best_matches
+from extraction.vocabulary import VOCABULARY, ALIASES
+from utils.embedding_cache import normalize_text
+from utils.logger import setup_logger
+
+logger = setup_logger("vocabulary_engine")
+
+
+class VocabularyEngine:
+    """标签对齐：先查词表原词和别名（规范化文本的字典查找），未命中的文本才用句向量相似度匹配
+
+    - exact：规范化后与词表项相同
+    - alias：命中 ALIASES 中的同义写法
+    - embedding：句向量相似度最高的词表项（多选标签需超过阈值，未超过计为 rejected）
+    """
+
+    _instance = None
+    _lock = Lock()
+
+    def __init__(self, corpus_embeddings: Optional[CorpusEmbeddings] = None):
+        self.corpus_embeddings = corpus_embeddings or CorpusEmbeddings.get_instance()
+        self._exact: Dict[str, Dict[str, str]] = {}
+        self._alias: Dict[str, Dict[str, str]] = {}
+        for name, corpus in VOCABULARY.items():
+            self._exact[name] = {normalize_text(item): item for item in corpus}
+            self._alias[name] = {}
+            for alias, target in ALIASES.get(name, {}).items():
+                if target not in corpus:
+                    logger.warning(f"别名 {alias} -> {target} 不在词表 {name} 中，忽略")
+                    continue
+                self._alias[name][normalize_text(alias)] = target
+
+        self._stats_lock = Lock()
+        self.stats = {
+            'exact': 0,
+            'alias': 0,
+            'embedding': 0,
+            'rejected': 0
+        }
+
+    @classmethod
+    def get_instance(cls) -> "VocabularyEngine":
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def get_global_stats(cls) -> Optional[dict]:
+        """各匹配路径计数，尚未使用时返回None"""
+        return cls._instance.get_stats() if cls._instance is not None else None
+
+    def _count(self, **counts: int):
+        with self._stats_lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def lookup(self, name: str, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """字典查找，返回 (词表项, 路径)，未命中返回 (None, None)"""
+        key = normalize_text(text)
+        item = self._exact[name].get(key)
+        if item is not None:
+            return item, 'exact'
+        item = self._alias[name].get(key)
+        if item is not None:
+            return item, 'alias'
+        return None, None
+
+    def choose(self, queries: List[Tuple[str, str]]) -> List[str]:
+        """单选：每个 (词表名, 文本) 返回一个词表项，字典未命中的一次批量编码后取相似度最高的一项"""
+        result: List[Optional[str]] = []
+        misses = []
+        counts = {'exact': 0, 'alias': 0, 'embedding': 0}
+        for i, (name, text) in enumerate(queries):
+            item, path = self.lookup(name, text)
+            result.append(item)
+            if path is None:
+                misses.append(i)
+            else:
+                counts[path] += 1
+
+        if misses:
+            embeddings = encode_groups([[queries[i][1]] for i in misses])
+            for i, query_embedding in zip(misses, embeddings):
+                name = queries[i][0]
+                top_idx, _ = best_matches(query_embedding, self.corpus_embeddings.matrix(name))
+                result[i] = VOCABULARY[name][top_idx[0]]
+            counts['embedding'] += len(misses)
+        self._count(**counts)
+        return result
+
+    def match(self, groups: List[Tuple[str, List[str]]], threshold: float = 0.8) -> List[List[str]]:
+        """多选：每组 (词表名, 文本列表) 返回去重后的词表项，字典未命中的文本合并为一次批量编码，相似度超过threshold才保留"""
+        hits: List[List[str]] = []
+        misses: List[List[str]] = []
+        counts = {'exact': 0, 'alias': 0, 'embedding': 0, 'rejected': 0}
+        for name, texts in groups:
+            group_hits, group_misses = [], []
+            for text in texts:
+                item, path = self.lookup(name, text)
+                if path is None:
+                    group_misses.append(text)
+                else:
+                    group_hits.append(item)
+                    counts[path] += 1
+            hits.append(group_hits)
+            misses.append(group_misses)
+
+        embeddings = encode_groups(misses) if any(misses) else [None] * len(groups)
+        result = []
+        for (name, _), group_hits, group_misses, query_embeddings in zip(groups, hits, misses, embeddings):
+            tags = set(group_hits)
+            if group_misses:
+                top_idx, top_sim = best_matches(query_embeddings, self.corpus_embeddings.matrix(name))
+                accepted = top_idx[top_sim > threshold]
+                tags.update(VOCABULARY[name][idx] for idx in accepted)
+                counts['embedding'] += len(accepted)
+                counts['rejected'] += len(group_misses) - len(accepted)
+            result.append(list(tags))
+        self._count(**counts)
+        return result
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = self.stats.copy()
+        total = sum(stats.values())
+        stats['fast_path_rate'] = (stats['exact'] + stats['alias']) / total if total else 0.0
+        return stats
@@ -20,10 +20,28 @@ sys.path.append(str(current_dir))
 
 from utils.database import DatabaseManager
 from utils.logger import setup_logger
+from utils.openai_client_manager import OpenAIClientManager
+from utils.rate_limiter import PRIORITY_BACKFILL
+from utils.batch_runner import BatchRequestDeferred, is_collecting
+from utils.usage_tracker import usage_context
+from utils.prompt_builder import PromptTemplate
+from config.settings import LLM_BATCH_MODE
 from modules.llm_processor import LLMProcessor
 
 logger = setup_logger("position_import")
 
+# v2: 标签列表移出指令，排序后单独作为第二条消息
+POSITION_TAG_PROMPT = PromptTemplate("position_import_tags", 2, """你是一个专业的职位分析师。请从下一条消息给出的可选标签列表中选择最匹配的标签。
+
+**严格要求：**
+1. 【重要】只能从可选标签列表中精确选择标签，一个字都不能改变
+2. 【重要】绝对禁止创造、修改或组合新标签
+3. 【重要】如果职位中的技能不在标签列表中，就不要选择，宁可少选也不要创造
+4. 选择1-5个最匹配的标签（不要超过5个）
+5. 返回JSON格式: {"tags": ["标签1", "标签2"]}
+
+请严格遵守标签约束，绝不创造新标签！""")
+
 class PositionImporter:
     """职位导入器"""
     
@@ -109,38 +127,20 @@ class PositionImporter:
             # 构建职位描述文本
             position_text = self._build_position_summary(position_data)
             
-            # 构建标签列表文本
             available_tags_for_category = self.available_tags.get(category, [])
-            tags_text = "、".join(available_tags_for_category)
-            
-            if not tags_text:
+            if not available_tags_for_category:
                 logger.warning(f"分类 {category} 没有可用标签")
                 return []
             
-            # 调用LLM进行标签分析
-            response = self.llm_processor.client.chat.completions.create(
+            # 调用LLM进行标签分析，静态指令在前、排序后的标签列表其次、职位内容最后
+            content = OpenAIClientManager.chat_completion(
                 model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"""你是一个专业的职位分析师。请从以下标签列表中选择最匹配的标签：
-
-{category}可选标签：{tags_text}
-
-**严格要求：**
-1. 【重要】只能从上述标签列表中精确选择标签，一个字都不能改变
-2. 【重要】绝对禁止创造、修改或组合新标签
-3. 【重要】如果职位中的技能不在标签列表中，就不要选择，宁可少选也不要创造
-4. 选择1-5个最匹配的标签（不要超过5个）
-5. 返回JSON格式: {{"tags": ["标签1", "标签2"]}}
-
-请严格遵守标签约束，绝不创造新标签！"""
-                    },
-                    {
-                        "role": "user", 
-                        "content": f"请分析以下职位并选择匹配的标签：\\n\\n{position_text}"
-                    }
-                ],
+                stage="position_import_tags",
+                prompt_version=POSITION_TAG_PROMPT.prompt_version,
+                messages=POSITION_TAG_PROMPT.build(
+                    f"请分析以下职位并选择匹配的标签：\\n\\n{position_text}",
+                    context={f"{category}可选标签": available_tags_for_category}
+                ),
                 response_format={
                     "type": "json_schema",
                     "json_schema": {
@@ -162,7 +162,7 @@ class PositionImporter:
             )
             
             # 解析结果
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(content)
             raw_tags = result.get("tags", [])
             
             # 清理和验证标签
@@ -177,6 +177,8 @@ class PositionImporter:
             logger.info(f"LLM标签提取: 原始{len(raw_tags)}个 -> 有效{len(valid_tags)}个")
             return valid_tags
             
+        except BatchRequestDeferred:
+            raise
         except Exception as e:
             logger.error(f"LLM标签提取失败: {e}")
             return []
@@ -287,12 +289,14 @@ class PositionImporter:
             
             return final_data
             
+        except BatchRequestDeferred:
+            raise
         except Exception as e:
             logger.error(f"准备职位数据失败: {e}")
             return None
     
-    def import_from_excel(self, excel_path: str) -> Dict[str, int]:
-        """从Excel导入职位数据"""
+    def import_from_excel(self, excel_path: str, batch_mode: bool = False) -> Dict[str, int]:
+        """从Excel导入职位数据，batch_mode为True时通过OpenAI Batch API提取标签"""
         stats = {
             'total': 0,
             'success': 0,
@@ -308,28 +312,11 @@ class PositionImporter:
             logger.info(f"Excel文件包含 {len(df)} 行数据")
             stats['total'] = len(df)
             
-            # 处理每一行
-            for index, row in df.iterrows():
-                try:
-                    logger.info(f"处理第 {index + 1}/{len(df)} 行数据")
-                    
-                    # 准备数据
-                    position_data = self._prepare_position_data(row)
-                    if not position_data:
-                        stats['skipped'] += 1
-                        continue
-                    
-                    # 插入数据库
-                    success = self._insert_position(position_data)
-                    if success:
-                        stats['success'] += 1
-                        logger.info(f"职位导入成功: {position_data['position_name']} ({position_data['requirement_json']['classification']}) - 标签: {position_data['tags']}")
-                    else:
-                        stats['failed'] += 1
-                        
-                except Exception as e:
-                    logger.error(f"处理第 {index + 1} 行失败: {e}")
-                    stats['failed'] += 1
+            if batch_mode:
+                row_stats = OpenAIClientManager.run_batch_job(lambda: self._import_rows(df))
+            else:
+                row_stats = self._import_rows(df)
+            stats.update(row_stats)
             
             logger.info(f"导入完成: 总计{stats['total']}，成功{stats['success']}，失败{stats['failed']}，跳过{stats['skipped']}")
             return stats
@@ -338,6 +325,46 @@ class PositionImporter:
             logger.error(f"导入过程失败: {e}")
             return stats
     
+    def _import_rows(self, df: pd.DataFrame) -> Dict[str, int]:
+        """逐行准备并插入职位数据，返回成功/失败/跳过计数"""
+        stats = {
+            'success': 0,
+            'failed': 0,
+            'skipped': 0
+        }
+        
+        # 处理每一行
+        for index, row in df.iterrows():
+            try:
+                logger.info(f"处理第 {index + 1}/{len(df)} 行数据")
+                
+                # 准备数据
+                with usage_context(entity_type="excel_row", entity_id=index + 1):
+                    position_data = self._prepare_position_data(row)
+                if not position_data:
+                    stats['skipped'] += 1
+                    continue
+                
+                # 批处理收集阶段只登记请求，不写数据库
+                if is_collecting():
+                    continue
+                
+                # 插入数据库
+                success = self._insert_position(position_data)
+                if success:
+                    stats['success'] += 1
+                    logger.info(f"职位导入成功: {position_data['position_name']} ({position_data['requirement_json']['classification']}) - 标签: {position_data['tags']}")
+                else:
+                    stats['failed'] += 1
+                    
+            except BatchRequestDeferred:
+                continue
+            except Exception as e:
+                logger.error(f"处理第 {index + 1} 行失败: {e}")
+                stats['failed'] += 1
+        
+        return stats
+    
     def _insert_position(self, position_data: Dict[str, Any]) -> bool:
         """插入职位到数据库"""
         try:
@@ -358,8 +385,10 @@ def main():
         return
     
     try:
+        # 离线批量任务，让出限流额度给在线pipeline
+        OpenAIClientManager.set_default_priority(PRIORITY_BACKFILL)
         importer = PositionImporter()
-        stats = importer.import_from_excel(excel_path)
+        stats = importer.import_from_excel(excel_path, batch_mode=LLM_BATCH_MODE)
         
         print("\\n" + "="*50)
         print("职位导入统计")
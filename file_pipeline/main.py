@@ -25,9 +25,12 @@ except ImportError:
 from modules.file_watcher import FileWatcher
 from modules.pipeline_processor import PipelineProcessor
 from utils.logger import setup_logger
-from config.settings import UPLOAD_DIRS
+from utils.openai_client_manager import OpenAIClientManager
+from utils.sentence_model_manager import SentenceModelManager
+from config.settings import UPLOAD_DIRS, SENTENCE_MODEL_WARMUP
 # from match.match_service import MatchService  # 暂时取消匹配服务
 from extraction.extraction_service import ExtractionService
+from extraction.vocabulary_engine import VocabularyEngine
 from apscheduler.schedulers.background import BackgroundScheduler
 
 logger = setup_logger("main")
@@ -36,11 +39,12 @@ class ResumeProcessingService:
     """简历处理服务主类"""
     
     def __init__(self):
+        self.created_at = time.time()
         self.file_watcher = FileWatcher()
         self.pipeline_processor = PipelineProcessor()
         self.running = False
         self.stats_thread = None
-        self.extractor_queue = ExtractionService().get_instance()
+        self.extractor_queue = ExtractionService.get_instance()
         # self.match_queue = MatchService().get_instance()  # 暂时取消匹配服务
         self.scheduler = BackgroundScheduler()
         
@@ -69,10 +73,14 @@ class ResumeProcessingService:
             # 启动统计线程
             self._start_stats_thread()
             
+            # 后台预加载句向量模型
+            if SENTENCE_MODEL_WARMUP:
+                self._start_model_warmup()
+            
             # 启动处理器
             self.running = True
             
-            logger.info("服务启动成功，开始监控文件...")
+            logger.info(f"服务启动成功，开始监控文件... (启动耗时 {time.time() - self.created_at:.1f}秒)")
 
             # 启动调度器
             self.scheduler.start()
@@ -181,6 +189,20 @@ class ResumeProcessingService:
         logger.info(f"  OpenAI API: {os.getenv('OPENAI_BASE_URL', 'default')}")
         logger.info("-" * 60)
     
+    def _start_model_warmup(self):
+        """后台加载句向量模型和词表向量，标签分析和标签提取首次使用时无需等待加载"""
+        def warmup_worker():
+            try:
+                start = time.time()
+                model = SentenceModelManager.get_model()
+                VocabularyEngine.get_instance()
+                model.encode(["预热"], convert_to_tensor=False, normalize_embeddings=True)
+                logger.info(f"句向量模型预加载完成，耗时 {time.time() - start:.1f}秒")
+            except Exception as e:
+                logger.warning(f"句向量模型预加载失败，将在首次使用时加载: {e}")
+        
+        threading.Thread(target=warmup_worker, daemon=True, name="model-warmup").start()
+    
     def _start_stats_thread(self):
         """启动统计线程"""
         def stats_worker():
@@ -209,6 +231,76 @@ class ResumeProcessingService:
             logger.info(f"    OCR失败: {processing_stats['ocr_failed']}")
             logger.info(f"    LLM失败: {processing_stats['llm_failed']}")
             logger.info(f"    数据库失败: {processing_stats['db_failed']}")
+            if processing_stats['input_tokens_raw']:
+                saved_ratio = 1 - processing_stats['input_tokens_compacted'] / processing_stats['input_tokens_raw']
+                logger.info(f"  LLM输入token: {processing_stats['input_tokens_raw']} -> {processing_stats['input_tokens_compacted']} (压缩减少{saved_ratio:.1%})")
+            if processing_stats.get('compaction_truncated_files'):
+                logger.warning(f"  章节截断丢弃内容的文件: {processing_stats['compaction_truncated_files']}")
+            if processing_stats['ocr_coalesced']:
+                logger.info(f"  合并重复OCR: {processing_stats['ocr_coalesced']}")
+            llm_flight_stats = OpenAIClientManager.get_singleflight_stats()
+            if llm_flight_stats and llm_flight_stats['coalesced']:
+                logger.info(f"  合并重复LLM请求: {llm_flight_stats['coalesced']}")
+            if processing_stats['early_tag_analysis']:
+                logger.info(f"  流式解析提前标签分析: {processing_stats['early_tag_analysis']}")
+            
+            deadline_stats = self.pipeline_processor.get_deadline_stats()
+            if deadline_stats:
+                logger.info(f"时间预算统计 (超出预算文件: {processing_stats['deadline_exceeded']}):")
+                for stage, item in deadline_stats.items():
+                    logger.info(f"  {stage}: 平均耗时 {item['seconds'] / item['calls']:.2f}秒, 超出预算 {item['overruns']} 次")
+            
+            circuit_stats = OpenAIClientManager.get_circuit_stats()
+            if circuit_stats:
+                logger.info(f"LLM熔断: 状态 {circuit_stats['state']}, 熔断次数 {circuit_stats['opened']}, 拒绝请求 {circuit_stats['rejected']}")
+            deferred_stats = self.pipeline_processor.get_deferred_stats()
+            if deferred_stats:
+                logger.info(f"延后处理: 本次延后 {processing_stats['deferred']}, 已恢复处理 {processing_stats['deferred_completed']}, "
+                            f"队列中 {deferred_stats['size']} (最早等待 {deferred_stats['oldest_age']:.0f}秒)")
+            
+            model_router = self.pipeline_processor.llm_processor.model_router
+            if model_router is not None:
+                logger.info("模型路由: " + ", ".join(
+                    f"{name}({model_router.routes[name].model}) {count}" for name, count in model_router.get_stats().items()
+                ))
+            
+            cache_stats = OpenAIClientManager.get_cache_stats()
+            if cache_stats:
+                logger.info("LLM缓存统计:")
+                logger.info(f"  命中率: {cache_stats['hit_rate']:.1%} (命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']})")
+                logger.info(f"  缓存条目: {cache_stats['entries']}, 淘汰: {cache_stats['evictions']}, 绕过: {cache_stats['bypassed']}")
+            
+            vocabulary_stats = VocabularyEngine.get_global_stats()
+            if vocabulary_stats:
+                logger.info(f"标签对齐: 词表原词 {vocabulary_stats['exact']}, 别名 {vocabulary_stats['alias']}, "
+                            f"句向量 {vocabulary_stats['embedding']}, 未达阈值 {vocabulary_stats['rejected']}")
+            embedding_stats = SentenceModelManager.get_cache_stats()
+            if embedding_stats:
+                logger.info(f"句向量缓存: 命中率 {embedding_stats['hit_rate']:.1%} (命中 {embedding_stats['hits']} / 未命中 {embedding_stats['misses']}), "
+                            f"条目 {embedding_stats['entries']}, 淘汰 {embedding_stats['evictions']}")
+            
+            batcher_stats = SentenceModelManager.get_batcher_stats()
+            if batcher_stats and batcher_stats['batches']:
+                logger.info(f"句向量微批处理: 请求 {batcher_stats['requests']}, 批次 {batcher_stats['batches']}, "
+                            f"平均每批 {batcher_stats['avg_batch_requests']:.1f} 个请求, 实际编码 {batcher_stats['encoded']} 条")
+            
+            rate_stats = OpenAIClientManager.get_rate_limit_stats()
+            if rate_stats:
+                logger.info("LLM限流统计:")
+                logger.info(f"  请求: {rate_stats['acquired']}, 被限流: {rate_stats['throttled']}, 累计等待: {rate_stats['wait_seconds']:.1f}秒, 429次数: {rate_stats['rate_limited']}, 排队超时: {rate_stats['timeouts']}")
+            
+            concurrency_stats = OpenAIClientManager.get_concurrency_stats()
+            if concurrency_stats:
+                logger.info("LLM自适应并发:")
+                logger.info(f"  当前上限: {concurrency_stats['limit']} (峰值 {concurrency_stats['peak_limit']}), 进行中: {concurrency_stats['inflight']}, "
+                            f"提高 {concurrency_stats['increases']} 次, 降低 {concurrency_stats['decreases']} 次, 排队 {concurrency_stats['waited']} 次, "
+                            f"排队超时 {concurrency_stats['timeouts']} 次")
+            
+            hedge_stats = OpenAIClientManager.get_hedge_stats()
+            if hedge_stats:
+                logger.info("LLM对冲请求统计:")
+                logger.info(f"  请求: {hedge_stats['requests']}, 对冲: {hedge_stats['hedged']} ({hedge_stats['hedge_rate']:.1%}), "
+                            f"副本胜出: {hedge_stats['hedge_wins']} ({hedge_stats['win_rate']:.1%}), 超预算跳过: {hedge_stats['budget_skipped']}")
             
             logger.info("目录统计:")
             for dir_name, stats in directory_stats.items():
@@ -11,7 +11,6 @@ logger = setup_logger("match_processor")
 
 class MatchProcessor:
     def __init__(self):
-        self.client = OpenAIClientManager.get_client()
         self.sentence_model = SentenceModelManager.get_model()
 
         self.schema = {
@@ -29,7 +28,7 @@ class MatchProcessor:
         """解析简历内容为结构化数据"""
         try:
             # 调用OpenAI API
-            response = self.client.chat.completions.create(
+            json_result = OpenAIClientManager.chat_completion(
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -44,11 +43,9 @@ class MatchProcessor:
                         "name": "ai_resume",
                         "schema": self.schema
                     }
-                }
+                },
+                stage="match_education"
             )
-
-            # 获取JSON响应
-            json_result = response.choices[0].message.content
             # 解析JSON
             parsed_json = json.loads(json_result)
 
@@ -64,7 +61,7 @@ class MatchProcessor:
     def others_score(self, json_content: str) -> Optional[Dict[str, Any]]:
         try:
             # 调用OpenAI API
-            response = self.client.chat.completions.create(
+            json_result = OpenAIClientManager.chat_completion(
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -79,11 +76,9 @@ class MatchProcessor:
                         "name": "ai_resume",
                         "schema": self.schema
                     }
-                }
+                },
+                stage="match_others"
             )
-
-            # 获取JSON响应
-            json_result = response.choices[0].message.content
             # 解析JSON
             parsed_json = json.loads(json_result)
 
@@ -1,19 +1,116 @@
 import json
 import os
-from typing import Optional, Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from threading import Lock
+from typing import Optional, Dict, Any, List, Callable
 from openai import OpenAI
 from utils.logger import setup_logger
 from utils.openai_client_manager import OpenAIClientManager
 from utils.database import DatabaseManager
+from utils.tag_shortlister import TagShortlister
+from modules.local_tagger import LocalTagger
+from modules.resume_segmenter import ResumeSegmenter, SECTION_FIELDS
+from modules.resume_pre_extractor import ResumePreExtractor, DATE_SECTIONS
+from modules.model_router import ModelRouter, Route
+from utils.batch_runner import BatchRequestDeferred, is_collecting
+from utils.usage_tracker import bind_usage_context
+from utils.deadline import DeadlineExceeded, bind_deadline
+from utils.circuit_breaker import ProviderUnavailable
+from utils.prompt_builder import PromptTemplate
+from config.settings import (
+    PRE_EXTRACTION_ENABLED,
+    SECTION_PARSE_ENABLED, SECTION_PARSE_MIN_CHARS, SECTION_PARSE_MIN_SECTIONS,
+    LLM_ROUTING_ENABLED, LLM_ROUTES, LLM_ROUTE_LIGHT_MAX_TOKENS, LLM_ROUTE_HEAVY_MIN_TOKENS,
+    LLM_ROUTE_LIGHT_MIN_OCR_QUALITY, LLM_ROUTE_HEAVY_MAX_OCR_QUALITY,
+    TAG_SHORTLIST_ENABLED, TAG_SHORTLIST_TOP_K,
+    TAGGING_MODE, LOCAL_TAG_THRESHOLD, LOCAL_CATEGORY_MARGIN, LOCAL_MAX_TAGS
+)
 
 logger = setup_logger("llm_processor")
 
+TAGGING_MODES = ("llm", "local")
+
+# 标签分析用到的解析字段，流式解析时这些字段到齐即可提前开始标签分析
+TAG_INPUT_FIELDS = ("basic_info", "job_intention", "personal_expertise", "skills", "work_experience")
+
+# 分章节解析时各字段的说明
+RESUME_FIELD_DESCRIPTIONS = {
+    "basic_info": "表示用户基本信息。",
+    "job_intention": "表示用户求职意图。",
+    "personal_expertise": "表示用户的专长，建议使用自我评价提取。",
+    "education": "表示用户的学历。",
+    "work_experience": "表示用户的工作经历。",
+    "projects": "表示用户的项目集。",
+    "skills": "表示用户所掌握的技能栈。",
+    "certifications": "表示用户所拥有的技能认证。",
+    "languages": "表示用户所掌握的语言技能。",
+    "others": "表示其他信息。",
+}
+
+# prompt静态指令，修改内容时提升版本号，便于在用量报告中对比服务端缓存命中
+RESUME_PARSE_PROMPT = PromptTemplate("resume_parse", 1, """下面是一份转换为markdown格式的简历，请你帮助我将其转化为json格式。如果简历内容全部为英语，也请翻译为以中文为主，英语为辅的表达方式并输出为json。json字段包括：
+basic_info, 表示用户基本信息。
+job_intention, 表示用户求职意图。
+personal_expertise, 表示用户的专长，建议使用自我评价提取。
+education, 表示用户的学历。
+work_experience, 表示用户的工作经历。
+projects, 表示用户的项目集。
+skills, 表示用户所掌握的技能栈。
+certifications, 表示用户所拥有的技能认证。
+languages, 表示用户所掌握的语言技能。
+others. 
+如果某一个字段为空，请用'暂无'代替。""")
+
+# v2: 标签列表移出指令，排序后单独作为第二条消息，指令部分对所有简历完全相同
+TAG_ANALYSIS_PROMPT = PromptTemplate("tag_analysis", 2, """你是一个专业的简历分析师。你必须严格按照以下规则进行分类和标签分析。
+
+**分类规则：**
+- 技术类：涉及编程、开发、技术实现的岗位
+- 非技术类：涉及业务、运营、管理的岗位
+
+**严格标签约束 - 只能从下一条消息给出的技术类可选标签、非技术类可选标签中选择**
+
+**严格要求：**
+1. 必须且只能选择"技术类"或"非技术类"中的一个分类
+2. 【重要】只能从可选标签列表中精确选择标签，一个字都不能改变
+3. 【重要】绝对禁止创造、修改或组合新标签
+4. 【重要】如果简历中的技能不在标签列表中，就不要选择，宁可少选也不要创造
+5. 选择1-5个最匹配的标签（不要超过5个）
+6. 提供分类和标签选择的理由
+
+**示例正确做法：**
+- 如果简历提到"JavaScript"但标签列表中只有"前端"，那就选择"前端"
+- 如果简历提到"数据分析"但标签列表中没有，就不要选择任何相关标签
+
+请严格遵守标签约束，绝不创造新标签！""")
+
+
+def section_prompt(section: str, fields: List[str]) -> PromptTemplate:
+    """分章节解析的prompt，指令只取决于章节字段"""
+    field_lines = "\n".join(f"{field}, {RESUME_FIELD_DESCRIPTIONS[field]}" for field in fields)
+    return PromptTemplate(f"resume_parse_{section}", 1, f"""下面是一份转换为markdown格式的简历中的部分章节，请你帮助我将其转化为json格式。如果内容全部为英语，也请翻译为以中文为主，英语为辅的表达方式并输出为json。json字段包括：
+{field_lines}
+如果某一个字段为空，请用'暂无'代替。""")
+
 class LLMProcessor:
     """LLM解析处理器"""
     
     def __init__(self):
         self.client = OpenAIClientManager.get_client()
         self.database = DatabaseManager()  # 用于获取标签字典
+        self.tag_shortlister = TagShortlister(top_k=TAG_SHORTLIST_TOP_K) if TAG_SHORTLIST_ENABLED else None
+        self.local_tagger = LocalTagger(LOCAL_TAG_THRESHOLD, LOCAL_CATEGORY_MARGIN, LOCAL_MAX_TAGS)
+        self.tagging_mode = TAGGING_MODE if TAGGING_MODE in TAGGING_MODES else "llm"
+        self.segmenter = ResumeSegmenter(min_sections=SECTION_PARSE_MIN_SECTIONS)
+        self.pre_extractor = ResumePreExtractor() if PRE_EXTRACTION_ENABLED else None
+        self.model_router = ModelRouter(
+            LLM_ROUTES,
+            light_max_tokens=LLM_ROUTE_LIGHT_MAX_TOKENS,
+            heavy_min_tokens=LLM_ROUTE_HEAVY_MIN_TOKENS,
+            light_min_quality=LLM_ROUTE_LIGHT_MIN_OCR_QUALITY,
+            heavy_max_quality=LLM_ROUTE_HEAVY_MAX_OCR_QUALITY
+        ) if LLM_ROUTING_ENABLED else None
         
         # 获取所有可用标签
         self._load_available_tags()
@@ -162,8 +259,16 @@ class LLMProcessor:
             "required": ["category", "tags", "reasoning"]
         }
     
-    def parse_resume_content(self, markdown_content: str) -> Optional[Dict[str, Any]]:
-        """解析简历内容为结构化数据"""
+    def parse_resume_content(self, markdown_content: str,
+                             on_field: Optional[Callable[[str, Any], None]] = None,
+                             ocr_quality: Optional[float] = None,
+                             route: Optional[Route] = None) -> Optional[Dict[str, Any]]:
+        """解析简历内容为结构化数据
+
+        传入on_field时以流式方式调用LLM，每个顶层字段解析完成即回调 on_field(key, value)
+        启用预提取时邮箱、电话不再由LLM生成，时间区间作为提示传入并在解析后核对
+        启用模型路由时按token数、语言和ocr_quality（未提供时按内容估算）选择模型，传入route则直接使用该路由
+        """
         try:
             logger.info(f"开始LLM解析，内容长度: {len(markdown_content)}")
             
@@ -172,41 +277,52 @@ class LLMProcessor:
                 logger.warning("简历内容过短，可能解析失败")
                 return None
             
+            # 正则预提取邮箱、电话和时间区间
+            schema = self.schema
+            pre_extracted = None
+            hint_messages = []
+            if self.pre_extractor is not None:
+                pre_extracted = self.pre_extractor.extract(markdown_content)
+                schema = ResumePreExtractor.slim_schema(self.schema, pre_extracted)
+                hint = ResumePreExtractor.hint_message(pre_extracted)
+                if hint is not None:
+                    hint_messages.append(hint)
+                if on_field is not None:
+                    field_callback = on_field
+
+                    def on_field(key, value):
+                        if key == "basic_info":
+                            value = ResumePreExtractor.fill_contact(value, pre_extracted)
+                        field_callback(key, value)
+            
+            if route is None and self.model_router is not None:
+                route = self.model_router.route(markdown_content, ocr_quality)
+            
+            # 长简历按章节并行解析，章节识别不足时退回整体解析
+            if SECTION_PARSE_ENABLED and len(markdown_content) >= SECTION_PARSE_MIN_CHARS:
+                parsed_json = self._parse_by_sections(markdown_content, on_field, schema, pre_extracted, route)
+                if parsed_json is not None:
+                    return self._reconcile(parsed_json, pre_extracted)
+            
             # 调用OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": """下面是一份转换为markdown格式的简历，请你帮助我将其转化为json格式。如果简历内容全部为英语，也请翻译为以中文为主，英语为辅的表达方式并输出为json。json字段包括：
-basic_info, 表示用户基本信息。
-job_intention, 表示用户求职意图。
-personal_expertise, 表示用户的专长，建议使用自我评价提取。
-education, 表示用户的学历。
-work_experience, 表示用户的工作经历。
-projects, 表示用户的项目集。
-skills, 表示用户所掌握的技能栈。
-certifications, 表示用户所拥有的技能认证。
-languages, 表示用户所掌握的语言技能。
-others. 
-如果某一个字段为空，请用'暂无'代替。"""
+            with self._route_slot(route):
+                json_result = OpenAIClientManager.chat_completion(
+                    model=route.model if route else "gpt-4o-mini",
+                    stage="resume_parse",
+                    prompt_version=RESUME_PARSE_PROMPT.prompt_version,
+                    messages=RESUME_PARSE_PROMPT.build(markdown_content, hints=hint_messages),
+                    response_format={
+                        "type": "json_schema",
+                        "json_schema": {
+                            "name": "ai_resume",
+                            "schema": schema
+                        }
                     },
-                    {"role": "user", "content": markdown_content}
-                ],
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": "ai_resume",
-                        "schema": self.schema
-                    }
-                }
-            )
-            
-            # 获取JSON响应
-            json_result = response.choices[0].message.content
+                    on_field=on_field
+                )
             
             # 解析JSON
-            parsed_json = json.loads(json_result)
+            parsed_json = self._reconcile(json.loads(json_result), pre_extracted)
             
             logger.info("LLM解析成功")
             logger.debug(f"解析结果预览: {str(parsed_json)[:200]}...")
@@ -216,10 +332,141 @@ others.
         except json.JSONDecodeError as e:
             logger.error(f"JSON解析错误: {e}")
             return None
+        except (DeadlineExceeded, ProviderUnavailable):
+            raise
         except Exception as e:
             logger.error(f"LLM解析失败: {e}")
             return None
     
+    @staticmethod
+    def _route_slot(route: Optional[Route]):
+        """占用路由的并发名额，未启用路由时不限制"""
+        return route.slot() if route is not None else nullcontext()
+
+    def _reconcile(self, parsed_json: Dict[str, Any], pre_extracted: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """合并预提取结果并核对时间区间"""
+        if pre_extracted is None or not isinstance(parsed_json, dict):
+            return parsed_json
+        return self.pre_extractor.reconcile(parsed_json, pre_extracted)
+
+    def _parse_by_sections(self, markdown_content: str,
+                           on_field: Optional[Callable[[str, Any], None]] = None,
+                           schema: Optional[Dict[str, Any]] = None,
+                           pre_extracted: Optional[Dict[str, Any]] = None,
+                           route: Optional[Route] = None) -> Optional[Dict[str, Any]]:
+        """按章节切分后用各章节的子schema并发解析，合并为与整体解析相同结构的结果
+
+        未识别到的章节，其字段交给基本信息章节一并解析；任一章节失败返回None，由调用方退回整体解析
+        """
+        sections = self.segmenter.segment(markdown_content)
+        if sections is None:
+            return None
+
+        tasks = []
+        basic_fields = list(SECTION_FIELDS["basic"])
+        for section, fields in SECTION_FIELDS.items():
+            if section == "basic":
+                continue
+            if section in sections:
+                tasks.append((section, sections[section], fields))
+            else:
+                basic_fields.extend(fields)
+        tasks.insert(0, ("basic", sections.get("basic", ""), basic_fields))
+
+        merged: Dict[str, Any] = {}
+        field_lock = Lock()
+
+        schema = schema or self.schema
+
+        def run(task):
+            section, text, fields = task
+            hint = None
+            if pre_extracted is not None:
+                # 基本信息章节同时负责未识别章节的字段，也带上这些章节的时间区间提示
+                hint_sections = [section] if section in DATE_SECTIONS else \
+                    [name for name in DATE_SECTIONS if name not in sections]
+                hint = ResumePreExtractor.hint_message(pre_extracted, hint_sections)
+            result = self._parse_section(section, text, fields, schema, hint, route)
+            if result is not None and on_field is not None:
+                # 各章节在不同线程完成，回调串行执行
+                with field_lock:
+                    for key in fields:
+                        on_field(key, result[key])
+            return result
+
+        logger.info(f"分章节并行解析: {[task[0] for task in tasks]}")
+        if is_collecting():
+            # 批处理收集阶段：在当前线程依次登记各章节请求
+            results, deferred = [], None
+            for task in tasks:
+                try:
+                    results.append(run(task))
+                except BatchRequestDeferred as e:
+                    deferred = deferred or e
+            if deferred is not None:
+                raise deferred
+        else:
+            with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+                results = list(executor.map(bind_deadline(bind_usage_context(run)), tasks))
+
+        for (section, _, _), result in zip(tasks, results):
+            if result is None:
+                logger.warning(f"章节解析失败: {section}，退回整体解析")
+                return None
+            merged.update(result)
+
+        properties = self.schema["properties"]
+        parsed_json = {key: merged.get(key, self._empty_value(properties[key])) for key in properties}
+        logger.info("分章节LLM解析成功")
+        return parsed_json
+
+    def _parse_section(self, section: str, section_text: str, fields: List[str],
+                       schema: Optional[Dict[str, Any]] = None,
+                       hint: Optional[Dict[str, str]] = None,
+                       route: Optional[Route] = None) -> Optional[Dict[str, Any]]:
+        """用只包含fields的子schema解析单个章节，hint为可选的时间区间提示消息，route为整份简历的路由"""
+        schema = schema or self.schema
+        prompt = section_prompt(section, fields)
+        section_schema = {
+            "type": "object",
+            "strict": True,
+            "properties": {field: schema["properties"][field] for field in fields},
+            "additionalProperties": False,
+            "required": list(fields)
+        }
+
+        try:
+            with self._route_slot(route):
+                json_result = OpenAIClientManager.chat_completion(
+                    model=route.model if route else "gpt-4o-mini",
+                    stage=f"resume_parse_{section}",
+                    prompt_version=prompt.prompt_version,
+                    messages=prompt.build(section_text or "暂无", hints=[hint] if hint is not None else None),
+                    response_format={
+                        "type": "json_schema",
+                        "json_schema": {
+                            "name": f"ai_resume_{section}",
+                            "schema": section_schema
+                        }
+                    }
+                )
+            return json.loads(json_result)
+
+        except (BatchRequestDeferred, DeadlineExceeded, ProviderUnavailable):
+            raise
+        except Exception as e:
+            logger.error(f"章节{section}解析失败: {e}")
+            return None
+
+    @classmethod
+    def _empty_value(cls, field_schema: Dict[str, Any]) -> Any:
+        """章节缺失时字段的默认值"""
+        if field_schema.get("type") == "array":
+            return []
+        if field_schema.get("type") == "object":
+            return {key: cls._empty_value(value) for key, value in field_schema.get("properties", {}).items()}
+        return "暂无"
+
     def validate_parsed_data(self, data: Dict[str, Any]) -> bool:
         """验证解析后的数据"""
         try:
@@ -304,6 +551,14 @@ others.
             logger.error(f"加载标签字典失败: {e}")
             self.available_tags = {"技术类": [], "非技术类": []}
     
+    def set_tagging_mode(self, mode: str):
+        """运行时切换标签分析模式：llm 或 local"""
+        if mode not in TAGGING_MODES:
+            raise ValueError(f"无效的标签分析模式: {mode}")
+        if mode != self.tagging_mode:
+            logger.info(f"标签分析模式切换: {self.tagging_mode} -> {mode}")
+        self.tagging_mode = mode
+    
     def analyze_resume_tags(self, parsed_resume_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """分析简历并生成分类和标签"""
         try:
@@ -313,55 +568,37 @@ others.
                 logger.error(f"输入数据不是字典类型，而是: {type(parsed_resume_data)}")
                 return None
             
+            # 本地模式：句向量匹配，不调用LLM
+            if self.tagging_mode == "local":
+                self._load_available_tags()
+                result = self.local_tagger.analyze(parsed_resume_data, self.available_tags)
+                return result if result and self._validate_tags(result) else None
+            
             # 构建简历摘要文本
             resume_text = self._build_resume_summary(parsed_resume_data)
             
             # 重新加载标签以确保是最新的
             self._load_available_tags()
             
-            # 构建标签列表文本
-            tech_tags_text = "、".join(self.available_tags["技术类"])
-            non_tech_tags_text = "、".join(self.available_tags["非技术类"])
+            # 用句向量预筛候选标签，prompt长度不随标签字典增长
+            candidate_tags = self.available_tags
+            if self.tag_shortlister is not None:
+                candidate_tags = self.tag_shortlister.shortlist(resume_text, self.available_tags)
             
             logger.info(f"当前可用标签: 技术类{len(self.available_tags['技术类'])}个, 非技术类{len(self.available_tags['非技术类'])}个")
             
-            # 调用LLM进行标签分析
-            response = self.client.chat.completions.create(
+            # 调用LLM进行标签分析，静态指令在前、排序后的标签列表其次、简历内容最后
+            content = OpenAIClientManager.chat_completion(
                 model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"""你是一个专业的简历分析师。你必须严格按照以下规则进行分类和标签分析。
-
-**分类规则：**
-- 技术类：涉及编程、开发、技术实现的岗位
-- 非技术类：涉及业务、运营、管理的岗位
-
-**严格标签约束 - 只能从以下列表中选择：**
-
-技术类可选标签：{tech_tags_text}
-
-非技术类可选标签：{non_tech_tags_text}
-
-**严格要求：**
-1. 必须且只能选择"技术类"或"非技术类"中的一个分类
-2. 【重要】只能从上述标签列表中精确选择标签，一个字都不能改变
-3. 【重要】绝对禁止创造、修改或组合新标签
-4. 【重要】如果简历中的技能不在标签列表中，就不要选择，宁可少选也不要创造
-5. 选择1-5个最匹配的标签（不要超过5个）
-6. 提供分类和标签选择的理由
-
-**示例正确做法：**
-- 如果简历提到"JavaScript"但标签列表中只有"前端"，那就选择"前端"
-- 如果简历提到"数据分析"但标签列表中没有，就不要选择任何相关标签
-
-请严格遵守标签约束，绝不创造新标签！"""
-                    },
-                    {
-                        "role": "user", 
-                        "content": f"请分析以下简历内容：\n\n{resume_text}"
+                stage="tag_analysis",
+                prompt_version=TAG_ANALYSIS_PROMPT.prompt_version,
+                messages=TAG_ANALYSIS_PROMPT.build(
+                    f"请分析以下简历内容：\n\n{resume_text}",
+                    context={
+                        "技术类可选标签": candidate_tags["技术类"],
+                        "非技术类可选标签": candidate_tags["非技术类"]
                     }
-                ],
+                ),
                 response_format={
                     "type": "json_schema",
                     "json_schema": {
@@ -372,7 +609,7 @@ others.
             )
             
             # 解析结果
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(content)
             
             # 清理结果中的字符串
             if "category" in result:
@@ -388,6 +625,8 @@ others.
                 logger.error("标签验证失败")
                 return None
                 
+        except (DeadlineExceeded, ProviderUnavailable):
+            raise
         except Exception as e:
             logger.error(f"简历标签分析失败: {e}")
             return None
@@ -0,0 +1,112 @@
+from typing import Optional, Dict, Any, List
+import numpy as np
+
+from utils.sentence_model_manager import SentenceModelManager
+from utils.tag_embeddings import TagEmbeddingCache
+from utils.logger import setup_logger
+
+logger = setup_logger("local_tagger")
+
+
+class LocalTagger:
+    """不调用LLM的本地标签分析，输出与LLMProcessor.analyze_resume_tags相同的结构
+
+    - 查询文本：求职意向、技能栈、工作经历中的职位名称，一次批量编码
+    - 标签得分：标签向量与各查询文本余弦相似度的最大值
+    - 分类：比较两个分类前3个标签得分的均值，技术类需领先category_margin
+    - 标签：所选分类中得分不低于tag_threshold的标签，最多max_tags个；都不达标时保留得分最高的一个
+    """
+
+    def __init__(self, tag_threshold: float = 0.6, category_margin: float = 0.0, max_tags: int = 5):
+        self.tag_threshold = tag_threshold
+        self.category_margin = category_margin
+        self.max_tags = max_tags
+        self.tag_embeddings = TagEmbeddingCache.get_instance()
+
+    @staticmethod
+    def collect_queries(parsed_data: Dict[str, Any]) -> List[str]:
+        """提取用于匹配标签的文本：求职意向、技能、工作职位"""
+        queries = []
+
+        job_intention = parsed_data.get("job_intention", "")
+        if isinstance(job_intention, str) and job_intention and job_intention != "暂无":
+            queries.append(job_intention)
+
+        skills = parsed_data.get("skills", [])
+        if isinstance(skills, list):
+            queries.extend(skill for skill in skills if isinstance(skill, str) and skill and skill != "暂无")
+
+        for exp in parsed_data.get("work_experience", []) or []:
+            if isinstance(exp, dict):
+                position = exp.get("position", "")
+                if position and position != "暂无":
+                    queries.append(position)
+
+        # 去重并保持顺序
+        return list(dict.fromkeys(query.strip() for query in queries if query.strip()))
+
+    def score(self, parsed_data: Dict[str, Any], available_tags: Dict[str, List[str]]) -> Optional[Dict[str, np.ndarray]]:
+        """计算每个分类下各标签的得分，没有可用查询文本时返回None"""
+        queries = self.collect_queries(parsed_data)
+        if not queries:
+            return None
+
+        query_embeddings = SentenceModelManager.encode(queries, use_cache=False)
+
+        scores = {}
+        for category, tags in available_tags.items():
+            if not tags:
+                scores[category] = np.zeros(0)
+                continue
+            tag_matrix = self.tag_embeddings.get_matrix(tags)
+            scores[category] = np.max(tag_matrix @ query_embeddings.T, axis=1)  # shape: [标签数]
+        return scores
+
+    def decide(self, scores: Dict[str, np.ndarray], available_tags: Dict[str, List[str]],
+               tag_threshold: Optional[float] = None, category_margin: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """根据得分和阈值确定分类与标签（阈值参数便于评估脚本做校准）"""
+        tag_threshold = self.tag_threshold if tag_threshold is None else tag_threshold
+        category_margin = self.category_margin if category_margin is None else category_margin
+
+        def category_score(category: str) -> float:
+            values = scores.get(category)
+            if values is None or len(values) == 0:
+                return -1.0
+            return float(np.mean(np.sort(values)[-3:]))
+
+        tech_score = category_score("技术类")
+        non_tech_score = category_score("非技术类")
+        category = "技术类" if tech_score - non_tech_score >= category_margin else "非技术类"
+
+        category_scores = scores.get(category)
+        tags = available_tags.get(category, [])
+        if category_scores is None or len(category_scores) == 0:
+            return None
+
+        order = np.argsort(-category_scores)
+        selected = [tags[i] for i in order[:self.max_tags] if category_scores[i] >= tag_threshold]
+        if not selected:
+            selected = [tags[order[0]]]
+
+        return {
+            "category": category,
+            "tags": selected,
+            "reasoning": f"本地向量匹配: 技术类得分{tech_score:.3f}, 非技术类得分{non_tech_score:.3f}, 标签阈值{tag_threshold}"
+        }
+
+    def analyze(self, parsed_data: Dict[str, Any], available_tags: Dict[str, List[str]]) -> Optional[Dict[str, Any]]:
+        """分析简历并生成分类和标签"""
+        try:
+            scores = self.score(parsed_data, available_tags)
+            if scores is None:
+                logger.warning("简历缺少技能、求职意向和工作职位，无法本地标签分析")
+                return None
+
+            result = self.decide(scores, available_tags)
+            if result:
+                logger.info(f"本地标签分析: {result['category']}, 标签: {result['tags']}")
+            return result
+
+        except Exception as e:
+            logger.error(f"本地标签分析失败: {e}")
+            return None
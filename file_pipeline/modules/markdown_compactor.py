@@ -0,0 +1,157 @@
+import html
+import re
+from typing import List, Tuple
+from utils.logger import setup_logger
+
+logger = setup_logger("markdown_compactor")
+
+# 图片链接：![alt](path) 和 <img ...>
+_IMAGE_LINK = re.compile(r'!\[[^\]]*\]\([^)]*\)')
+_IMG_TAG = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+_HTML_TABLE = re.compile(r'<table\b.*?</table>', re.IGNORECASE | re.DOTALL)
+_HTML_ROW = re.compile(r'<tr\b.*?</tr>', re.IGNORECASE | re.DOTALL)
+_HTML_CELL = re.compile(r'<t[dh]\b[^>]*>(.*?)</t[dh]>', re.IGNORECASE | re.DOTALL)
+_HTML_TAG = re.compile(r'</?[a-zA-Z][^>]*>')
+_TABLE_SEPARATOR = re.compile(r'^\s*\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$')
+_PAGE_NUMBER = re.compile(r'^\s*(-\s*\d+\s*-|第\s*\d+\s*页(\s*/?\s*共\s*\d+\s*页)?|page\s*\d+(\s*(of|/)\s*\d+)?)\s*$', re.IGNORECASE)
+_HEADING = re.compile(r'^#{1,6}\s')
+# 以冒号结尾的标签行（如"职责："），属于正文，不作为页眉页脚删除
+_LABEL_LINE = re.compile(r'[:：]\s*$')
+_INLINE_SPACES = re.compile(r'[ \t　\xa0]+')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+class MarkdownCompactor:
+    """MinerU markdown压缩器：在送入LLM前去掉不携带简历信息的内容
+
+    处理步骤均为确定性的文本规则：
+    1. 删除图片链接
+    2. HTML表格和markdown表格折叠为"单元格 | 单元格"的紧凑行
+    3. 删除其余HTML标签
+    4. 删除页码，以及紧邻页码、大约每页出现一次的重复短行（页眉页脚）
+    5. 合并空白字符
+    6. 按标题切分章节，超长章节截断（section_max_chars为0时不截断）
+    """
+
+    def __init__(self, section_max_chars: int = 0, repeated_line_threshold: int = 3,
+                 repeated_line_max_length: int = 60, page_number_window: int = 2):
+        self.section_max_chars = section_max_chars
+        self.repeated_line_threshold = repeated_line_threshold
+        self.repeated_line_max_length = repeated_line_max_length
+        self.page_number_window = page_number_window
+
+    def compact(self, markdown_content: str) -> str:
+        """压缩markdown内容"""
+        return self.compact_with_stats(markdown_content)[0]
+
+    def compact_with_stats(self, markdown_content: str) -> Tuple[str, int]:
+        """压缩markdown内容，返回(压缩后文本, 章节截断丢弃的字符数)"""
+        if not markdown_content:
+            return markdown_content, 0
+
+        text = markdown_content.replace('\r\n', '\n')
+        text = _IMAGE_LINK.sub('', text)
+        text = _IMG_TAG.sub('', text)
+        text = _HTML_TABLE.sub(lambda m: self._collapse_html_table(m.group(0)), text)
+        text = _HTML_TAG.sub('', text)
+        text = html.unescape(text)
+
+        lines = [
+            self._compact_line(line) for line in text.split('\n')
+            if not (_TABLE_SEPARATOR.match(line) and '|' in line)
+        ]
+        lines = self._remove_page_furniture(lines)
+
+        text = '\n'.join(lines)
+        text = _BLANK_LINES.sub('\n\n', text).strip()
+        return self._cap_sections(text)
+
+    def _collapse_html_table(self, table_html: str) -> str:
+        """HTML表格折叠为每行一条"a | b | c"文本"""
+        rows = []
+        for row_html in _HTML_ROW.findall(table_html):
+            cells = []
+            for cell_html in _HTML_CELL.findall(row_html):
+                cell = _INLINE_SPACES.sub(' ', _HTML_TAG.sub(' ', cell_html)).strip()
+                if cell:
+                    cells.append(cell)
+            if cells:
+                rows.append(' | '.join(cells))
+        return '\n' + '\n'.join(rows) + '\n'
+
+    def _compact_line(self, line: str) -> str:
+        """合并行内空白，markdown表格行去掉首尾竖线"""
+        line = _INLINE_SPACES.sub(' ', line).strip()
+        if line.startswith('|') and line.endswith('|') and len(line) > 1:
+            cells = [cell.strip() for cell in line.strip('|').split('|')]
+            line = ' | '.join(cell for cell in cells if cell)
+        return line
+
+    def _remove_page_furniture(self, lines: List[str]) -> List[str]:
+        """删除页码行，以及页眉页脚，页眉页脚保留首次出现
+
+        页眉页脚需同时满足：短行、非标题和标签行、至少出现repeated_line_threshold次、
+        出现次数不超过页数（页码行数+1），且每次出现都在页码行前后page_number_window个非空行以内。
+        没有页码行时无法判断分页，不删除任何重复行。
+        """
+        content = [i for i, line in enumerate(lines) if line]
+        page_positions = [pos for pos, i in enumerate(content) if _PAGE_NUMBER.match(lines[i])]
+        if not page_positions:
+            return [line for line in lines if not _PAGE_NUMBER.match(line)]
+
+        near_page_break = set()
+        for pos in page_positions:
+            for neighbor in range(max(0, pos - self.page_number_window),
+                                  min(len(content), pos + self.page_number_window + 1)):
+                near_page_break.add(content[neighbor])
+
+        occurrences = {}
+        for i in content:
+            line = lines[i]
+            if (len(line) <= self.repeated_line_max_length and not _HEADING.match(line)
+                    and not _LABEL_LINE.search(line) and not _PAGE_NUMBER.match(line)):
+                occurrences.setdefault(line, []).append(i)
+        max_count = len(page_positions) + 1
+        repeated = {
+            line for line, indexes in occurrences.items()
+            if self.repeated_line_threshold <= len(indexes) <= max_count
+            and all(i in near_page_break for i in indexes)
+        }
+
+        seen = set()
+        result = []
+        for line in lines:
+            if _PAGE_NUMBER.match(line):
+                continue
+            if line in repeated:
+                if line in seen:
+                    continue
+                seen.add(line)
+            result.append(line)
+        return result
+
+    def _cap_sections(self, text: str) -> Tuple[str, int]:
+        """按markdown标题切分章节，单个章节超过上限时截断，返回(文本, 丢弃的字符数)"""
+        if self.section_max_chars <= 0:
+            return text, 0
+
+        sections = []
+        current: List[str] = []
+        for line in text.split('\n'):
+            if _HEADING.match(line) and current:
+                sections.append('\n'.join(current))
+                current = []
+            current.append(line)
+        if current:
+            sections.append('\n'.join(current))
+
+        capped = []
+        dropped = 0
+        for section in sections:
+            if len(section) > self.section_max_chars:
+                title = section.split('\n', 1)[0][:30]
+                logger.warning(f"章节过长被截断: {title!r} {len(section)} -> {self.section_max_chars}字符")
+                dropped += len(section) - self.section_max_chars
+                section = section[:self.section_max_chars].rstrip() + '\n...（内容过长已截断）'
+            capped.append(section)
+        return '\n'.join(capped), dropped
@@ -0,0 +1,119 @@
+import re
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+from utils.token_counter import count_tokens
+from utils.deadline import DeadlineExceeded, remaining_timeout
+from utils.logger import setup_logger
+
+logger = setup_logger("model_router")
+
+_CJK = re.compile(r'[一-鿿]')
+_LATIN_WORD = re.compile(r'[A-Za-z]{2,}')
+# 正常简历文本中会出现的字符：中日韩文字、字母数字、常见中英文标点和markdown符号
+_VALID_CHAR = re.compile(r'[一-鿿　-〿＀-￯A-Za-z0-9.,:;!?@#%&*()\[\]{}<>/\\|+\-=_~\'"`·•、，。：；！？（）《》“”‘’【】]')
+
+DEFAULT_ROUTE = "standard"
+
+
+class Route:
+    """一条路由：使用的模型和该路由独立的并发名额"""
+
+    def __init__(self, name: str, model: str, concurrency: int):
+        self.name = name
+        self.model = model
+        self.concurrency = concurrency
+        self._slots = threading.BoundedSemaphore(concurrency)
+
+    @contextmanager
+    def slot(self):
+        """占用一个并发名额，等待时间计入文件时间预算"""
+        if not self._slots.acquire(timeout=remaining_timeout("llm")):
+            raise DeadlineExceeded("llm")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+
+class ModelRouter:
+    """按简历特征为解析请求选择模型
+
+    - 估算token数超过heavy_min_tokens，或OCR质量低于heavy_max_quality：heavy（长简历、噪声多的文本需要更强的模型）
+    - 估算token数不超过light_max_tokens、以中文为主且OCR质量不低于light_min_quality：light
+    - 其余（包括需要翻译的英文和中英混合简历）：standard
+    每条路由有独立的并发名额，heavy模型的慢请求不会占满其他简历的解析并发。
+    """
+
+    def __init__(self, routes: Dict[str, Dict[str, Any]], light_max_tokens: int = 2000,
+                 heavy_min_tokens: int = 8000, light_min_quality: float = 0.9, heavy_max_quality: float = 0.7):
+        self.routes = {
+            name: Route(name, config["model"], int(config.get("concurrency", 3)))
+            for name, config in routes.items()
+        }
+        if DEFAULT_ROUTE not in self.routes:
+            raise ValueError(f"路由配置缺少 {DEFAULT_ROUTE}")
+        self.light_max_tokens = light_max_tokens
+        self.heavy_min_tokens = heavy_min_tokens
+        self.light_min_quality = light_min_quality
+        self.heavy_max_quality = heavy_max_quality
+        self._lock = threading.Lock()
+        self.stats = {name: 0 for name in self.routes}
+
+    @staticmethod
+    def language_mix(text: str) -> str:
+        """按中文字符与英文单词的比例判断语言：zh、en 或 mixed"""
+        cjk = len(_CJK.findall(text))
+        words = len(_LATIN_WORD.findall(text))
+        if cjk + words == 0:
+            return "zh"
+        share = cjk / (cjk + words)
+        if share >= 0.7:
+            return "zh"
+        if share <= 0.1:
+            return "en"
+        return "mixed"
+
+    @staticmethod
+    def ocr_quality(text: str) -> float:
+        """OCR文本质量（0~1）：可识别字符占比，按碎片行（不超过2个字符的行）占比打折"""
+        chars = [ch for ch in text if not ch.isspace()]
+        if not chars:
+            return 0.0
+        valid_ratio = len(_VALID_CHAR.findall("".join(chars))) / len(chars)
+        lines = [line.strip() for line in text.split("\n") if line.strip() and not line.strip().startswith("#")]
+        fragment_ratio = sum(1 for line in lines if len(line) <= 2) / len(lines) if lines else 0.0
+        return round(valid_ratio * (1 - 0.5 * fragment_ratio), 3)
+
+    def features(self, text: str, ocr_quality: Optional[float] = None) -> Dict[str, Any]:
+        return {
+            "tokens": count_tokens(text),
+            "language": self.language_mix(text),
+            "ocr_quality": self.ocr_quality(text) if ocr_quality is None else ocr_quality
+        }
+
+    def choose(self, features: Dict[str, Any]) -> str:
+        """根据特征返回路由名，未配置的路由退回standard"""
+        if features["tokens"] >= self.heavy_min_tokens or features["ocr_quality"] < self.heavy_max_quality:
+            name = "heavy"
+        elif (features["tokens"] <= self.light_max_tokens and features["language"] == "zh"
+              and features["ocr_quality"] >= self.light_min_quality):
+            name = "light"
+        else:
+            name = DEFAULT_ROUTE
+        return name if name in self.routes else DEFAULT_ROUTE
+
+    def route(self, text: str, ocr_quality: Optional[float] = None) -> Route:
+        """为一份简历选择路由，ocr_quality未提供时按text估算"""
+        features = self.features(text, ocr_quality)
+        route = self.routes[self.choose(features)]
+        with self._lock:
+            self.stats[route.name] += 1
+        logger.info(f"模型路由: {route.name} ({route.model}), token {features['tokens']}, "
+                    f"语言 {features['language']}, OCR质量 {features['ocr_quality']:.2f}")
+        return route
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return self.stats.copy()
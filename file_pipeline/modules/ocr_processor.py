@@ -3,6 +3,7 @@ import json
 from pathlib import Path
 from typing import Optional
 from utils.logger import setup_logger
+from utils.deadline import DeadlineExceeded, remaining_timeout, deadline_expired
 from config.settings import UPLOAD_DIRS
 
 logger = setup_logger("ocr_processor")
@@ -15,7 +16,7 @@ class MinerUProcessor:
         self.temp_dir.mkdir(exist_ok=True)
     
     def process_pdf(self, pdf_path: Path) -> Optional[str]:
-        """使用MinerU处理PDF文件"""
+        """使用MinerU处理PDF文件，超时取5分钟与当前文件剩余时间预算中的较小值，预算耗尽时抛出DeadlineExceeded"""
         try:
             logger.info(f"开始MinerU OCR处理: {pdf_path}")
             
@@ -46,7 +47,7 @@ class MinerUProcessor:
                 check=True, 
                 capture_output=True, 
                 text=True,
-                timeout=300,  # 5分钟超时
+                timeout=remaining_timeout("ocr", 300),  # 最多5分钟，不超过文件剩余预算
                 shell=True    # Windows环境下需要shell=True
             )
             
@@ -64,7 +65,12 @@ class MinerUProcessor:
                 logger.warning(f"未找到有效的markdown内容: {pdf_path}")
                 return self._fallback_text_extraction(pdf_path)
                 
+        except DeadlineExceeded:
+            raise
         except subprocess.TimeoutExpired:
+            if deadline_expired():
+                logger.error(f"MinerU处理超出文件时间预算: {pdf_path}")
+                raise DeadlineExceeded("ocr")
             logger.error(f"MinerU处理超时: {pdf_path}")
             return self._fallback_text_extraction(pdf_path)
         except subprocess.CalledProcessError as e:
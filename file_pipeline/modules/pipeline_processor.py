@@ -1,16 +1,37 @@
+import hashlib
+import json
 import queue
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
 
 from modules.ocr_processor import MinerUProcessor
-from modules.llm_processor import LLMProcessor
+from modules.llm_processor import LLMProcessor, TAG_INPUT_FIELDS
+from modules.markdown_compactor import MarkdownCompactor
+from modules.model_router import ModelRouter
 from utils.database import DatabaseManager
 from utils.file_manager import FileManager
 from utils.logger import setup_logger
-from config.settings import MAX_WORKERS
+from config.settings import (
+    MAX_WORKERS, MARKDOWN_COMPACTION_ENABLED, MARKDOWN_SECTION_MAX_CHARS, COMPACTION_STATS_FILE,
+    LLM_STREAMING_ENABLED, LLM_ADAPTIVE_CONCURRENCY_ENABLED, LLM_CONCURRENCY_MAX,
+    OCR_SINGLEFLIGHT_ENABLED, FILE_DEADLINE_SECONDS,
+    DEGRADED_MODE_ENABLED, DEFERRED_QUEUE_PATH, DEFERRED_DRAIN_PER_MINUTE, DEFERRED_RETRY_DELAY,
+    DEFERRED_MAX_ATTEMPTS
+)
 from extraction.extraction_service import ExtractionService
 from utils.tag_validator import TagValidator
+from utils.token_counter import count_tokens
+from utils.usage_tracker import usage_context, update_usage_context, bind_usage_context
+from utils.singleflight import SingleFlight
+from utils.openai_client_manager import OpenAIClientManager
+from utils.circuit_breaker import ProviderUnavailable
+from utils.deferred_queue import DeferredQueue
+from utils.deadline import (
+    Deadline, DeadlineExceeded, DeadlineMetrics, deadline_scope, deadline_stage, bind_deadline,
+    get_deadline, remaining_timeout
+)
 
 logger = setup_logger("pipeline_processor")
 
@@ -20,12 +41,21 @@ class PipelineProcessor:
     def __init__(self):
         self.ocr_processor = MinerUProcessor()
         self.llm_processor = LLMProcessor()
-        self.extractor = ExtractionService().get_instance()
+        self.extractor = ExtractionService.get_instance()
         self.database = DatabaseManager()
         self.file_manager = FileManager()
         self.tag_validator = TagValidator()
+        self.markdown_compactor = MarkdownCompactor(section_max_chars=MARKDOWN_SECTION_MAX_CHARS)
+        self._compaction_stats_lock = threading.Lock()
         
-        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        # 启用自适应并发时由LLM调用层控制实际并发，文件线程数放宽到并发上限，OCR仍最多MAX_WORKERS个同时进行
+        file_workers = max(MAX_WORKERS, LLM_CONCURRENCY_MAX) if LLM_ADAPTIVE_CONCURRENCY_ENABLED else MAX_WORKERS
+        self.executor = ThreadPoolExecutor(max_workers=file_workers)
+        self.ocr_slots = threading.BoundedSemaphore(MAX_WORKERS)
+        # 同一PDF重复上传时，进行中的OCR只执行一次
+        self.ocr_flight = SingleFlight("ocr")
+        # 流式解析时提前执行标签分析的线程池，与文件处理线程池分开避免互相占满
+        self.stage_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
         self.running = False
         self.stats = {
             'total_processed': 0,
@@ -33,8 +63,22 @@ class PipelineProcessor:
             'failed': 0,
             'ocr_failed': 0,
             'llm_failed': 0,
-            'db_failed': 0
+            'db_failed': 0,
+            'input_tokens_raw': 0,
+            'input_tokens_compacted': 0,
+            'compaction_truncated_files': 0,
+            'early_tag_analysis': 0,
+            'ocr_coalesced': 0,
+            'deadline_exceeded': 0,
+            'deferred': 0,
+            'deferred_completed': 0
         }
+        # 各处理阶段耗时和超出时间预算次数
+        self.deadline_metrics = DeadlineMetrics()
+        # 降级模式：LLM服务熔断时已完成OCR的文件存入持久队列，恢复后由后台线程按限定速率处理
+        self.deferred_queue = DeferredQueue(DEFERRED_QUEUE_PATH) if DEGRADED_MODE_ENABLED else None
+        self._drain_stop = threading.Event()
+        self._drain_thread = None
     
     def start_processing(self, file_queue: queue.Queue):
         """开始处理队列中的文件"""
@@ -46,6 +90,11 @@ class PipelineProcessor:
             logger.error("依赖检查失败，处理器无法启动")
             return
         
+        if self.deferred_queue is not None:
+            self._drain_stop.clear()
+            self._drain_thread = threading.Thread(target=self._drain_deferred, daemon=True)
+            self._drain_thread.start()
+        
         try:
             while self.running:
                 try:
@@ -72,10 +121,22 @@ class PipelineProcessor:
     def stop_processing(self):
         """停止处理器"""
         self.running = False
+        self._drain_stop.set()
+        if self._drain_thread is not None:
+            self._drain_thread.join()
         self.executor.shutdown(wait=True)
+        self.stage_executor.shutdown(wait=True)
         logger.info("Pipeline处理器已停止")
     
     def _process_single_file(self, file_path: Path):
+        """处理单个文件，期间的LLM调用用量计入该文件，OCR、LLM和数据库调用受文件时间预算约束"""
+        deadline = None
+        if FILE_DEADLINE_SECONDS > 0:
+            deadline = Deadline(FILE_DEADLINE_SECONDS, file_path.name, self.deadline_metrics)
+        with usage_context(entity_type="resume_file", entity_id=file_path.name), deadline_scope(deadline):
+            self._process_file(file_path)
+
+    def _process_file(self, file_path: Path):
         """处理单个文件"""
         file_id = None
         start_time = time.time()
@@ -93,11 +154,13 @@ class PipelineProcessor:
             file_id = self.database.create_resume_file_record(processing_path)
             if not file_id:
                 raise Exception("创建数据库记录失败")
+            update_usage_context(entity_id=file_id)
             
             # 3. OCR处理
             self.database.update_ocr_status(file_id, "processing")
             
-            markdown_content = self.ocr_processor.process_pdf(processing_path)
+            with deadline_stage("ocr"):
+                markdown_content = self._run_ocr(processing_path)
             if not markdown_content:
                 self.database.update_ocr_status(file_id, "failed", "OCR处理失败")
                 self.stats['ocr_failed'] += 1
@@ -106,55 +169,18 @@ class PipelineProcessor:
             self.database.update_ocr_status(file_id, "completed")
             logger.info(f"OCR处理完成: {file_path.name}")
             
-            # 4. LLM解析
-            self.database.update_llm_status(file_id, "processing")
-            
-            parsed_data = self.llm_processor.parse_resume_content(markdown_content)
-            if not parsed_data:
-                self.database.update_llm_status(file_id, "failed", "LLM解析失败")
-                self.stats['llm_failed'] += 1
-                raise Exception("LLM解析失败")
-            
-            # 验证解析结果
-            if not self.llm_processor.validate_parsed_data(parsed_data):
-                self.database.update_llm_status(file_id, "failed", "解析数据验证失败")
-                self.stats['llm_failed'] += 1
-                raise Exception("解析数据验证失败")
-
-            # 5. **新增：标签分析**
-            logger.info("开始标签分析...")
-            logger.info(f"传递给标签分析的数据类型: {type(parsed_data)}")
-            tag_analysis = self.llm_processor.analyze_resume_tags(parsed_data)
-            if not tag_analysis:
-                logger.warning("标签分析失败，使用默认分类")
-                tag_analysis = {"category": "非技术类", "tags": [], "reasoning": "标签分析失败，默认分类"}
-            
-            # 验证和过滤标签
-            category = tag_analysis["category"]
-            raw_tags = tag_analysis["tags"]
-            valid_tags = self.tag_validator.filter_valid_tags(raw_tags, category)
-            
-            logger.info(f"标签分析结果: {category}, 原始标签{len(raw_tags)}个, 有效标签{len(valid_tags)}个")
-
-            # 6. 创建简历档案 (修改为包含标签)
-            profile_id = self.database.create_resume_profile_with_tags(
-                file_id, parsed_data, valid_tags
-            )
-            if not profile_id:
-                self.database.update_llm_status(file_id, "failed", "创建简历档案失败")
-                self.stats['db_failed'] += 1
-                raise Exception("创建简历档案失败")
-            
-            self.database.update_llm_status(file_id, "completed")
-            
-            # 7. 移动到完成目录
-            completed_path = self.file_manager.move_to_completed(processing_path)
-            if not completed_path:
-                logger.warning(f"移动到完成目录失败: {processing_path}")
+            # 4~8. LLM解析、标签分析、创建档案；LLM服务熔断时存入待处理队列，文件留在处理目录
+            if self.deferred_queue is not None and not OpenAIClientManager.provider_available():
+                self._defer_llm(file_id, processing_path, markdown_content, "LLM服务熔断中")
+                return
+            try:
+                profile_id, category, valid_tags = self._run_llm_stages(file_id, file_path.name, processing_path, markdown_content)
+            except ProviderUnavailable as e:
+                if self.deferred_queue is None:
+                    raise
+                self._defer_llm(file_id, processing_path, markdown_content, str(e))
+                return
             
-            # 8. 清理临时文件
-            self.ocr_processor.cleanup_temp_files(processing_path)
-
             # 9. 移除原有的异步标签提取，因为已经在这里完成了
             # self.extractor.push({"starter": "pipeline", "payload": {'id': profile_id, 'data': parsed_data}})
             
@@ -170,6 +196,10 @@ class PipelineProcessor:
             
             logger.error(f"文件处理失败: {file_path.name}, 错误: {error_msg}")
             
+            deadline = get_deadline()
+            if isinstance(e, DeadlineExceeded) or (deadline is not None and deadline.expired):
+                self._record_deadline_failure(file_id, deadline, e)
+            
             # 移动到失败目录
             try:
                 processing_path = self.file_manager.dirs['processing'] / file_path.name
@@ -186,6 +216,235 @@ class PipelineProcessor:
             except:
                 pass
     
+    def _run_llm_stages(self, file_id: str, file_name: str, processing_path: Path, markdown_content: str):
+        """OCR之后的处理：LLM解析、标签分析、创建简历档案并移到完成目录，返回(档案ID, 分类, 标签)
+
+        解析失败且LLM服务已熔断时抛出ProviderUnavailable，由调用方存入待处理队列
+        """
+        # 4. LLM解析（先压缩markdown以减少输入token）
+        self.database.update_llm_status(file_id, "processing")
+        
+        truncated_chars = 0
+        if MARKDOWN_COMPACTION_ENABLED:
+            llm_input, truncated_chars = self.markdown_compactor.compact_with_stats(markdown_content)
+        else:
+            llm_input = markdown_content
+        llm_start_time = time.time()
+        early_tags = {}
+        on_field = self._make_early_tag_callback(early_tags) if LLM_STREAMING_ENABLED else None
+        # OCR质量按压缩前的原文估算，供模型路由使用
+        ocr_quality = ModelRouter.ocr_quality(markdown_content) if self.llm_processor.model_router else None
+        with deadline_stage("llm_parse"):
+            parsed_data = self.llm_processor.parse_resume_content(llm_input, on_field=on_field, ocr_quality=ocr_quality)
+        self._record_compaction_stats(file_name, file_id, markdown_content, llm_input, time.time() - llm_start_time,
+                                      truncated_chars)
+        if not parsed_data:
+            if not OpenAIClientManager.provider_available():
+                raise ProviderUnavailable("LLM解析失败，LLM服务已熔断")
+            self.database.update_llm_status(file_id, "failed", "LLM解析失败")
+            self.stats['llm_failed'] += 1
+            raise Exception("LLM解析失败")
+        
+        # 验证解析结果
+        if not self.llm_processor.validate_parsed_data(parsed_data):
+            self.database.update_llm_status(file_id, "failed", "解析数据验证失败")
+            self.stats['llm_failed'] += 1
+            raise Exception("解析数据验证失败")
+
+        # 5. **新增：标签分析**
+        logger.info("开始标签分析...")
+        logger.info(f"传递给标签分析的数据类型: {type(parsed_data)}")
+        tag_analysis = None
+        with deadline_stage("tag_analysis"):
+            if 'future' in early_tags:
+                # 流式解析期间已提前开始的标签分析
+                tag_analysis = early_tags['future'].result()
+                self.stats['early_tag_analysis'] += 1
+            if not tag_analysis:
+                tag_analysis = self.llm_processor.analyze_resume_tags(parsed_data)
+        if not tag_analysis:
+            logger.warning("标签分析失败，使用默认分类")
+            tag_analysis = {"category": "非技术类", "tags": [], "reasoning": "标签分析失败，默认分类"}
+        
+        # 验证和过滤标签
+        category = tag_analysis["category"]
+        raw_tags = tag_analysis["tags"]
+        valid_tags = self.tag_validator.filter_valid_tags(raw_tags, category)
+        
+        logger.info(f"标签分析结果: {category}, 原始标签{len(raw_tags)}个, 有效标签{len(valid_tags)}个")
+
+        # 6. 创建简历档案 (修改为包含标签)
+        with deadline_stage("db"):
+            profile_id = self.database.create_resume_profile_with_tags(
+                file_id, parsed_data, valid_tags
+            )
+        if not profile_id:
+            self.database.update_llm_status(file_id, "failed", "创建简历档案失败")
+            self.stats['db_failed'] += 1
+            raise Exception("创建简历档案失败")
+        
+        self.database.update_llm_status(file_id, "completed")
+        
+        # 7. 移动到完成目录
+        completed_path = self.file_manager.move_to_completed(processing_path)
+        if not completed_path:
+            logger.warning(f"移动到完成目录失败: {processing_path}")
+        
+        # 8. 清理临时文件
+        self.ocr_processor.cleanup_temp_files(processing_path)
+        
+        return profile_id, category, valid_tags
+    
+    def _defer_llm(self, file_id: str, processing_path: Path, markdown_content: str, reason: str):
+        """LLM服务不可用：OCR结果存入待处理队列，LLM状态保持pending，文件留在处理目录"""
+        self.deferred_queue.put(file_id, processing_path, {"markdown": markdown_content}, reason)
+        with deadline_scope(None):
+            self.database.update_llm_status(file_id, "pending")
+        self.stats['deferred'] += 1
+
+    def _drain_deferred(self):
+        """后台按DEFERRED_DRAIN_PER_MINUTE的速率处理待处理队列，LLM服务熔断期间暂停"""
+        interval = 60.0 / max(DEFERRED_DRAIN_PER_MINUTE, 1)
+        while not self._drain_stop.wait(interval):
+            if not OpenAIClientManager.provider_available():
+                continue
+            try:
+                for job in self.deferred_queue.claim(1):
+                    self.executor.submit(self._process_deferred, job)
+            except Exception as e:
+                logger.error(f"读取待处理队列失败: {e}")
+
+    def _process_deferred(self, job: dict):
+        """处理一个待处理队列中的文件：从OCR结果继续执行LLM阶段"""
+        processing_path = job["file_path"]
+        file_id = job["file_id"]
+        deadline = None
+        if FILE_DEADLINE_SECONDS > 0:
+            deadline = Deadline(FILE_DEADLINE_SECONDS, processing_path.name, self.deadline_metrics)
+
+        with usage_context(entity_type="resume_file", entity_id=file_id), deadline_scope(deadline):
+            try:
+                logger.info(f"处理延后的LLM任务: {processing_path.name} (第{job['attempts']}次)")
+                if not processing_path.exists():
+                    logger.warning(f"延后任务的文件已不在处理目录，放弃: {processing_path}")
+                    self.deferred_queue.complete(job["id"])
+                    return
+                profile_id, category, valid_tags = self._run_llm_stages(
+                    file_id, processing_path.name, processing_path, job["payload"]["markdown"]
+                )
+                self.deferred_queue.complete(job["id"])
+                self.stats['deferred_completed'] += 1
+                self.stats['successful'] += 1
+                logger.info(f"延后任务处理完成: {processing_path.name}, 档案ID: {profile_id}, 分类: {category}, 标签: {valid_tags}")
+
+            except ProviderUnavailable as e:
+                if job["attempts"] < DEFERRED_MAX_ATTEMPTS:
+                    self.deferred_queue.retry(job["id"], str(e), DEFERRED_RETRY_DELAY)
+                    with deadline_scope(None):
+                        self.database.update_llm_status(file_id, "pending")
+                    return
+                self._fail_deferred(job, f"LLM服务持续不可用: {e}")
+
+            except Exception as e:
+                self._fail_deferred(job, str(e))
+
+    def _fail_deferred(self, job: dict, error_msg: str):
+        """延后任务不再重试：移出队列并按普通失败处理"""
+        self.deferred_queue.complete(job["id"])
+        self.stats['failed'] += 1
+        logger.error(f"延后任务处理失败: {job['file_path'].name}, 错误: {error_msg}")
+        with deadline_scope(None):
+            try:
+                self.database.update_llm_status(job["file_id"], "failed", error_msg)
+            except Exception:
+                pass
+            if job["file_path"].exists():
+                self.file_manager.move_to_failed(job["file_path"], error_msg)
+
+    def _record_deadline_failure(self, file_id, deadline, error: Exception):
+        """超出时间预算的文件：解除预算约束后把失败原因写回对应阶段的状态"""
+        self.stats['deadline_exceeded'] += 1
+        stage = (deadline.overrun_stage if deadline is not None else None) or getattr(error, 'stage', 'unknown')
+        if not file_id:
+            return
+        with deadline_scope(None):
+            if stage == "ocr":
+                self.database.update_ocr_status(file_id, "failed", f"超出时间预算: {stage}")
+            else:
+                self.database.update_llm_status(file_id, "failed", f"超出时间预算: {stage}")
+
+    def _run_ocr(self, pdf_path: Path):
+        """执行OCR；内容相同的文件正在OCR时等待其结果而不重复处理"""
+        def ocr():
+            # 等待OCR名额的时间也计入文件预算
+            if not self.ocr_slots.acquire(timeout=remaining_timeout("ocr")):
+                raise DeadlineExceeded("ocr")
+            try:
+                return self.ocr_processor.process_pdf(pdf_path)
+            finally:
+                self.ocr_slots.release()
+
+        if not OCR_SINGLEFLIGHT_ENABLED:
+            return ocr()
+
+        digest = hashlib.sha256(pdf_path.read_bytes()).hexdigest()
+        try:
+            markdown_content, shared = self.ocr_flight.do(digest, ocr, timeout=remaining_timeout("ocr"))
+        except FutureTimeoutError:
+            raise DeadlineExceeded("ocr")
+        if shared:
+            self.stats['ocr_coalesced'] += 1
+            logger.info(f"复用进行中的OCR结果: {pdf_path.name}")
+        return markdown_content
+
+    def _make_early_tag_callback(self, early_tags: dict):
+        """生成流式解析的字段回调：标签分析所需字段到齐后立即提交标签分析，结果future存入early_tags"""
+        received = {}
+
+        def on_field(key, value):
+            received[key] = value
+            if 'future' not in early_tags and all(field in received for field in TAG_INPUT_FIELDS):
+                logger.info("标签分析所需字段已就绪，提前开始标签分析")
+                early_tags['future'] = self.stage_executor.submit(
+                    bind_deadline(bind_usage_context(self.llm_processor.analyze_resume_tags)), dict(received)
+                )
+
+        return on_field
+
+    def _record_compaction_stats(self, file_name: str, file_id: str, raw_content: str,
+                                 compacted_content: str, llm_seconds: float, truncated_chars: int = 0):
+        """记录单个文件压缩前后的字符数、token数、章节截断丢弃的字符数和LLM解析耗时"""
+        try:
+            if truncated_chars:
+                self.stats['compaction_truncated_files'] += 1
+                logger.warning(f"Markdown压缩截断了超长章节: {file_name}, 丢弃{truncated_chars}字符")
+            raw_tokens = count_tokens(raw_content)
+            compacted_tokens = count_tokens(compacted_content)
+            self.stats['input_tokens_raw'] += raw_tokens
+            self.stats['input_tokens_compacted'] += compacted_tokens
+            
+            saved_ratio = 1 - compacted_tokens / raw_tokens if raw_tokens else 0.0
+            logger.info(f"Markdown压缩: {file_name}, token {raw_tokens} -> {compacted_tokens} (减少{saved_ratio:.1%}), LLM耗时: {llm_seconds:.2f}秒")
+            
+            record = {
+                "file_name": file_name,
+                "file_id": file_id,
+                "compaction_enabled": MARKDOWN_COMPACTION_ENABLED,
+                "raw_chars": len(raw_content),
+                "compacted_chars": len(compacted_content),
+                "raw_tokens": raw_tokens,
+                "compacted_tokens": compacted_tokens,
+                "truncated_chars": truncated_chars,
+                "llm_seconds": round(llm_seconds, 3),
+                "recorded_at": time.strftime('%Y-%m-%dT%H:%M:%S')
+            }
+            with self._compaction_stats_lock:
+                with open(COMPACTION_STATS_FILE, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    
+        except Exception as e:
+            logger.warning(f"记录压缩统计失败: {e}")
+    
     def _check_dependencies(self) -> bool:
         """检查依赖是否可用"""
         try:
@@ -216,6 +475,16 @@ class PipelineProcessor:
         """获取处理统计信息"""
         return self.stats.copy()
     
+    def get_deadline_stats(self) -> dict:
+        """获取各阶段耗时和超出时间预算次数"""
+        return self.deadline_metrics.get_stats()
+    
+    def get_deferred_stats(self) -> dict:
+        """获取待处理队列统计，未启用降级模式时返回空字典"""
+        if self.deferred_queue is None:
+            return {}
+        return self.deferred_queue.get_stats()
+    
     def get_directory_stats(self) -> dict:
         """获取目录统计信息"""
         return self.file_manager.get_directory_stats()
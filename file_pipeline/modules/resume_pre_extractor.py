@@ -0,0 +1,169 @@
+import copy
+import re
+from typing import Optional, Dict, Any, List, Tuple
+
+from modules.resume_segmenter import ResumeSegmenter
+from utils.resume_dates import (
+    YearMonth, find_date_ranges, parse_resume_date, format_resume_date, is_present, PRESENT
+)
+from utils.logger import setup_logger
+
+logger = setup_logger("resume_pre_extractor")
+
+_EMAIL = re.compile(r'[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}')
+_CN_MOBILE = re.compile(r'(?<!\d)(?:\+?86[\s\-]?)?(1[3-9]\d)[\s\-]?(\d{4})[\s\-]?(\d{4})(?!\d)')
+_INTL_PHONE = re.compile(r'(?<![\w+])\+\d{1,3}[\s\-]?\(?\d{1,4}\)?(?:[\s\-]?\d{2,4}){2,3}(?!\d)')
+
+# 日期区间所在章节 -> 解析结果中对应的字段
+DATE_SECTIONS = {"work": "work_experience", "education": "education"}
+
+
+class ResumePreExtractor:
+    """在LLM解析前用正则从markdown中提取邮箱、电话和工作/教育经历的时间区间
+
+    - 提取到的邮箱、电话从请求的schema中去掉，解析后直接填入basic_info，减少输出token
+    - 时间区间作为提示传给LLM，解析后与LLM输出的日期核对：
+      开始日期与原文区间一致时统一为原文区间的规范格式（YYYY-MM），结束日期不一致时以原文为准；
+      LLM未给出日期且条目数与原文区间数相同时按顺序补齐
+    """
+
+    def __init__(self):
+        self.stats = {
+            'emails': 0,
+            'phones': 0,
+            'date_ranges': 0,
+            'dates_filled': 0,
+            'dates_normalized': 0,
+            'date_conflicts': 0
+        }
+
+    def extract(self, markdown_content: str) -> Dict[str, Any]:
+        """提取邮箱、电话和按章节分组的时间区间"""
+        email = _EMAIL.search(markdown_content)
+        phone = self._find_phone(markdown_content)
+
+        # 章节与ResumeSegmenter使用同一标题规则，经历中的"项目：xxx"等标签行不会切换章节
+        date_ranges: Dict[str, List[Tuple[YearMonth, Optional[YearMonth], str]]] = {}
+        section = None
+        for line in markdown_content.split('\n'):
+            heading = ResumeSegmenter.classify_heading(line)
+            if heading is not None:
+                section = heading
+                continue
+            if section in DATE_SECTIONS:
+                date_ranges.setdefault(section, []).extend(find_date_ranges(line))
+
+        result = {
+            "email": email.group(0) if email else None,
+            "phone": phone,
+            "date_ranges": date_ranges
+        }
+        self.stats['emails'] += 1 if result["email"] else 0
+        self.stats['phones'] += 1 if result["phone"] else 0
+        self.stats['date_ranges'] += sum(len(ranges) for ranges in date_ranges.values())
+        logger.debug(f"预提取: email={result['email']}, phone={result['phone']}, "
+                     f"区间={ {name: len(ranges) for name, ranges in date_ranges.items()} }")
+        return result
+
+    @staticmethod
+    def _find_phone(text: str) -> Optional[str]:
+        match = _CN_MOBILE.search(text)
+        if match:
+            return ''.join(match.groups())
+        match = _INTL_PHONE.search(text)
+        return match.group(0).strip() if match else None
+
+    @staticmethod
+    def slim_schema(schema: Dict[str, Any], pre_extracted: Dict[str, Any]) -> Dict[str, Any]:
+        """从schema的basic_info中去掉已在本地提取到的email/phone"""
+        local_fields = [field for field in ("email", "phone") if pre_extracted.get(field)]
+        if not local_fields or "basic_info" not in schema["properties"]:
+            return schema
+
+        slimmed = copy.deepcopy(schema)
+        basic_info = slimmed["properties"]["basic_info"]
+        for field in local_fields:
+            basic_info["properties"].pop(field, None)
+            basic_info["required"] = [name for name in basic_info["required"] if name != field]
+        return slimmed
+
+    @staticmethod
+    def hint_message(pre_extracted: Dict[str, Any], sections: Optional[List[str]] = None) -> Optional[Dict[str, str]]:
+        """生成时间区间提示消息，没有可提示的区间时返回None"""
+        lines = []
+        for section, field in DATE_SECTIONS.items():
+            if sections is not None and section not in sections:
+                continue
+            ranges = pre_extracted.get("date_ranges", {}).get(section)
+            if ranges:
+                formatted = "；".join(
+                    f"{format_resume_date(start)} ~ {format_resume_date(end) if end else PRESENT}"
+                    for start, end, _ in ranges
+                )
+                lines.append(f"{field}: {formatted}")
+        if not lines:
+            return None
+        return {
+            "role": "system",
+            "content": "原文中已识别出以下时间区间，请据此填写对应条目的start_date和end_date，"
+                       "格式为YYYY-MM，仍在进行中的填写至今：\n" + "\n".join(lines)
+        }
+
+    @staticmethod
+    def fill_contact(basic_info: Any, pre_extracted: Dict[str, Any]) -> Any:
+        """返回填入本地提取的邮箱、电话后的basic_info"""
+        if not isinstance(basic_info, dict):
+            return basic_info
+        return {**basic_info, **{field: pre_extracted[field] for field in ("email", "phone") if pre_extracted.get(field)}}
+
+    def reconcile(self, parsed_data: Dict[str, Any], pre_extracted: Dict[str, Any]) -> Dict[str, Any]:
+        """把本地提取的字段合并进LLM解析结果，并核对时间区间"""
+        if "basic_info" in parsed_data:
+            parsed_data["basic_info"] = self.fill_contact(parsed_data["basic_info"], pre_extracted)
+
+        for section, field in DATE_SECTIONS.items():
+            entries = parsed_data.get(field)
+            if isinstance(entries, list):
+                self._reconcile_dates(entries, pre_extracted.get("date_ranges", {}).get(section, []))
+        return parsed_data
+
+    def _reconcile_dates(self, entries: List[Any], ranges: List[Tuple[YearMonth, Optional[YearMonth], str]]):
+        entries = [entry for entry in entries if isinstance(entry, dict)]
+        unmatched = list(ranges)
+
+        for index, entry in enumerate(entries):
+            llm_start = parse_resume_date(entry.get("start_date", ""))
+            llm_end_text = entry.get("end_date", "")
+            llm_end = None if is_present(llm_end_text) else parse_resume_date(llm_end_text)
+
+            if llm_start is None:
+                # LLM没有给出日期，条目数与原文区间数一致时按顺序补齐
+                if len(entries) == len(ranges):
+                    start, end, _ = ranges[index]
+                    entry["start_date"] = format_resume_date(start)
+                    entry["end_date"] = format_resume_date(end) if end else PRESENT
+                    self.stats['dates_filled'] += 1
+                continue
+
+            matched = next((item for item in unmatched if self._same_date(item[0], llm_start)), None)
+            if matched is None:
+                entry["start_date"] = format_resume_date(llm_start)
+                if llm_end is not None or is_present(llm_end_text):
+                    entry["end_date"] = format_resume_date(llm_end) if llm_end else PRESENT
+                continue
+
+            unmatched.remove(matched)
+            start, end, _ = matched
+            same_end = (end is None and is_present(llm_end_text)) or \
+                (end is not None and llm_end is not None and self._same_date(end, llm_end))
+            if not same_end:
+                logger.info(f"日期冲突，以原文为准: LLM结束日期 {llm_end_text} -> 原文 {matched[2]}")
+                self.stats['date_conflicts'] += 1
+            entry["start_date"] = format_resume_date(start)
+            entry["end_date"] = format_resume_date(end) if end else PRESENT
+            self.stats['dates_normalized'] += 1
+
+    @staticmethod
+    def _same_date(a: YearMonth, b: YearMonth) -> bool:
+        """年份相同且月份相同（任一方缺少月份时只比较年份）"""
+        return a[0] == b[0] and (a[1] is None or b[1] is None or a[1] == b[1])
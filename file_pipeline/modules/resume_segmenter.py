@@ -0,0 +1,93 @@
+import re
+from typing import Dict, List, Optional
+from utils.logger import setup_logger
+
+logger = setup_logger("resume_segmenter")
+
+# 章节 -> 由该章节负责解析的简历字段（字段名与LLMProcessor.schema一致）
+SECTION_FIELDS = {
+    "basic": ["basic_info", "job_intention", "personal_expertise", "others"],
+    "education": ["education"],
+    "work": ["work_experience"],
+    "projects": ["projects"],
+    "skills": ["skills", "certifications", "languages"],
+}
+
+# 章节标题关键词：markdown标题去掉标点和空白后以关键词开头，或普通行去掉标点后恰好是关键词，即视为该章节
+SECTION_KEYWORDS = {
+    "basic": [
+        "基本信息", "个人信息", "个人资料", "联系方式", "求职意向", "求职目标", "自我评价", "个人评价",
+        "个人优势", "个人简介", "个人总结", "关于我", "profile", "summary", "objective",
+        "personalinformation", "contact", "aboutme"
+    ],
+    "education": ["教育经历", "教育背景", "学历", "教育", "education"],
+    "work": [
+        "工作经历", "工作经验", "实习经历", "实习经验", "职业经历", "工作履历", "workexperience",
+        "professionalexperience", "employment", "experience", "internship"
+    ],
+    "projects": ["项目经历", "项目经验", "项目", "projects", "projectexperience", "project"],
+    "skills": [
+        "专业技能", "技能", "技术栈", "证书", "资格证书", "语言能力", "荣誉", "获奖",
+        "skills", "certifications", "certificates", "languages", "awards"
+    ],
+}
+
+_HEADING_PREFIX = re.compile(r'^#{1,6}\s*')
+_HEADING_NOISE = re.compile(r'[\s#*_【】\[\]（）()<>《》:：|/·\-—]+')
+_MAX_HEADING_LENGTH = 20
+# "项目：支付系统"、"学历：本科" 这类冒号后带内容的标签行
+_LABEL_VALUE = re.compile(r'[:：]\s*\S')
+_EMPHASIS = re.compile(r'[*_]+')
+
+
+class ResumeSegmenter:
+    """基于规则的简历章节切分：按标题关键词把OCR markdown切成基本信息、教育、工作、项目、技能几块
+
+    识别为章节标题的行：以章节关键词开头的markdown标题行，或去掉标点后恰好是章节关键词的普通行（如"工作经历："）。
+    冒号后带内容的标签行（"项目：支付系统"、"学历：本科"）是正文，不是标题。
+    未识别的标题（如公司名）归入当前章节，第一个已识别标题之前的内容归入基本信息。
+    """
+
+    def __init__(self, min_sections: int = 3):
+        self.min_sections = min_sections
+
+    @staticmethod
+    def classify_heading(line: str) -> Optional[str]:
+        """判断一行是否为章节标题，返回章节名"""
+        stripped = line.strip()
+        if not stripped:
+            return None
+        is_markdown_heading = stripped.startswith('#')
+        text = _EMPHASIS.sub('', _HEADING_PREFIX.sub('', stripped))
+        if _LABEL_VALUE.search(text):
+            return None
+        normalized = _HEADING_NOISE.sub('', text).lower()
+        if not normalized or len(normalized) > _MAX_HEADING_LENGTH:
+            return None
+        # 普通行必须只有关键词本身，避免正文句子被误判
+        for section, keywords in SECTION_KEYWORDS.items():
+            for keyword in keywords:
+                if normalized == keyword or (is_markdown_heading and normalized.startswith(keyword)):
+                    return section
+        return None
+
+    def segment(self, markdown_content: str) -> Optional[Dict[str, str]]:
+        """切分章节，识别出的章节数（含基本信息）少于min_sections时返回None"""
+        blocks: Dict[str, List[str]] = {"basic": []}
+        current = "basic"
+
+        for line in markdown_content.split('\n'):
+            section = self.classify_heading(line)
+            if section is not None:
+                current = section
+                blocks.setdefault(current, [])
+            blocks[current].append(line)
+
+        sections = {name: '\n'.join(lines).strip() for name, lines in blocks.items()}
+        sections = {name: text for name, text in sections.items() if text}
+        if len(sections) < self.min_sections:
+            logger.info(f"识别到的章节不足{self.min_sections}个: {list(sections)}")
+            return None
+
+        logger.info("简历章节切分: " + ", ".join(f"{name}({len(text)}字符)" for name, text in sections.items()))
+        return sections
@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+本地OpenAI兼容桩服务
+功能：实现chat.completions（含stream）、files和batches（含cancel）接口，用于在不消耗API额度的情况下测试批处理和流式流程，
+并支持录制/回放真实响应、模拟延迟分布和注入429/超时错误，使吞吐实验可重复
+
+用法:
+  python openai_stub_server.py [--port 8011] [--batch-delay 2]
+  python openai_stub_server.py --mode record --fixtures fixtures.jsonl --upstream https://api.openai.com/v1
+  python openai_stub_server.py --mode replay --fixtures fixtures.jsonl --latency lognormal:1.5:0.4 --rate-limit-rate 0.05
+  然后设置 OPENAI_BASE_URL=http://127.0.0.1:8011/v1
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+sys.path.append('.')
+
+from utils.llm_cache import LLMResponseCache
+from utils.logger import setup_logger
+
+logger = setup_logger("openai_stub")
+
+
+def fake_value_from_schema(schema: Dict[str, Any]):
+    """按JSON Schema生成一个满足结构的最小值"""
+    schema_type = schema.get("type")
+    if "enum" in schema:
+        return schema["enum"][0]
+    if schema_type == "object":
+        properties = schema.get("properties", {})
+        return {key: fake_value_from_schema(value) for key, value in properties.items()}
+    if schema_type == "array":
+        return []
+    if schema_type in ("integer", "number"):
+        return 0
+    if schema_type == "boolean":
+        return False
+    return "暂无"
+
+
+def fake_chat_content(body: Dict[str, Any]) -> str:
+    """根据请求的response_format生成桩响应内容"""
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        schema = response_format.get("json_schema", {}).get("schema", {})
+        return json.dumps(fake_value_from_schema(schema), ensure_ascii=False)
+    if response_format.get("type") == "json_object":
+        return "{}"
+    return "其他"
+
+
+def build_chat_completion(body: Dict[str, Any], content: str) -> Dict[str, Any]:
+    """构造chat.completion响应体"""
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+    prompt_tokens = max(1, prompt_chars // 2)
+    completion_tokens = max(1, len(content) // 2)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o-mini"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+            "logprobs": None
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+def build_chat_completion_chunks(body: Dict[str, Any], completion: Dict[str, Any], chunk_chars: int = 8):
+    """把完整响应拆成chat.completion.chunk序列，stream_options.include_usage时末尾附带usage块"""
+    content = completion["choices"][0]["message"]["content"] or ""
+    base = {"id": completion["id"], "object": "chat.completion.chunk",
+            "created": completion["created"], "model": completion["model"]}
+
+    chunks = [dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])]
+    for start in range(0, len(content), chunk_chars):
+        delta = {"content": content[start:start + chunk_chars]}
+        chunks.append(dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}]))
+    chunks.append(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+
+    if (body.get("stream_options") or {}).get("include_usage"):
+        chunks.append(dict(base, choices=[], usage=completion["usage"]))
+    return chunks
+
+
+def fixture_key(body: Dict[str, Any]) -> str:
+    """录制/回放的匹配键，与客户端LLM缓存键一致（忽略stream等传输参数）"""
+    return LLMResponseCache.make_key(
+        body.get("model", "gpt-4o-mini"), body.get("messages", []), body.get("response_format"),
+        body.get("temperature"), body.get("max_tokens")
+    )
+
+
+class LatencyModel:
+    """模拟响应延迟分布
+
+    规格字符串：
+      none                  无延迟
+      fixed:SECONDS         固定延迟
+      uniform:LOW:HIGH      均匀分布
+      lognormal:MEDIAN:SIGMA 对数正态分布（长尾，接近真实网关）
+      recorded              使用录制时的真实耗时，无记录时为0
+    """
+
+    def __init__(self, spec: str = "none", rng: Optional[random.Random] = None):
+        self.spec = spec
+        parts = spec.split(":")
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+        self.rng = rng or random.Random()
+        expected = {"none": 0, "recorded": 0, "fixed": 1, "uniform": 2, "lognormal": 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"无效的延迟规格: {spec}")
+
+    def sample(self, recorded: Optional[float] = None) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(self.params[0], self.params[1])
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return median * self.rng.lognormvariate(0.0, sigma)
+        if self.kind == "recorded":
+            return recorded or 0.0
+        return 0.0
+
+
+class FixtureStore:
+    """录制的chat.completions响应，JSONL格式，每行包含key、request、response和latency"""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = Path(path) if path else None
+        self.fixtures: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.fixtures[record["key"]] = record
+            logger.info(f"加载录制响应: {len(self.fixtures)}条 ({self.path})")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.fixtures.get(key)
+
+    def add(self, key: str, request: Dict[str, Any], response: Dict[str, Any], latency: float):
+        record = {"key": key, "request": request, "response": response, "latency": round(latency, 3)}
+        with self.lock:
+            if key in self.fixtures:
+                return
+            self.fixtures[key] = record
+            if self.path is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class StubState:
+    """桩服务的内存状态：上传文件、批处理任务，以及chat请求的响应来源、延迟和错误注入配置
+
+    mode:
+      synth   按response_format合成最小合法响应（默认）
+      replay  按请求匹配录制的响应，未录制的请求合成响应（strict时返回404）
+      record  转发到upstream并把响应写入fixtures
+    """
+
+    def __init__(self, batch_delay: float, mode: str = "synth", fixtures: Optional[FixtureStore] = None,
+                 latency: Optional[LatencyModel] = None, rate_limit_rate: float = 0.0,
+                 timeout_rate: float = 0.0, timeout_seconds: float = 120.0, strict: bool = False,
+                 upstream: Optional[str] = None, seed: Optional[int] = None):
+        self.batch_delay = batch_delay
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+        self.mode = mode
+        self.fixtures = fixtures or FixtureStore(None)
+        self.rng = random.Random(seed)
+        self.latency = latency or LatencyModel("none")
+        self.latency.rng = self.rng
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.strict = strict
+        self.upstream = upstream.rstrip('/') if upstream else None
+        self.stats = {
+            'chat_requests': 0,
+            'replayed': 0,
+            'synthesized': 0,
+            'recorded': 0,
+            'upstream_errors': 0,
+            'replay_misses': 0,
+            'injected_429': 0,
+            'injected_timeouts': 0
+        }
+
+    def _count(self, name: str):
+        with self.lock:
+            self.stats[name] += 1
+
+    def inject_fault(self) -> Optional[str]:
+        """按配置的概率决定本次请求是否注入错误，返回 "rate_limit"、"timeout" 或None"""
+        with self.lock:
+            self.stats['chat_requests'] += 1
+            roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            self._count('injected_429')
+            return "rate_limit"
+        if roll < self.rate_limit_rate + self.timeout_rate:
+            self._count('injected_timeouts')
+            return "timeout"
+        return None
+
+    def complete(self, body: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], float, int]:
+        """生成chat.completion响应，返回(响应体, 需模拟的延迟秒数, HTTP状态码)"""
+        key = fixture_key(body)
+
+        if self.mode == "record":
+            return self._record(key, body)
+
+        if self.mode == "replay":
+            fixture = self.fixtures.get(key)
+            if fixture is not None:
+                self._count('replayed')
+                completion = dict(fixture["response"], id=f"chatcmpl-{uuid.uuid4().hex[:24]}", created=int(time.time()))
+                return completion, self.latency.sample(fixture.get("latency")), 200
+            self._count('replay_misses')
+            if self.strict:
+                return None, 0.0, 404
+
+        self._count('synthesized')
+        return build_chat_completion(body, fake_chat_content(body)), self.latency.sample(), 200
+
+    def _record(self, key: str, body: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], float, int]:
+        """转发到真实接口（统一用非流式请求），录制成功的响应"""
+        forward = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+        request = urllib.request.Request(
+            f"{self.upstream}/chat/completions",
+            data=json.dumps(forward, ensure_ascii=False).encode('utf-8'),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', '')}"
+            }
+        )
+        start = time.time()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout_seconds) as response:
+                completion = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            logger.warning(f"上游返回错误: {e.code}")
+            return {"error": {"message": e.read().decode('utf-8', 'replace'), "code": e.code}}, 0.0, e.code
+        except (OSError, ValueError) as e:
+            # 连接失败、超时（URLError、socket.timeout）或响应不是合法JSON
+            logger.warning(f"上游请求失败: {e}")
+            self._count('upstream_errors')
+            return {"error": {"message": f"upstream request failed: {e}", "type": "upstream_error", "code": 502}}, 0.0, 502
+
+        self.fixtures.add(key, forward, completion, time.time() - start)
+        self._count('recorded')
+        return completion, 0.0, 200
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            stats = self.stats.copy()
+        stats['mode'] = self.mode
+        stats['fixtures'] = len(self.fixtures.fixtures)
+        return stats
+
+    def add_file(self, content: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        meta = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed"
+        }
+        with self.lock:
+            self.files[file_id] = {"meta": meta, "content": content}
+        return meta
+
+    def create_batch(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        input_file = self.files.get(body.get("input_file_id"))
+        if input_file is None:
+            return None
+
+        output_lines = []
+        total = 0
+        for line in input_file["content"].decode('utf-8').splitlines():
+            if not line.strip():
+                continue
+            total += 1
+            request = json.loads(line)
+            request_body = request.get("body", {})
+            completion = build_chat_completion(request_body, fake_chat_content(request_body))
+            output_lines.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex[:24]}",
+                "custom_id": request.get("custom_id"),
+                "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": completion},
+                "error": None
+            }, ensure_ascii=False))
+
+        output_meta = self.add_file(("\n".join(output_lines) + "\n").encode('utf-8'), "batch_output.jsonl", "batch_output")
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body.get("endpoint"),
+            "input_file_id": body.get("input_file_id"),
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": total, "completed": 0, "failed": 0},
+            "_output_file_id": output_meta["id"],
+            "_ready_at": time.time() + self.batch_delay
+        }
+        with self.lock:
+            self.batches[batch_id] = batch
+        return self._public_batch(batch)
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                return None
+            if batch["status"] == "in_progress" and time.time() >= batch["_ready_at"]:
+                batch["status"] = "completed"
+                batch["output_file_id"] = batch["_output_file_id"]
+                batch["request_counts"]["completed"] = batch["request_counts"]["total"]
+                batch["completed_at"] = int(time.time())
+            return self._public_batch(batch)
+
+    def cancel_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """取消进行中的batch任务，已结束的任务原样返回"""
+        batch = self.get_batch(batch_id)
+        if batch is None:
+            return None
+        with self.lock:
+            batch = self.batches[batch_id]
+            if batch["status"] == "in_progress":
+                batch["status"] = "cancelled"
+                batch["cancelled_at"] = int(time.time())
+            return self._public_batch(batch)
+
+    @staticmethod
+    def _public_batch(batch: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in batch.items() if not k.startswith('_')}
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """OpenAI兼容接口的请求处理器"""
+
+    state: StubState = None
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, chunks):
+        """以SSE格式逐块发送流式响应"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _send_error(self, status: int, message: str):
+        self._send_json(status, {"error": {"message": message, "type": "stub_error", "code": status}})
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def do_POST(self):
+        path = self.path.split('?')[0].rstrip('/')
+        body = self._read_body()
+
+        if path.endswith("/chat/completions"):
+            self._handle_chat(json.loads(body or b"{}"))
+
+        elif path.endswith("/files"):
+            self._handle_file_upload(body)
+
+        elif path.endswith("/cancel") and "batches" in path.split('/'):
+            batch = self.state.cancel_batch(path.split('/')[-2])
+            if batch is None:
+                self._send_error(404, "batch not found")
+            else:
+                self._send_json(200, batch)
+
+        elif path.endswith("/batches"):
+            batch = self.state.create_batch(json.loads(body or b"{}"))
+            if batch is None:
+                self._send_error(404, "input file not found")
+            else:
+                self._send_json(200, batch)
+
+        else:
+            self._send_error(404, f"unknown endpoint: {path}")
+
+    def do_GET(self):
+        path = self.path.split('?')[0].rstrip('/')
+        parts = path.split('/')
+
+        if path.endswith("/stub/stats"):
+            self._send_json(200, self.state.get_stats())
+
+        elif "batches" in parts and parts[-1] != "batches":
+            batch = self.state.get_batch(parts[-1])
+            if batch is None:
+                self._send_error(404, "batch not found")
+            else:
+                self._send_json(200, batch)
+
+        elif "files" in parts and parts[-1] == "content":
+            stored = self.state.files.get(parts[-2])
+            if stored is None:
+                self._send_error(404, "file not found")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(stored["content"])))
+            self.end_headers()
+            self.wfile.write(stored["content"])
+
+        else:
+            self._send_error(404, f"unknown endpoint: {path}")
+
+    def _handle_chat(self, request: Dict[str, Any]):
+        """chat.completions：先按概率注入错误，再模拟延迟后返回录制或合成的响应"""
+        fault = self.state.inject_fault()
+        if fault == "rate_limit":
+            data = json.dumps({"error": {"message": "Rate limit reached (injected by stub)",
+                                         "type": "requests", "code": "rate_limit_exceeded"}}).encode('utf-8')
+            self.send_response(429)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("retry-after", "1")
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        if fault == "timeout":
+            # 不返回响应直到客户端超时，然后断开连接
+            time.sleep(self.state.timeout_seconds)
+            self.close_connection = True
+            return
+
+        completion, delay, status = self.state.complete(request)
+        if status != 200:
+            if completion is None:
+                self._send_error(status, "no recorded response for this request")
+            else:
+                self._send_json(status, completion)
+            return
+
+        if delay > 0:
+            time.sleep(delay)
+        if request.get("stream"):
+            self._send_stream(build_chat_completion_chunks(request, completion))
+        else:
+            self._send_json(200, completion)
+
+    def _handle_file_upload(self, body: bytes):
+        """解析multipart/form-data上传的文件"""
+        content_type = self.headers.get("Content-Type", "")
+        message = BytesParser(policy=default_policy).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode('utf-8') + body
+        )
+
+        purpose = "batch"
+        filename = "upload.jsonl"
+        content = None
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "purpose":
+                purpose = part.get_content().strip()
+            elif name == "file":
+                filename = part.get_filename() or filename
+                content = part.get_payload(decode=True)
+
+        if content is None:
+            self._send_error(400, "missing file")
+            return
+        self._send_json(200, self.state.add_file(content, filename, purpose))
+
+
+def create_server(host: str = "127.0.0.1", port: int = 8011, batch_delay: float = 2.0,
+                  state: Optional[StubState] = None) -> ThreadingHTTPServer:
+    """创建桩服务实例（测试中可在线程里调用serve_forever）"""
+    handler = type("BoundStubRequestHandler", (StubRequestHandler,), {"state": state or StubState(batch_delay)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="本地OpenAI兼容桩服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--batch-delay", type=float, default=2.0, help="批处理任务完成前的模拟耗时（秒）")
+    parser.add_argument("--mode", choices=["synth", "replay", "record"], default="synth", help="chat响应来源")
+    parser.add_argument("--fixtures", help="录制响应的JSONL文件（replay读取，record追加写入）")
+    parser.add_argument("--upstream", default=os.getenv("STUB_UPSTREAM_URL", "https://api.openai.com/v1"),
+                        help="record模式转发的真实接口地址，鉴权使用OPENAI_API_KEY")
+    parser.add_argument("--strict", action="store_true", help="replay模式下未录制的请求返回404而不是合成响应")
+    parser.add_argument("--latency", default="none",
+                        help="延迟分布: none | fixed:S | uniform:LOW:HIGH | lognormal:MEDIAN:SIGMA | recorded")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回429的请求比例")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="不响应直到超时的请求比例")
+    parser.add_argument("--timeout-seconds", type=float, default=120.0, help="模拟超时的挂起时长")
+    parser.add_argument("--seed", type=int, help="随机种子，固定后延迟和错误注入序列可重复")
+    args = parser.parse_args()
+
+    if args.mode != "synth" and not args.fixtures:
+        parser.error("replay/record模式需要指定 --fixtures")
+
+    state = StubState(
+        args.batch_delay,
+        mode=args.mode,
+        fixtures=FixtureStore(args.fixtures),
+        latency=LatencyModel(args.latency),
+        rate_limit_rate=args.rate_limit_rate,
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds,
+        strict=args.strict,
+        upstream=args.upstream,
+        seed=args.seed
+    )
+    server = create_server(args.host, args.port, args.batch_delay, state=state)
+    print(f"OpenAI桩服务已启动: http://{args.host}:{args.port}/v1 (mode={args.mode}, latency={args.latency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"桩服务统计: {json.dumps(state.get_stats(), ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
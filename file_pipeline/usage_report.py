@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+LLM用量报告
+功能：读取本地llm_usage表，按阶段汇总token、耗时、吞吐和费用，按prompt版本对比服务端前缀缓存命中，
+      计算单份简历成本并列出消耗最多的文件/职位
+
+用法:
+  python usage_report.py [--hours 24] [--top 10]
+"""
+
+import argparse
+import sys
+import time
+sys.path.append('.')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="LLM用量和费用报告")
+    parser.add_argument("--hours", type=float, default=24, help="统计最近多少小时，0表示全部")
+    parser.add_argument("--top", type=int, default=10, help="列出消耗最多的实体数量")
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+
+    from config.settings import LLM_USAGE_DB_PATH, LLM_MODEL_PRICING
+    from utils.usage_tracker import UsageTracker
+
+    if not LLM_USAGE_DB_PATH.exists():
+        print(f"没有用量记录: {LLM_USAGE_DB_PATH}")
+        return
+
+    tracker = UsageTracker(LLM_USAGE_DB_PATH, LLM_MODEL_PRICING)
+    since = time.time() - args.hours * 3600 if args.hours > 0 else 0.0
+    period = f"最近{args.hours:g}小时" if args.hours > 0 else "全部记录"
+
+    stages = tracker.stage_report(since)
+    if not stages:
+        print(f"{period}没有LLM调用记录")
+        return
+
+    print(f"=== 按阶段汇总（{period}） ===")
+    print(f"{'阶段':<28}{'调用':>7}{'缓存命中':>9}{'输入token':>12}{'其中缓存':>10}{'输出token':>11}"
+          f"{'平均耗时':>10}{'输出tok/s':>11}{'费用($)':>11}")
+    for item in stages:
+        print(f"{item['stage']:<28}{item['calls']:>7}{item['cache_hits']:>9}{item['prompt_tokens']:>12}"
+              f"{item['cached_tokens']:>10}{item['completion_tokens']:>11}{item['avg_latency']:>9.2f}s"
+              f"{item['completion_tokens_per_sec']:>11.1f}{item['cost_usd']:>11.4f}")
+    total_cost = sum(item['cost_usd'] for item in stages)
+    print(f"合计费用: ${total_cost:.4f}")
+
+    prompt_cache = tracker.prompt_cache_report(since)
+    if prompt_cache:
+        print("\n=== 服务端前缀缓存（按prompt版本） ===")
+        print(f"{'阶段':<28}{'prompt版本':<28}{'请求':>7}{'命中请求':>9}{'缓存token占比':>14}"
+              f"{'平均耗时':>10}{'平均费用($)':>13}")
+        for item in prompt_cache:
+            print(f"{item['stage']:<28}{item['prompt_version']:<28}{item['requests']:>7}{item['cached_requests']:>9}"
+                  f"{item['cached_ratio']:>14.1%}{item['avg_latency_ms'] / 1000:>9.2f}s{item['avg_cost_usd']:>13.5f}")
+
+    resumes = tracker.entity_report(since, entity_type="resume_file")
+    if resumes:
+        resume_cost = sum(item['cost_usd'] for item in resumes)
+        resume_tokens = sum(item['total_tokens'] for item in resumes)
+        print("\n=== 单份简历成本（pipeline处理的文件） ===")
+        print(f"简历数: {len(resumes)}")
+        print(f"平均费用: ${resume_cost / len(resumes):.5f}")
+        print(f"平均token: {resume_tokens / len(resumes):.0f}")
+
+    offenders = tracker.entity_report(since, limit=args.top)
+    if offenders:
+        print(f"\n=== 消耗最多的{len(offenders)}个文件/职位 ===")
+        for item in offenders:
+            print(f"{item['entity_type']}:{item['entity_id']}  费用 ${item['cost_usd']:.5f}, "
+                  f"token {item['total_tokens']}, 调用 {item['calls']}次, LLM耗时 {item['latency_ms'] / 1000:.1f}秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import time
+from threading import Condition
+from typing import Optional
+from utils.logger import setup_logger
+
+logger = setup_logger("adaptive_concurrency")
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_OVERLOAD = "overload"  # 429或超时，说明超过了服务端实际容量
+OUTCOME_ERROR = "error"        # 其他错误，不调整并发上限
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD自适应并发控制：限制同时进行的LLM请求数
+
+    - 加性增：请求成功且耗时不超过基线的latency_tolerance倍时，上限每完成约一个上限数量的请求增加1
+    - 乘性减：遇到429或超时时上限乘以decrease_factor；cooldown秒内只减一次，
+      避免同一批并发请求的连续失败把上限压到最低
+    - 基线耗时：成功请求耗时的指数移动平均
+    """
+
+    def __init__(self, initial_limit: int = 3, min_limit: int = 1, max_limit: int = 16,
+                 latency_tolerance: float = 2.0, decrease_factor: float = 0.5, cooldown: float = 5.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._inflight = 0
+        self._baseline_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._condition = Condition()
+        self.stats = {
+            'acquired': 0,
+            'waited': 0,
+            'wait_seconds': 0.0,
+            'timeouts': 0,
+            'increases': 0,
+            'decreases': 0,
+            'peak_limit': int(self._limit)
+        }
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """阻塞直到有空闲的并发名额，超过timeout秒仍未获得时返回False"""
+        start = time.time()
+        waited = False
+        with self._condition:
+            while self._inflight >= int(self._limit):
+                waited = True
+                remaining = None if timeout is None else timeout - (time.time() - start)
+                if remaining is not None and remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    self.stats['waited'] += 1
+                    self.stats['wait_seconds'] += time.time() - start
+                    return False
+                self._condition.wait(remaining)
+            self._inflight += 1
+            self.stats['acquired'] += 1
+            if waited:
+                self.stats['waited'] += 1
+                self.stats['wait_seconds'] += time.time() - start
+        return True
+
+    def release(self, outcome: str, latency: float):
+        """释放名额并根据请求结果调整上限"""
+        with self._condition:
+            self._inflight -= 1
+
+            if outcome == OUTCOME_SUCCESS:
+                healthy = self._baseline_latency is None or latency <= self._baseline_latency * self.latency_tolerance
+                self._baseline_latency = latency if self._baseline_latency is None else \
+                    0.9 * self._baseline_latency + 0.1 * latency
+                if healthy and self._limit < self.max_limit:
+                    previous = int(self._limit)
+                    self._limit = min(self._limit + 1.0 / self._limit, float(self.max_limit))
+                    if int(self._limit) > previous:
+                        self.stats['increases'] += 1
+                        self.stats['peak_limit'] = max(self.stats['peak_limit'], int(self._limit))
+                        logger.debug(f"LLM并发上限提高到 {int(self._limit)}")
+
+            elif outcome == OUTCOME_OVERLOAD:
+                now = time.time()
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self._limit = max(self._limit * self.decrease_factor, float(self.min_limit))
+                    self.stats['decreases'] += 1
+                    logger.warning(f"LLM请求过载，并发上限降低到 {int(self._limit)}")
+
+            self._condition.notify_all()
+
+    def get_stats(self) -> dict:
+        """获取并发控制统计信息，limit为当前并发上限"""
+        with self._condition:
+            stats = self.stats.copy()
+            stats['limit'] = int(self._limit)
+            stats['inflight'] = self._inflight
+            stats['baseline_latency'] = self._baseline_latency or 0.0
+        return stats
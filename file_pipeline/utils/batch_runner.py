@@ -0,0 +1,175 @@
+import io
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from threading import local
+from typing import Optional, Dict, Any, Callable
+from utils.logger import setup_logger
+
+logger = setup_logger("batch_runner")
+
+_collect_state = local()
+
+
+class BatchRequestDeferred(Exception):
+    """批处理收集模式下缓存未命中的请求已登记，等待Batch API返回结果"""
+
+
+class BatchCollector:
+    """收集一轮离线任务中缓存未命中的chat请求，按缓存键去重"""
+
+    def __init__(self):
+        self.requests: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, cache_key: str, request_kwargs: Dict[str, Any]):
+        self.requests.setdefault(cache_key, request_kwargs)
+
+
+def get_active_collector() -> Optional[BatchCollector]:
+    """获取当前线程正在使用的批处理收集器"""
+    return getattr(_collect_state, 'collector', None)
+
+
+def is_collecting() -> bool:
+    """当前线程是否处于批处理收集阶段（此阶段不应写数据库）"""
+    return get_active_collector() is not None
+
+
+class BatchRunner:
+    """提交OpenAI Batch API任务，轮询完成后把结果写回LLM缓存"""
+
+    def __init__(self, client, cache, batch_dir: Path, poll_interval: int = 30,
+                 completion_window: str = "24h", max_wait: int = 7200):
+        self.client = client
+        self.cache = cache
+        self.batch_dir = Path(batch_dir)
+        self.batch_dir.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self.max_wait = max_wait
+
+    def write_batch_file(self, requests: Dict[str, Dict[str, Any]]) -> Path:
+        """将请求写成Batch API要求的JSONL文件，custom_id即缓存键"""
+        batch_path = self.batch_dir / f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jsonl"
+        with open(batch_path, 'w', encoding='utf-8') as f:
+            for cache_key, body in requests.items():
+                line = {
+                    "custom_id": cache_key,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": body
+                }
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        logger.info(f"写入批处理文件: {batch_path}, 请求数: {len(requests)}")
+        return batch_path
+
+    def submit(self, batch_path: Path) -> str:
+        """上传批处理文件并创建batch任务"""
+        with open(batch_path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window
+        )
+        logger.info(f"提交批处理任务: {batch.id}, 输入文件: {input_file.id}")
+        return batch.id
+
+    def wait(self, batch_id: str):
+        """轮询直到batch任务结束，超过max_wait秒仍未结束时取消任务并返回None"""
+        deadline = time.monotonic() + self.max_wait if self.max_wait > 0 else None
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            counts = batch.request_counts
+            if counts is not None:
+                logger.info(f"批处理任务 {batch_id} 状态: {batch.status}, 完成 {counts.completed}/{counts.total}, 失败 {counts.failed}")
+            else:
+                logger.info(f"批处理任务 {batch_id} 状态: {batch.status}")
+
+            if batch.status in ("completed", "failed", "expired", "cancelled"):
+                return batch
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.warning(f"批处理任务 {batch_id} 等待超过 {self.max_wait} 秒，取消任务")
+                try:
+                    self.client.batches.cancel(batch_id)
+                except Exception as e:
+                    logger.warning(f"取消批处理任务失败: {e}")
+                return None
+            sleep_seconds = self.poll_interval
+            if deadline is not None:
+                sleep_seconds = max(0.0, min(sleep_seconds, deadline - time.monotonic()))
+            time.sleep(sleep_seconds)
+
+    def collect_results(self, batch, requests: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[str]]:
+        """下载输出文件，按custom_id映射回请求并写入缓存"""
+        results: Dict[str, Optional[str]] = {key: None for key in requests}
+
+        if batch.output_file_id:
+            output_text = self.client.files.content(batch.output_file_id).text
+            for line in io.StringIO(output_text):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    cache_key = record["custom_id"]
+                    response = record.get("response") or {}
+                    if response.get("status_code") != 200:
+                        logger.warning(f"批处理请求失败: {cache_key[:12]}, 状态码: {response.get('status_code')}")
+                        continue
+                    content = response["body"]["choices"][0]["message"]["content"]
+                except (KeyError, IndexError, ValueError) as e:
+                    logger.warning(f"解析批处理结果失败: {e}")
+                    continue
+
+                if cache_key in results and content:
+                    results[cache_key] = content
+                    self.cache.set(cache_key, requests[cache_key]["model"], content)
+
+        if batch.error_file_id:
+            logger.warning(f"批处理任务 {batch.id} 存在失败请求，错误文件: {batch.error_file_id}")
+
+        succeeded = sum(1 for content in results.values() if content is not None)
+        logger.info(f"批处理结果写入缓存: 成功 {succeeded}/{len(requests)}")
+        return results
+
+    def run(self, requests: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Optional[str]]]:
+        """执行一次完整的批处理：写文件、提交、轮询、回填缓存；等待超时返回None"""
+        batch_path = self.write_batch_file(requests)
+        batch_id = self.submit(batch_path)
+        batch = self.wait(batch_id)
+        if batch is None:
+            return None
+        return self.collect_results(batch, requests)
+
+
+def run_with_batch(job: Callable[[], Any], runner: Optional[BatchRunner], max_rounds: int = 3):
+    """以批处理模式执行离线任务
+
+    先在收集模式下运行job：缓存未命中的LLM请求被登记并抛出BatchRequestDeferred，
+    调用方跳过该记录的数据库写入。登记的请求通过Batch API执行并写回缓存后再运行下一轮，
+    多阶段调用（如润色后再解析）每轮推进一个阶段。最后以正常模式运行job，此时LLM调用基本都命中缓存，
+    批处理中失败的请求会退回同步调用；batch任务等待超时时不再进行后续轮次，直接以正常模式同步执行。
+    """
+    if runner is None:
+        logger.warning("LLM缓存未启用，无法使用批处理模式，改为同步执行")
+        return job()
+
+    for round_index in range(1, max_rounds + 1):
+        collector = BatchCollector()
+        _collect_state.collector = collector
+        try:
+            job()
+        finally:
+            _collect_state.collector = None
+
+        if not collector.requests:
+            break
+
+        logger.info(f"批处理第 {round_index} 轮: 收集到 {len(collector.requests)} 个请求")
+        if runner.run(collector.requests) is None:
+            logger.warning("批处理等待超时，剩余请求改为同步执行")
+            break
+
+    return job()
@@ -0,0 +1,109 @@
+import time
+from collections import deque
+from threading import Lock
+from typing import Optional
+from utils.logger import setup_logger
+
+logger = setup_logger("circuit_breaker")
+
+STATE_CLOSED = "closed"        # 正常
+STATE_OPEN = "open"            # 熔断：直接拒绝请求
+STATE_HALF_OPEN = "half_open"  # 试探：一次只放行一个探测请求
+
+RESULT_SUCCESS = "success"
+RESULT_FAILURE = "failure"     # 429、超时、连接失败、5xx等服务端故障
+RESULT_IGNORED = None          # 其他结果（请求参数错误、超出文件预算等），不计入健康度
+
+
+class ProviderUnavailable(Exception):
+    """LLM服务熔断中，请求未发出"""
+
+
+class CircuitBreaker:
+    """LLM服务健康熔断器
+
+    - closed：最近window次请求中失败占比达到failure_threshold（且至少min_calls次）时熔断
+    - open：open_seconds内拒绝所有请求，之后进入half_open
+    - half_open：一次只放行一个探测请求，成功则恢复closed，失败则重新熔断
+    """
+
+    def __init__(self, failure_threshold: float = 0.5, min_calls: int = 5, window: int = 20,
+                 open_seconds: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+
+        self._results = deque(maxlen=window)
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = Lock()
+        self.stats = {
+            'opened': 0,
+            'rejected': 0,
+            'probes': 0
+        }
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == STATE_OPEN and time.time() - self._opened_at >= self.open_seconds:
+            self._state = STATE_HALF_OPEN
+            self._probe_started = None
+            logger.info("LLM服务熔断时间结束，进入试探状态")
+        return self._state
+
+    def allow(self) -> bool:
+        """是否放行本次请求；half_open时只放行一个探测请求（探测超过open_seconds未结束时再放行一个）"""
+        with self._lock:
+            state = self._current_state()
+            if state == STATE_CLOSED:
+                return True
+            if state == STATE_HALF_OPEN:
+                now = time.time()
+                if self._probe_started is None or now - self._probe_started >= self.open_seconds:
+                    self._probe_started = now
+                    self.stats['probes'] += 1
+                    return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record(self, result: Optional[str]):
+        """记录一次请求结果"""
+        with self._lock:
+            state = self._current_state()
+            if state == STATE_HALF_OPEN:
+                self._probe_started = None
+                if result == RESULT_SUCCESS:
+                    self._state = STATE_CLOSED
+                    self._results.clear()
+                    logger.info("LLM服务探测成功，恢复正常")
+                elif result == RESULT_FAILURE:
+                    self._open()
+                return
+
+            if result is RESULT_IGNORED:
+                return
+            self._results.append(result == RESULT_FAILURE)
+            failures = sum(self._results)
+            if state == STATE_CLOSED and len(self._results) >= self.min_calls and \
+                    failures / len(self._results) >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self._state = STATE_OPEN
+        self._opened_at = time.time()
+        self._results.clear()
+        self.stats['opened'] += 1
+        logger.warning(f"LLM服务故障率过高，熔断{self.open_seconds:.0f}秒")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = self.stats.copy()
+            stats['state'] = self._current_state()
+            stats['recent_failures'] = sum(self._results)
+            stats['recent_calls'] = len(self._results)
+        return stats
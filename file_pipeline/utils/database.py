@@ -1,10 +1,13 @@
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from pathlib import Path
 import time
 from utils.logger import setup_logger
-from config.settings import SUPABASE_URL, SUPABASE_KEY
+from utils.resume_dates import parse_resume_date
+from utils.deadline import remaining_timeout
+from config.settings import SUPABASE_URL, SUPABASE_KEY, DB_REQUEST_TIMEOUT
 
 logger = setup_logger("database")
 
@@ -29,9 +32,13 @@ def retry_db_operation(max_retries=3, initial_delay=2):
         return wrapper
     return decorator
 
+def _create_client() -> Client:
+    """创建Supabase客户端，每次请求最多等待DB_REQUEST_TIMEOUT秒"""
+    return create_client(SUPABASE_URL, SUPABASE_KEY, options=ClientOptions(postgrest_client_timeout=DB_REQUEST_TIMEOUT))
+
 class DatabaseManager:
     def __init__(self):
-        self.client: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        self.client: Client = _create_client()
         self._connection_retries = 0
         self._max_connection_retries = 5
     
@@ -49,22 +56,32 @@ class DatabaseManager:
                     logger.error("数据库连接重试次数过多，需要手动检查")
                     raise e
                 # 重新创建客户端
-                self.client = create_client(SUPABASE_URL, SUPABASE_KEY)
+                self.client = _create_client()
                 time.sleep(2)
     
+    @staticmethod
+    def _execute(query):
+        """执行处理流程中的写入：文件时间预算已耗尽时不再发出请求
+
+        postgrest客户端不支持单次请求的超时，每次请求的等待上限为DB_REQUEST_TIMEOUT；
+        失败状态的更新不经过这里，预算耗尽后仍会写回
+        """
+        remaining_timeout("db")
+        return query.execute()
+    
     def create_resume_file_record(self, file_path: Path, user_id: Optional[str] = None) -> Optional[str]:
         """创建简历文件记录"""
         try:
             file_size = file_path.stat().st_size
             
-            result = self.client.table("files").insert({
+            result = self._execute(self.client.table("files").insert({
                 "file_name": file_path.name,
                 "storage_path": str(file_path),
                 "file_size": file_size,
                 "user_id": user_id,
                 "ocr_status": "pending",
                 "llm_status": "pending"
-            }).execute()
+            }))
             
             file_id = result.data[0]['id']
             logger.info(f"创建文件记录成功: {file_id}")
@@ -142,7 +159,7 @@ class DatabaseManager:
                 "raw_json": profile_data
             }
             
-            result = self.client.table("resume").insert(insert_data).execute()
+            result = self._execute(self.client.table("resume").insert(insert_data))
             profile_id = result.data[0]['id']
             
             logger.info(f"创建简历档案成功: {profile_id}")
@@ -181,7 +198,7 @@ class DatabaseManager:
                 "status": "tagged"  # 标记为已标签化
             }
             
-            result = self.client.table("resume").insert(insert_data).execute()
+            result = self._execute(self.client.table("resume").insert(insert_data))
             profile_id = result.data[0]['id']
             
             logger.info(f"创建简历档案成功: {profile_id}, 标签: {tags}")
@@ -200,32 +217,22 @@ class DatabaseManager:
             current_year = datetime.now().year
             
             for exp in work_experience:
-                start_date = exp.get("start_date", "")
-                end_date = exp.get("end_date", "")
-                
-                if not start_date or start_date == "暂无":
+                start = parse_resume_date(exp.get("start_date", ""))
+                if start is None:
                     continue
+                start_year = start[0]
                 
-                try:
-                    # 提取年份
-                    if "-" in start_date:
-                        start_year = int(start_date.split("-")[0])
-                    else:
-                        start_year = int(start_date[:4])
-                    
-                    if end_date and end_date != "暂无" and "至今" not in end_date and "现在" not in end_date:
-                        if "-" in end_date:
-                            end_year = int(end_date.split("-")[0])
-                        else:
-                            end_year = int(end_date[:4])
-                    else:
-                        end_year = current_year
-                    
-                    years = max(0, end_year - start_year)
-                    total_months += years * 12
-                    
-                except ValueError:
-                    continue
+                end_date = exp.get("end_date", "")
+                if end_date and end_date != "暂无" and "至今" not in end_date and "现在" not in end_date:
+                    end = parse_resume_date(end_date)
+                    if end is None:
+                        continue
+                    end_year = end[0]
+                else:
+                    end_year = current_year
+                
+                years = max(0, end_year - start_year)
+                total_months += years * 12
             
             return max(0, total_months // 12)
             
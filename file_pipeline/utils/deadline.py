@@ -0,0 +1,126 @@
+import time
+from contextlib import contextmanager
+from threading import Lock, local
+from typing import Optional, Callable, Dict
+from utils.logger import setup_logger
+
+logger = setup_logger("deadline")
+
+_deadline_state = local()
+
+
+class DeadlineExceeded(TimeoutError):
+    """文件处理超出时间预算，stage为预算耗尽时所在的调用类型（ocr、llm、db）"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"超出时间预算: {stage}")
+        self.stage = stage
+
+
+class DeadlineMetrics:
+    """按处理阶段统计耗时和超出预算次数（预算在该阶段内耗尽记一次）"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, stage: str, seconds: float, overrun: bool):
+        with self._lock:
+            item = self.stats.setdefault(stage, {'calls': 0, 'seconds': 0.0, 'overruns': 0})
+            item['calls'] += 1
+            item['seconds'] += seconds
+            if overrun:
+                item['overruns'] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {stage: item.copy() for stage, item in self.stats.items()}
+
+
+class Deadline:
+    """单个文件的处理期限，外部调用以剩余预算作为超时时间"""
+
+    def __init__(self, budget: float, label: str = "", metrics: Optional[DeadlineMetrics] = None):
+        self.budget = budget
+        self.label = label
+        self.metrics = metrics
+        self.expires_at = time.monotonic() + budget
+        self.overrun_stage: Optional[str] = None
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, stage: str, cap: Optional[float] = None) -> float:
+        """返回本次调用可用的超时时间（不超过cap），预算已耗尽时抛出DeadlineExceeded"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(stage)
+        return remaining if cap is None else min(remaining, cap)
+
+    @contextmanager
+    def stage(self, name: str):
+        """统计处理阶段耗时，预算在该阶段内耗尽时记为该阶段超出预算"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            overrun = self.overrun_stage is None and self.expired
+            if overrun:
+                self.overrun_stage = name
+                logger.warning(f"{self.label} 在{name}阶段超出时间预算({self.budget:.0f}秒)")
+            if self.metrics is not None:
+                self.metrics.record(name, time.monotonic() - start, overrun)
+
+
+def get_deadline() -> Optional[Deadline]:
+    """获取当前线程的处理期限，不在期限内时返回None"""
+    return getattr(_deadline_state, 'deadline', None)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    """在with块内的外部调用受deadline约束，传入None则解除约束（例如失败后写回状态）"""
+    previous = get_deadline()
+    _deadline_state.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _deadline_state.deadline = previous
+
+
+def bind_deadline(fn: Callable) -> Callable:
+    """把当前线程的处理期限绑定到fn，提交到线程池执行时仍受同一期限约束"""
+    deadline = get_deadline()
+
+    def wrapper(*args, **kwargs):
+        with deadline_scope(deadline):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def deadline_stage(name: str):
+    """当前期限的阶段统计，不在期限内时不做任何事"""
+    deadline = get_deadline()
+    if deadline is None:
+        yield
+        return
+    with deadline.stage(name):
+        yield
+
+
+def remaining_timeout(stage: str, default: Optional[float] = None) -> Optional[float]:
+    """外部调用应使用的超时时间：不在期限内时为default，否则为剩余预算（不超过default）"""
+    deadline = get_deadline()
+    if deadline is None:
+        return default
+    return deadline.timeout(stage, default)
+
+
+def deadline_expired() -> bool:
+    deadline = get_deadline()
+    return deadline is not None and deadline.expired
@@ -0,0 +1,101 @@
+import json
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Any, List
+from utils.logger import setup_logger
+
+logger = setup_logger("deferred_queue")
+
+
+class DeferredQueue:
+    """持久化的待处理LLM任务队列（SQLite）
+
+    LLM服务熔断期间已完成OCR的文件在这里排队，进程重启后仍保留；
+    claim取出的任务在lease_seconds内不会被再次取出，处理结束后由complete删除或retry延后重试。
+    """
+
+    def __init__(self, db_path: Path, lease_seconds: float = 600.0):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+
+        self._lock = Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS deferred_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_id TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_deferred_next ON deferred_jobs(next_attempt_at)")
+        self._conn.commit()
+
+    def put(self, file_id: str, file_path: Path, payload: Dict[str, Any], reason: str = ""):
+        """登记一个待处理任务，payload保存恢复处理所需的数据（如OCR结果）"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO deferred_jobs (file_id, file_path, payload, created_at, next_attempt_at, last_error)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (str(file_id), str(file_path), json.dumps(payload, ensure_ascii=False), now, now, reason)
+            )
+            self._conn.commit()
+        logger.info(f"LLM任务延后处理: {Path(file_path).name} ({reason})")
+
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        """取出最多limit个到期任务并加租约，按登记顺序"""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT id, file_id, file_path, payload, attempts FROM deferred_jobs
+                   WHERE next_attempt_at <= ? ORDER BY id LIMIT ?""",
+                (now, limit)
+            ).fetchall()
+            if rows:
+                self._conn.executemany(
+                    "UPDATE deferred_jobs SET attempts = attempts + 1, next_attempt_at = ? WHERE id = ?",
+                    [(now + self.lease_seconds, row[0]) for row in rows]
+                )
+                self._conn.commit()
+        return [
+            {"id": row[0], "file_id": row[1], "file_path": Path(row[2]), "payload": json.loads(row[3]),
+             "attempts": row[4] + 1}
+            for row in rows
+        ]
+
+    def complete(self, job_id: int):
+        """任务处理结束（成功或不再重试），从队列删除"""
+        with self._lock:
+            self._conn.execute("DELETE FROM deferred_jobs WHERE id = ?", (job_id,))
+            self._conn.commit()
+
+    def retry(self, job_id: int, error: str, delay: float):
+        """任务仍无法处理，delay秒后重试"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE deferred_jobs SET next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (time.time() + delay, error, job_id)
+            )
+            self._conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM deferred_jobs").fetchone()[0]
+
+    def get_stats(self) -> dict:
+        """队列长度和最早任务的等待时长（秒）"""
+        with self._lock:
+            count, oldest = self._conn.execute("SELECT COUNT(*), MIN(created_at) FROM deferred_jobs").fetchone()
+        return {
+            'size': count,
+            'oldest_age': time.time() - oldest if oldest else 0.0
+        }
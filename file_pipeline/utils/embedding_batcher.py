@@ -0,0 +1,92 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+import numpy as np
+from utils.logger import setup_logger
+
+logger = setup_logger("embedding_batcher")
+
+
+class EmbeddingBatcher:
+    """句向量编码的微批处理服务
+
+    各线程的encode请求进入同一个队列，后台线程取到第一个请求后最多再等待max_wait_ms毫秒收集并发到达的请求，
+    合并（去重）为一次批量编码后按请求拆分结果。调用方拿到Future；模型只由后台线程调用，线程之间不再争用模型。
+    编码失败时异常传给该批所有请求。
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'batches': 0,
+            'texts': 0,
+            'encoded': 0
+        }
+        self._thread = threading.Thread(target=self._worker, daemon=True, name="embedding-batcher")
+        self._thread.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        """提交一组文本，Future的结果为归一化句向量 shape: [文本数, 维度]"""
+        future = Future()
+        if not texts:
+            future.set_result(np.zeros((0, 0), dtype=np.float32))
+            return future
+        self._queue.put((list(texts), future))
+        return future
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self.submit(texts).result()
+
+    def _collect(self) -> list:
+        """阻塞取第一个请求，再在max_wait内收集后续请求，文本数达到max_batch_size即提前结束"""
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            texts = list(dict.fromkeys(text for request_texts, _ in batch for text in request_texts))
+            try:
+                embeddings = np.asarray(self.encode_fn(texts))
+            except Exception as e:
+                logger.warning(f"批量编码失败({len(texts)}条): {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            index = {text: i for i, text in enumerate(texts)}
+            for request_texts, future in batch:
+                future.set_result(embeddings[[index[text] for text in request_texts]])
+
+            with self._lock:
+                self.stats['requests'] += len(batch)
+                self.stats['batches'] += 1
+                self.stats['texts'] += sum(len(request_texts) for request_texts, _ in batch)
+                self.stats['encoded'] += len(texts)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = self.stats.copy()
+        stats['avg_batch_requests'] = stats['requests'] / stats['batches'] if stats['batches'] else 0.0
+        stats['pending'] = self._queue.qsize()
+        return stats
@@ -0,0 +1,118 @@
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Optional, List
+import numpy as np
+from utils.logger import setup_logger
+
+logger = setup_logger("embedding_cache")
+
+
+def normalize_text(text: str) -> str:
+    """缓存键：全角转半角（NFKC）、转小写、合并空白"""
+    return " ".join(unicodedata.normalize("NFKC", str(text)).lower().split())
+
+
+class EmbeddingCache:
+    """短文本（技能、领域、学历等）归一化句向量的LRU缓存
+
+    键为规范化后的文本，未命中的文本规范化后批量编码。
+    设置db_path时新编码的向量同时写入SQLite，启动时载入最近写入的max_entries条，重启后仍可命中。
+    """
+
+    def __init__(self, model_name: str, max_entries: int = 20000, db_path: Optional[Path] = None):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = Lock()
+        self._conn = None
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'loaded': 0
+        }
+
+        if db_path is not None:
+            db_path = Path(db_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS embedding_cache (
+                    model TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    dim INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (model, text)
+                )"""
+            )
+            self._conn.commit()
+            self._load()
+
+    def _load(self):
+        """载入最近写入的max_entries条，并删除更早的条目"""
+        rows = self._conn.execute(
+            "SELECT text, vector, dim FROM embedding_cache WHERE model = ? ORDER BY created_at DESC LIMIT ?",
+            (self.model_name, self.max_entries)
+        ).fetchall()
+        for text, vector, dim in reversed(rows):
+            self._entries[text] = np.frombuffer(vector, dtype=np.float32).reshape(dim)
+        self.stats['loaded'] = len(rows)
+        if len(rows) == self.max_entries:
+            self._conn.execute(
+                """DELETE FROM embedding_cache WHERE model = ? AND text NOT IN (
+                       SELECT text FROM embedding_cache WHERE model = ? ORDER BY created_at DESC LIMIT ?)""",
+                (self.model_name, self.model_name, self.max_entries)
+            )
+            self._conn.commit()
+        logger.info(f"载入句向量缓存: {len(rows)} 条")
+
+    def encode(self, encode_fn: Callable[[List[str]], np.ndarray], texts: List[str]) -> np.ndarray:
+        """返回texts的归一化句向量 shape: [文本数, 维度]，未命中的文本用encode_fn一次批量编码"""
+        keys = [normalize_text(text) for text in texts]
+        vectors = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    vectors[key] = vector
+            missing = list(dict.fromkeys(key for key in keys if key not in vectors))
+            # 同一批内重复的文本只编码一次，计为命中
+            self.stats['hits'] += len(keys) - len(missing)
+            self.stats['misses'] += len(missing)
+
+        if missing:
+            encoded = np.asarray(encode_fn(missing), dtype=np.float32)
+            with self._lock:
+                for key, vector in zip(missing, encoded):
+                    vectors[key] = vector
+                    self._entries[key] = vector
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.stats['evictions'] += 1
+                if self._conn is not None:
+                    now = time.time()
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO embedding_cache (model, text, vector, dim, created_at) VALUES (?, ?, ?, ?, ?)",
+                        [(self.model_name, key, vector.tobytes(), vector.shape[0], now) for key, vector in zip(missing, encoded)]
+                    )
+                    self._conn.commit()
+
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = self.stats.copy()
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
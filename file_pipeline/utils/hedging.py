@@ -0,0 +1,147 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, Optional
+
+from utils.logger import setup_logger
+
+logger = setup_logger("hedging")
+
+
+class LatencyTracker:
+    """按请求类型维护最近若干次耗时的滑动窗口，用于计算分位数"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key: str, q: float) -> Optional[float]:
+        """返回分位数耗时，样本不足min_samples时返回None"""
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        index = min(int(q * len(ordered)), len(ordered) - 1)
+        return ordered[index]
+
+
+class RequestHedger:
+    """对冲请求：主请求超过滚动分位数耗时仍未返回时发出一个副本，取先成功的结果
+
+    - 对冲延迟：同类请求最近耗时的percentile分位数，不低于min_delay
+    - 预算：对冲次数不超过总请求数的budget比例，限制额外成本
+    - 落后的请求若尚未开始则取消，已发出的请求无法中断，完成后结果交给on_discarded（用于记录用量）
+    """
+
+    def __init__(self, percentile: float = 0.95, window: int = 200, min_samples: int = 20,
+                 min_delay: float = 1.0, budget: float = 0.05, max_workers: int = 16):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget = budget
+        self.tracker = LatencyTracker(window, min_samples)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        self._lock = Lock()
+        self.stats = {
+            'requests': 0,
+            'hedged': 0,
+            'hedge_wins': 0,
+            'budget_skipped': 0
+        }
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """返回该类请求的对冲延迟，样本不足时返回None（不对冲）"""
+        delay = self.tracker.percentile(key, self.percentile)
+        return None if delay is None else max(delay, self.min_delay)
+
+    def _within_budget(self) -> bool:
+        with self._lock:
+            return self.stats['hedged'] + 1 <= self.budget * self.stats['requests']
+
+    def call(self, key: str, primary: Callable[[], Any], hedge: Callable[[], Any],
+             can_hedge: Optional[Callable[[], bool]] = None,
+             on_discarded: Optional[Callable[[Any], None]] = None) -> Any:
+        """执行primary，超过对冲延迟未返回时并发执行hedge，返回先成功的结果
+
+        can_hedge 在发出副本前调用（例如检查限流余量），返回False时放弃对冲；
+        on_discarded 在落后的请求成功完成后以其结果调用，请求尚未开始即被取消时以None调用，请求失败时不调用
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+
+        start = time.time()
+        delay = self.hedge_delay(key)
+        if delay is None:
+            result = primary()
+            self.tracker.record(key, time.time() - start)
+            return result
+
+        primary_future = self._executor.submit(primary)
+        if wait([primary_future], timeout=delay).done:
+            result = primary_future.result()
+            self.tracker.record(key, time.time() - start)
+            return result
+
+        if not self._within_budget() or (can_hedge is not None and not can_hedge()):
+            with self._lock:
+                self.stats['budget_skipped'] += 1
+            result = primary_future.result()
+            self.tracker.record(key, time.time() - start)
+            return result
+
+        with self._lock:
+            self.stats['hedged'] += 1
+        logger.debug(f"请求超过{delay:.2f}秒未返回，发出对冲请求: {key}")
+        hedge_future = self._executor.submit(hedge)
+
+        pending = {primary_future, hedge_future}
+        first_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    first_error = first_error or future.exception()
+                    continue
+                for other in pending:
+                    self._discard(other, on_discarded)
+                if future is hedge_future:
+                    with self._lock:
+                        self.stats['hedge_wins'] += 1
+                self.tracker.record(key, time.time() - start)
+                return future.result()
+
+        raise first_error
+
+    @staticmethod
+    def _discard(future, on_discarded: Optional[Callable[[Any], None]]):
+        """取消落后的请求；已经发出的请求在完成后把结果交给on_discarded"""
+        def notify(result):
+            try:
+                on_discarded(result)
+            except Exception as e:
+                logger.warning(f"处理落后请求结果失败: {e}")
+
+        if future.cancel():
+            if on_discarded is not None:
+                notify(None)
+            return
+        if on_discarded is not None:
+            future.add_done_callback(lambda f: notify(f.result()) if f.exception() is None else None)
+
+    def get_stats(self) -> dict:
+        """获取对冲统计信息"""
+        with self._lock:
+            stats = self.stats.copy()
+        stats['hedge_rate'] = stats['hedged'] / stats['requests'] if stats['requests'] else 0.0
+        stats['win_rate'] = stats['hedge_wins'] / stats['hedged'] if stats['hedged'] else 0.0
+        return stats
@@ -0,0 +1,110 @@
+import json
+from typing import Any, Callable, Dict, List, Optional
+from utils.logger import setup_logger
+
+logger = setup_logger("incremental_json")
+
+
+class IncrementalJSONObjectParser:
+    """增量解析流式输出的顶层JSON对象
+
+    逐块喂入文本，每当一个顶层字段的值完整时立即解析并回调 on_field(key, value)，
+    不必等待整个JSON结束。只跟踪字符串/转义状态和嵌套深度，字段值本身仍交给json.loads解析。
+    """
+
+    def __init__(self, on_field: Optional[Callable[[str, Any], None]] = None):
+        self.on_field = on_field
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+
+        self._state = "start"  # start -> expect_key -> key -> colon -> value -> ... -> done
+        self._in_string = False
+        self._escape = False
+        self._value_depth = 0
+        self._key_chars: List[str] = []
+        self._value_chars: List[str] = []
+        self._current_key = None
+
+    def feed(self, chunk: str):
+        """喂入一段流式文本"""
+        for ch in chunk:
+            if self.done:
+                return
+            self._consume(ch)
+
+    def _consume(self, ch: str):
+        if self._state == "start":
+            if ch == "{":
+                self._state = "expect_key"
+
+        elif self._state == "expect_key":
+            if ch == '"':
+                self._state = "key"
+                self._key_chars = []
+            elif ch == "}":
+                self.done = True
+
+        elif self._state == "key":
+            if self._escape:
+                self._key_chars.append(ch)
+                self._escape = False
+            elif ch == "\\":
+                self._key_chars.append(ch)
+                self._escape = True
+            elif ch == '"':
+                self._current_key = json.loads('"' + "".join(self._key_chars) + '"')
+                self._state = "colon"
+            else:
+                self._key_chars.append(ch)
+
+        elif self._state == "colon":
+            if ch == ":":
+                self._state = "value"
+                self._value_chars = []
+                self._value_depth = 0
+                self._in_string = False
+                self._escape = False
+
+        elif self._state == "value":
+            self._consume_value(ch)
+
+    def _consume_value(self, ch: str):
+        if self._in_string:
+            self._value_chars.append(ch)
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+            return
+
+        if ch == '"':
+            self._in_string = True
+        elif ch in "{[":
+            self._value_depth += 1
+        elif ch in "}]":
+            if self._value_depth == 0:
+                # 顶层对象结束
+                self._emit()
+                self.done = True
+                return
+            self._value_depth -= 1
+        elif ch == "," and self._value_depth == 0:
+            self._emit()
+            self._state = "expect_key"
+            return
+
+        self._value_chars.append(ch)
+
+    def _emit(self):
+        raw = "".join(self._value_chars).strip()
+        if not raw:
+            return
+        value = json.loads(raw)
+        self.fields[self._current_key] = value
+        if self.on_field is not None:
+            try:
+                self.on_field(self._current_key, value)
+            except Exception as e:
+                logger.warning(f"字段回调处理失败: {self._current_key}, 错误: {e}")
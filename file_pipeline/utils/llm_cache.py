@@ -0,0 +1,145 @@
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Optional, Dict, Any, List
+from utils.logger import setup_logger
+
+logger = setup_logger("llm_cache")
+
+
+class LLMResponseCache:
+    """基于SQLite的LLM响应缓存，支持LRU容量淘汰和TTL过期"""
+
+    def __init__(self, db_path: Path, max_entries: int = 5000, ttl_seconds: int = 7 * 24 * 3600):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = Lock()
+        # 多个线程共用一个连接，由_lock串行化访问；timeout用于多进程写冲突时等待
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(last_accessed)")
+        self._conn.commit()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+            'bypassed': 0
+        }
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, Any]], response_format: Optional[Dict[str, Any]] = None,
+                 temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+        """根据模型、消息、schema和采样参数生成缓存键"""
+        payload = {
+            "model": model,
+            "messages": messages,
+            "response_format": response_format,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[str]:
+        """读取缓存，过期条目视为未命中"""
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT content, created_at FROM llm_cache WHERE cache_key = ?", (cache_key,)
+                ).fetchone()
+
+                if row is None or now - row[1] > self.ttl_seconds:
+                    if row is not None:
+                        self._conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (cache_key,))
+                        self._conn.commit()
+                        self.stats['evictions'] += 1
+                    self.stats['misses'] += 1
+                    return None
+
+                self._conn.execute(
+                    "UPDATE llm_cache SET last_accessed = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+                    (now, cache_key)
+                )
+                self._conn.commit()
+                self.stats['hits'] += 1
+                return row[0]
+
+        except sqlite3.Error as e:
+            logger.warning(f"读取LLM缓存失败: {e}")
+            self.stats['misses'] += 1
+            return None
+
+    def set(self, cache_key: str, model: str, content: str):
+        """写入缓存并执行淘汰"""
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (cache_key, model, content, created_at, last_accessed, hit_count) "
+                    "VALUES (?, ?, ?, ?, ?, 0)",
+                    (cache_key, model, content, now, now)
+                )
+                self.stats['writes'] += 1
+                self._evict(now)
+                self._conn.commit()
+
+        except sqlite3.Error as e:
+            logger.warning(f"写入LLM缓存失败: {e}")
+
+    def record_bypass(self):
+        """记录一次绕过缓存的调用"""
+        self.stats['bypassed'] += 1
+
+    def _evict(self, now: float):
+        """删除过期条目，并按最近访问时间淘汰超出容量的条目（调用方需持有锁）"""
+        expired = self._conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+
+        overflow = self._conn.execute(
+            "DELETE FROM llm_cache WHERE cache_key IN ("
+            "SELECT cache_key FROM llm_cache ORDER BY last_accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+
+        evicted = max(expired, 0) + max(overflow, 0)
+        if evicted:
+            self.stats['evictions'] += evicted
+            logger.debug(f"LLM缓存淘汰 {evicted} 条记录")
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def get_stats(self) -> dict:
+        """获取缓存统计信息"""
+        stats = self.stats.copy()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        try:
+            with self._lock:
+                stats['entries'] = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        except sqlite3.Error:
+            stats['entries'] = -1
+        return stats
@@ -0,0 +1,54 @@
+import re
+from pathlib import Path
+from utils.logger import setup_logger
+
+logger = setup_logger("onnx_sentence_model")
+
+QUANTIZATION_CONFIGS = ("arm64", "avx2", "avx512", "avx512_vnni")
+
+
+def onnx_model_dir(base_dir: Path, model_name: str) -> Path:
+    """导出目录：<base_dir>/<模型名>/"""
+    return Path(base_dir) / re.sub(r'[^A-Za-z0-9._-]+', '__', model_name)
+
+
+def quantized_file_name(quantization: str) -> str:
+    """sentence-transformers 保存int8动态量化模型时使用的文件名（相对导出目录）"""
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+
+def export_quantized_onnx(model_name: str, output_dir: Path, quantization: str = "avx512_vnni") -> Path:
+    """把句向量模型导出为ONNX并做int8动态量化，返回量化模型路径"""
+    if quantization not in QUANTIZATION_CONFIGS:
+        raise ValueError(f"不支持的量化配置: {quantization}，可选 {', '.join(QUANTIZATION_CONFIGS)}")
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    output_dir = Path(output_dir)
+    logger.info(f"导出ONNX模型: {model_name} -> {output_dir}")
+    model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+    model.save(str(output_dir))
+    export_dynamic_quantized_onnx_model(model, quantization, str(output_dir))
+    path = output_dir / quantized_file_name(quantization)
+    logger.info(f"int8动态量化完成: {path}")
+    return path
+
+
+def load_quantized_onnx_model(model_name: str, base_dir: Path, quantization: str = "avx512_vnni"):
+    """加载int8量化的ONNX句向量模型（onnxruntime CPU推理），尚未导出时先导出
+
+    返回的仍是 SentenceTransformer，encode(..., normalize_embeddings=True) 的用法和输出形状与PyTorch后端相同。
+    """
+    try:
+        import onnxruntime  # noqa: F401
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        raise ImportError("SENTENCE_MODEL_BACKEND=onnx-int8 需要安装 onnxruntime 和 optimum: "
+                          "pip install \"sentence-transformers[onnx]\"") from e
+
+    model_dir = onnx_model_dir(base_dir, model_name)
+    if not (model_dir / quantized_file_name(quantization)).exists():
+        export_quantized_onnx(model_name, model_dir, quantization)
+    return SentenceTransformer(
+        str(model_dir), backend="onnx", device="cpu",
+        model_kwargs={"file_name": quantized_file_name(quantization), "provider": "CPUExecutionProvider"}
+    )
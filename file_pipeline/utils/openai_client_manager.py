@@ -1,18 +1,469 @@
-from openai import OpenAI
+from openai import OpenAI, RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from threading import Lock
+from typing import Optional, Dict, Any, List, Callable
 import os
+import time
+from utils.llm_cache import LLMResponseCache
+from utils.rate_limiter import RateLimiter, PRIORITY_INTERACTIVE
+from utils.hedging import RequestHedger
+from utils.usage_tracker import UsageTracker, bind_usage_context
+from utils.singleflight import SingleFlight
+from utils.deadline import DeadlineExceeded, get_deadline, remaining_timeout, deadline_expired
+from utils.circuit_breaker import (
+    CircuitBreaker, ProviderUnavailable, STATE_OPEN, RESULT_SUCCESS, RESULT_FAILURE, RESULT_IGNORED
+)
+from utils.adaptive_concurrency import (
+    AdaptiveConcurrencyLimiter, OUTCOME_SUCCESS, OUTCOME_OVERLOAD, OUTCOME_ERROR
+)
+from utils.batch_runner import BatchRunner, BatchRequestDeferred, get_active_collector, run_with_batch
+from utils.incremental_json import IncrementalJSONObjectParser
+from utils.logger import setup_logger
+from config.settings import (
+    LLM_CACHE_ENABLED, LLM_CACHE_BYPASS, LLM_CACHE_PATH,
+    LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL,
+    LLM_RATE_LIMIT_ENABLED, LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE,
+    LLM_RATE_LIMIT_SHARED, LLM_RATE_LIMIT_STATE_PATH, LLM_BACKFILL_SHARE,
+    LLM_BATCH_DIR, LLM_BATCH_POLL_INTERVAL, LLM_BATCH_MAX_WAIT,
+    LLM_HEDGE_ENABLED, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_DELAY,
+    LLM_HEDGE_MIN_SAMPLES, LLM_HEDGE_BUDGET, LLM_HEDGE_BASE_URL,
+    LLM_USAGE_TRACKING_ENABLED, LLM_USAGE_DB_PATH, LLM_MODEL_PRICING,
+    LLM_ADAPTIVE_CONCURRENCY_ENABLED, LLM_CONCURRENCY_INITIAL, LLM_CONCURRENCY_MIN,
+    LLM_CONCURRENCY_MAX, LLM_CONCURRENCY_LATENCY_TOLERANCE,
+    LLM_SINGLEFLIGHT_ENABLED, LLM_REQUEST_TIMEOUT, LLM_MAX_RETRIES,
+    LLM_CIRCUIT_BREAKER_ENABLED, LLM_CIRCUIT_FAILURE_THRESHOLD, LLM_CIRCUIT_MIN_CALLS,
+    LLM_CIRCUIT_WINDOW, LLM_CIRCUIT_OPEN_SECONDS
+)
+
+logger = setup_logger("openai_client")
 
 class OpenAIClientManager:
     _instance = None
+    _cache = None
+    _rate_limiter = None
+    _hedger = None
+    _hedge_client = None
+    _usage_tracker = None
+    _concurrency_limiter = None
+    _circuit_breaker = None
+    _singleflight = SingleFlight("llm")
+    _default_priority = PRIORITY_INTERACTIVE
     _lock = Lock()
 
     @classmethod
     def get_client(cls) -> OpenAI:
+        """主客户端；关闭SDK自带重试，429、超时等错误全部交给限流、并发控制、熔断和文件时间预算处理"""
         if cls._instance is None:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = OpenAI(
                         base_url=os.getenv("OPENAI_BASE_URL"),
-                        api_key=os.getenv("OPENAI_API_KEY")
+                        api_key=os.getenv("OPENAI_API_KEY"),
+                        max_retries=0
                     )
         return cls._instance
+
+    @classmethod
+    def get_cache(cls) -> Optional[LLMResponseCache]:
+        if not LLM_CACHE_ENABLED:
+            return None
+        if cls._cache is None:
+            with cls._lock:
+                if cls._cache is None:
+                    cls._cache = LLMResponseCache(LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL)
+        return cls._cache
+
+    @classmethod
+    def get_rate_limiter(cls) -> Optional[RateLimiter]:
+        if not LLM_RATE_LIMIT_ENABLED:
+            return None
+        if cls._rate_limiter is None:
+            with cls._lock:
+                if cls._rate_limiter is None:
+                    cls._rate_limiter = RateLimiter(
+                        LLM_REQUESTS_PER_MINUTE,
+                        LLM_TOKENS_PER_MINUTE,
+                        backfill_share=LLM_BACKFILL_SHARE,
+                        state_path=LLM_RATE_LIMIT_STATE_PATH if LLM_RATE_LIMIT_SHARED else None
+                    )
+        return cls._rate_limiter
+
+    @classmethod
+    def get_hedger(cls) -> Optional[RequestHedger]:
+        if not LLM_HEDGE_ENABLED:
+            return None
+        if cls._hedger is None:
+            with cls._lock:
+                if cls._hedger is None:
+                    cls._hedger = RequestHedger(
+                        percentile=LLM_HEDGE_PERCENTILE,
+                        min_samples=LLM_HEDGE_MIN_SAMPLES,
+                        min_delay=LLM_HEDGE_MIN_DELAY,
+                        budget=LLM_HEDGE_BUDGET
+                    )
+        return cls._hedger
+
+    @classmethod
+    def get_hedge_client(cls) -> OpenAI:
+        """对冲副本使用的客户端，未配置LLM_HEDGE_BASE_URL时与主客户端相同"""
+        if not LLM_HEDGE_BASE_URL:
+            return cls.get_client()
+        if cls._hedge_client is None:
+            with cls._lock:
+                if cls._hedge_client is None:
+                    cls._hedge_client = OpenAI(
+                        base_url=LLM_HEDGE_BASE_URL,
+                        api_key=os.getenv("OPENAI_API_KEY"),
+                        max_retries=0
+                    )
+        return cls._hedge_client
+
+    @classmethod
+    def get_usage_tracker(cls) -> Optional[UsageTracker]:
+        if not LLM_USAGE_TRACKING_ENABLED:
+            return None
+        if cls._usage_tracker is None:
+            with cls._lock:
+                if cls._usage_tracker is None:
+                    cls._usage_tracker = UsageTracker(LLM_USAGE_DB_PATH, LLM_MODEL_PRICING)
+        return cls._usage_tracker
+
+    @classmethod
+    def get_concurrency_limiter(cls) -> Optional[AdaptiveConcurrencyLimiter]:
+        if not LLM_ADAPTIVE_CONCURRENCY_ENABLED:
+            return None
+        if cls._concurrency_limiter is None:
+            with cls._lock:
+                if cls._concurrency_limiter is None:
+                    cls._concurrency_limiter = AdaptiveConcurrencyLimiter(
+                        initial_limit=LLM_CONCURRENCY_INITIAL,
+                        min_limit=LLM_CONCURRENCY_MIN,
+                        max_limit=LLM_CONCURRENCY_MAX,
+                        latency_tolerance=LLM_CONCURRENCY_LATENCY_TOLERANCE
+                    )
+        return cls._concurrency_limiter
+
+    @classmethod
+    def get_circuit_breaker(cls) -> Optional[CircuitBreaker]:
+        if not LLM_CIRCUIT_BREAKER_ENABLED:
+            return None
+        if cls._circuit_breaker is None:
+            with cls._lock:
+                if cls._circuit_breaker is None:
+                    cls._circuit_breaker = CircuitBreaker(
+                        failure_threshold=LLM_CIRCUIT_FAILURE_THRESHOLD,
+                        min_calls=LLM_CIRCUIT_MIN_CALLS,
+                        window=LLM_CIRCUIT_WINDOW,
+                        open_seconds=LLM_CIRCUIT_OPEN_SECONDS
+                    )
+        return cls._circuit_breaker
+
+    @classmethod
+    def provider_available(cls) -> bool:
+        """LLM服务是否可用（未熔断；试探状态视为可用，由熔断器控制探测请求数）"""
+        breaker = cls.get_circuit_breaker()
+        return breaker is None or breaker.state != STATE_OPEN
+
+    @classmethod
+    def set_default_priority(cls, priority: str):
+        """设置本进程LLM调用的默认优先级，离线脚本应设为backfill"""
+        cls._default_priority = priority
+
+    @classmethod
+    def chat_completion(cls, messages: List[Dict[str, Any]], model: str = "gpt-4o-mini",
+                        response_format: Optional[Dict[str, Any]] = None,
+                        temperature: Optional[float] = None, max_tokens: Optional[int] = None,
+                        use_cache: bool = True, priority: Optional[str] = None,
+                        on_field: Optional[Callable[[str, Any], None]] = None,
+                        stage: Optional[str] = None, prompt_version: Optional[str] = None) -> Optional[str]:
+        """调用chat.completions并返回消息内容，相同输入直接命中本地缓存
+
+        use_cache=False 或环境变量 LLM_CACHE_BYPASS=true 时跳过缓存读取（结果仍会写回缓存），
+        便于调试prompt。未命中缓存的请求会先经过限流器排队；
+        处于批处理收集阶段时则登记请求并抛出BatchRequestDeferred。
+        传入on_field时以流式方式请求，JSON输出的每个顶层字段一完整就回调 on_field(key, value)。
+        每次调用按stage（默认取json_schema名称）记录token用量和耗时，归属实体由usage_context指定；
+        prompt_version为PromptTemplate的版本标识，用于对比不同prompt布局的服务端缓存命中。
+        相同prompt的并发请求只发送一次，其余请求等待并复用其结果。
+        请求超时取LLM_REQUEST_TIMEOUT与当前文件剩余时间预算中的较小值，预算耗尽时抛出DeadlineExceeded；
+        SDK自带重试已关闭，失败后由本层重试最多LLM_MAX_RETRIES次。
+        LLM服务熔断期间未命中缓存的请求不会发出，直接抛出ProviderUnavailable。
+        """
+        tracker = cls.get_usage_tracker()
+        if stage is None:
+            stage = ((response_format or {}).get("json_schema") or {}).get("name") or "chat"
+
+        cache = cls.get_cache()
+        cache_key = None
+
+        if cache is not None:
+            cache_key = LLMResponseCache.make_key(model, messages, response_format, temperature, max_tokens)
+            if use_cache and not LLM_CACHE_BYPASS:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    logger.debug(f"LLM缓存命中: {cache_key[:12]}")
+                    if on_field is not None:
+                        IncrementalJSONObjectParser(on_field).feed(cached)
+                    if tracker is not None:
+                        tracker.record(stage, model, cache_hit=True, prompt_version=prompt_version)
+                    return cached
+            else:
+                cache.record_bypass()
+
+        request_kwargs = {"model": model, "messages": messages}
+        if response_format is not None:
+            request_kwargs["response_format"] = response_format
+        if temperature is not None:
+            request_kwargs["temperature"] = temperature
+        if max_tokens is not None:
+            request_kwargs["max_tokens"] = max_tokens
+
+        collector = get_active_collector()
+        if collector is not None and cache_key is not None:
+            collector.add(cache_key, request_kwargs)
+            raise BatchRequestDeferred(cache_key)
+
+        if not LLM_SINGLEFLIGHT_ENABLED:
+            return cls._request_with_retries(request_kwargs, priority, on_field, stage, cache_key, prompt_version)
+
+        flight_key = cache_key or LLMResponseCache.make_key(model, messages, response_format, temperature, max_tokens)
+        try:
+            content, shared = cls._singleflight.do(
+                flight_key, lambda: cls._request_with_retries(request_kwargs, priority, on_field, stage, cache_key, prompt_version),
+                timeout=remaining_timeout("llm")
+            )
+        except FutureTimeoutError:
+            raise DeadlineExceeded("llm")
+        if shared:
+            if on_field is not None and content:
+                IncrementalJSONObjectParser(on_field).feed(content)
+            if tracker is not None:
+                tracker.record(stage, model, cache_hit=True, prompt_version=prompt_version)
+        return content
+
+    @classmethod
+    def _request_with_retries(cls, request_kwargs: Dict[str, Any], priority: Optional[str],
+                              on_field: Optional[Callable[[str, Any], None]], stage: str,
+                              cache_key: Optional[str], prompt_version: Optional[str] = None) -> Optional[str]:
+        """_request失败（429、超时、连接错误、5xx）后重试最多LLM_MAX_RETRIES次
+
+        每次重试重新经过熔断、限流和并发控制，退避等待计入文件时间预算；
+        流式请求已回调过字段时不再重试，避免字段重复回调。
+        """
+        emitted = []
+
+        def on_field_once(key: str, value: Any):
+            emitted.append(key)
+            on_field(key, value)
+
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                return cls._request(request_kwargs, priority, on_field_once if on_field is not None else None,
+                                    stage, cache_key, prompt_version)
+            except (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError) as e:
+                if attempt >= LLM_MAX_RETRIES or emitted:
+                    raise
+                backoff = min(0.5 * 2 ** attempt, 8.0)
+                logger.warning(f"LLM请求失败({type(e).__name__})，{backoff:.1f}秒后第{attempt + 1}次重试")
+                time.sleep(min(backoff, remaining_timeout("llm", backoff)))
+
+    @classmethod
+    def _request(cls, request_kwargs: Dict[str, Any], priority: Optional[str],
+                 on_field: Optional[Callable[[str, Any], None]], stage: str,
+                 cache_key: Optional[str], prompt_version: Optional[str] = None) -> Optional[str]:
+        """发送未命中缓存的请求：限流排队、并发控制、对冲或流式发送，记录用量并写回缓存"""
+        model = request_kwargs["model"]
+        tracker = cls.get_usage_tracker()
+        cache = cls.get_cache()
+
+        remaining_timeout("llm")  # 预算已耗尽时不再排队
+        breaker = cls.get_circuit_breaker()
+        if breaker is not None and breaker.state == STATE_OPEN:
+            # 熔断中不再排队；这里只读状态，不占用试探名额
+            raise ProviderUnavailable("LLM服务熔断中")
+
+        limiter = cls.get_rate_limiter()
+        estimated_tokens = 0
+        if limiter is not None:
+            estimated_tokens = RateLimiter.estimate_tokens(request_kwargs["messages"], request_kwargs.get("max_tokens"))
+            # 限流排队计入文件时间预算
+            if not limiter.acquire(estimated_tokens, priority or cls._default_priority, timeout=remaining_timeout("llm")):
+                raise DeadlineExceeded("llm")
+
+        concurrency = cls.get_concurrency_limiter()
+        if concurrency is not None and not concurrency.acquire(timeout=remaining_timeout("llm")):
+            # 排队期间预算耗尽，退回预扣的token额度
+            if limiter is not None:
+                limiter.adjust(estimated_tokens, 0)
+            raise DeadlineExceeded("llm")
+
+        # 排队结束后才向熔断器申请放行：试探状态的唯一名额由allow()占用、record()释放，
+        # 排队期间超出预算不会占住试探名额
+        if breaker is not None and not breaker.allow():
+            if concurrency is not None:
+                concurrency.release(OUTCOME_ERROR, 0.0)
+            if limiter is not None:
+                limiter.adjust(estimated_tokens, 0)
+            raise ProviderUnavailable("LLM服务熔断中")
+
+        start_time = time.time()
+        outcome = OUTCOME_ERROR
+        health = RESULT_IGNORED
+        try:
+            # 排队等待之后再取剩余预算，作为本次请求的超时
+            send_kwargs = {**request_kwargs, "timeout": remaining_timeout("llm", LLM_REQUEST_TIMEOUT)}
+            if on_field is None:
+                content, usage = cls._send_hedged(send_kwargs, limiter, estimated_tokens, stage, prompt_version)
+            else:
+                content, usage = cls._send_stream(send_kwargs, on_field)
+            outcome = OUTCOME_SUCCESS
+            health = RESULT_SUCCESS
+        except RateLimitError as e:
+            outcome = OUTCOME_OVERLOAD
+            health = RESULT_FAILURE
+            if limiter is not None:
+                # SDK重试已关闭，每个429都在这里清空共享的令牌桶并按响应头校准配额
+                limiter.on_rate_limited(getattr(getattr(e, "response", None), "headers", None))
+            raise
+        except APITimeoutError:
+            if deadline_expired():
+                # 超时由文件预算耗尽引起，不代表服务端过载
+                raise DeadlineExceeded("llm")
+            outcome = OUTCOME_OVERLOAD
+            health = RESULT_FAILURE
+            raise
+        except (APIConnectionError, InternalServerError):
+            health = RESULT_FAILURE
+            raise
+        finally:
+            if concurrency is not None:
+                concurrency.release(outcome, time.time() - start_time)
+            if breaker is not None:
+                breaker.record(health)
+
+        if limiter is not None and usage is not None:
+            limiter.adjust(estimated_tokens, usage.total_tokens)
+
+        if tracker is not None:
+            tracker.record(stage, model, usage, latency=time.time() - start_time, prompt_version=prompt_version)
+
+        if cache is not None and cache_key is not None and content:
+            cache.set(cache_key, model, content)
+
+        return content
+
+    @classmethod
+    def _send_hedged(cls, request_kwargs: Dict[str, Any], limiter: Optional[RateLimiter], estimated_tokens: int,
+                     stage: str = "unknown", prompt_version: Optional[str] = None):
+        """发送非流式请求，启用对冲时主请求超过同类请求p95耗时后向备用网关发出副本"""
+        hedger = cls.get_hedger()
+        if hedger is None:
+            return cls._send(cls.get_client(), request_kwargs, limiter)
+
+        response_format = request_kwargs.get("response_format") or {}
+        schema_name = response_format.get("json_schema", {}).get("name") or response_format.get("type", "text")
+        key = f"{request_kwargs['model']}:{schema_name}"
+
+        def can_hedge() -> bool:
+            # 副本只使用在线请求预留额度之外的余量，不排队等待
+            return limiter is None or limiter.try_acquire(estimated_tokens)
+
+        start_time = time.time()
+        tracker = cls.get_usage_tracker()
+
+        @bind_usage_context
+        def on_discarded(result):
+            # 落后的请求同样计费并占用TPM：按实际用量修正它的预扣额度并记录用量，未发出时退回预扣额度
+            usage = result[1] if result is not None else None
+            if limiter is not None:
+                limiter.adjust(estimated_tokens, usage.total_tokens if usage is not None else 0)
+            if tracker is not None and usage is not None:
+                tracker.record(stage, request_kwargs["model"], usage, latency=time.time() - start_time,
+                               prompt_version=prompt_version)
+
+        return hedger.call(
+            key,
+            primary=lambda: cls._send(cls.get_client(), request_kwargs, limiter),
+            hedge=lambda: cls._send(cls.get_hedge_client(), request_kwargs, limiter),
+            can_hedge=can_hedge,
+            on_discarded=on_discarded
+        )
+
+    @classmethod
+    def _send(cls, client: OpenAI, request_kwargs: Dict[str, Any], limiter: Optional[RateLimiter]):
+        """发送非流式请求，返回(内容, usage)"""
+        raw_response = client.chat.completions.with_raw_response.create(**request_kwargs)
+        response = raw_response.parse()
+        if limiter is not None:
+            limiter.update_from_headers(raw_response.headers)
+        return response.choices[0].message.content, response.usage
+
+    @classmethod
+    def _send_stream(cls, request_kwargs: Dict[str, Any], on_field: Callable[[str, Any], None]):
+        """发送流式请求，边接收边增量解析JSON字段，返回(完整内容, usage)
+
+        超时只限制单次读取，文件时间预算耗尽时主动关闭连接
+        """
+        parser = IncrementalJSONObjectParser(on_field)
+        deadline = get_deadline()
+        chunks = []
+        usage = None
+
+        stream = cls.get_client().chat.completions.create(
+            stream=True,
+            stream_options={"include_usage": True},
+            **request_kwargs
+        )
+        for chunk in stream:
+            if deadline is not None and deadline.expired:
+                stream.close()
+                raise DeadlineExceeded("llm")
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                chunks.append(delta)
+                parser.feed(delta)
+
+        return "".join(chunks), usage
+
+    @classmethod
+    def run_batch_job(cls, job: Callable[[], Any]):
+        """以Batch API模式执行离线任务，结果经缓存映射回各条记录"""
+        cache = cls.get_cache()
+        runner = None
+        if cache is not None:
+            runner = BatchRunner(cls.get_client(), cache, LLM_BATCH_DIR, LLM_BATCH_POLL_INTERVAL,
+                                 max_wait=LLM_BATCH_MAX_WAIT)
+        return run_with_batch(job, runner)
+
+    @classmethod
+    def get_cache_stats(cls) -> Optional[dict]:
+        cache = cls.get_cache()
+        return cache.get_stats() if cache is not None else None
+
+    @classmethod
+    def get_rate_limit_stats(cls) -> Optional[dict]:
+        limiter = cls.get_rate_limiter()
+        return limiter.get_stats() if limiter is not None else None
+
+    @classmethod
+    def get_concurrency_stats(cls) -> Optional[dict]:
+        concurrency = cls.get_concurrency_limiter()
+        return concurrency.get_stats() if concurrency is not None else None
+
+    @classmethod
+    def get_singleflight_stats(cls) -> Optional[dict]:
+        return cls._singleflight.get_stats() if LLM_SINGLEFLIGHT_ENABLED else None
+
+    @classmethod
+    def get_circuit_stats(cls) -> Optional[dict]:
+        breaker = cls.get_circuit_breaker()
+        return breaker.get_stats() if breaker is not None else None
+
+    @classmethod
+    def get_hedge_stats(cls) -> Optional[dict]:
+        hedger = cls.get_hedger()
+        return hedger.get_stats() if hedger is not None else None
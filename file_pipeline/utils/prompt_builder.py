@@ -0,0 +1,46 @@
+from typing import Dict, Any, Iterable, List, Optional, Union
+
+
+def format_tag_list(tags: Iterable[str]) -> str:
+    """去重并排序后用顿号连接，标签顺序与数据库返回顺序无关"""
+    return "、".join(sorted({tag for tag in tags if tag}))
+
+
+class PromptTemplate:
+    """按服务端前缀缓存友好的顺序组装消息
+
+    服务端只缓存完全相同的消息前缀，因此消息固定按以下顺序排列：
+    1. 静态指令：只随version变化，修改指令内容时必须同时提升version
+    2. 半静态上下文：如标签列表，渲染时排序，相同内容总是得到相同文本
+    3. 逐次变化的内容：提示消息和用户输入放在最后
+    """
+
+    def __init__(self, name: str, version: int, instructions: str):
+        self.name = name
+        self.version = version
+        self.instructions = instructions.strip()
+
+    @property
+    def prompt_version(self) -> str:
+        """记录到用量表的版本标识，用于对比不同prompt布局的缓存命中和费用"""
+        return f"{self.name}@v{self.version}"
+
+    @staticmethod
+    def render_context(context: Dict[str, Union[str, Iterable[str]]]) -> str:
+        """按键名排序渲染上下文，列表值排序去重"""
+        lines = []
+        for key in sorted(context):
+            value = context[key]
+            lines.append(f"{key}：{value if isinstance(value, str) else format_tag_list(value)}")
+        return "\n".join(lines)
+
+    def build(self, user_content: str,
+              context: Optional[Dict[str, Union[str, Iterable[str]]]] = None,
+              hints: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, Any]]:
+        """组装消息列表：静态指令 -> 排序后的上下文 -> 提示消息 -> 用户输入"""
+        messages = [{"role": "system", "content": self.instructions}]
+        if context:
+            messages.append({"role": "system", "content": self.render_context(context)})
+        messages.extend(hints or [])
+        messages.append({"role": "user", "content": user_content})
+        return messages
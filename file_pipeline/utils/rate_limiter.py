@@ -0,0 +1,267 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Optional, Dict, Any, List
+from utils.logger import setup_logger
+from utils.token_counter import count_tokens
+
+logger = setup_logger("rate_limiter")
+
+# 调用优先级：在线pipeline优先于离线回填脚本
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKFILL = "backfill"
+
+
+@contextmanager
+def _file_lock(lock_path: Path):
+    """跨进程文件锁（Windows使用msvcrt，其他平台使用fcntl）"""
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a+') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class RateLimiter:
+    """请求数/token数双令牌桶限流器
+
+    - 令牌桶容量为每分钟配额，按秒匀速补充
+    - 回填任务只能使用高于保留水位的额度，保证在线pipeline总有突发余量
+    - 有在线请求排队时回填任务让出；排队标记（interactive_waiting_until）写在桶状态中，
+      在线请求每次重试前续期，进程退出后自动过期
+    - 配置 state_path 后桶状态保存在文件中，由文件锁在多个进程间共享
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int,
+                 backfill_share: float = 0.5, state_path: Optional[Path] = None):
+        self.request_capacity = float(requests_per_minute)
+        self.token_capacity = float(tokens_per_minute)
+        self.backfill_share = min(max(backfill_share, 0.0), 1.0)
+        self.state_path = Path(state_path) if state_path else None
+        self.lock_path = self.state_path.with_suffix('.lock') if self.state_path else None
+
+        self._lock = Lock()
+        self._interactive_waiting = 0
+        self._state = {
+            "requests": self.request_capacity,
+            "tokens": self.token_capacity,
+            "updated_at": time.time()
+        }
+
+        self.stats = {
+            'acquired': 0,
+            'throttled': 0,
+            'wait_seconds': 0.0,
+            'timeouts': 0,
+            'rate_limited': 0,
+            'recalibrated': 0
+        }
+
+    @staticmethod
+    def estimate_tokens(messages: List[Dict[str, Any]], max_tokens: Optional[int] = None) -> int:
+        """估算请求token数（输入消息加预留的输出）"""
+        prompt_tokens = 0
+        for message in messages:
+            content = message.get("content") or ""
+            if not isinstance(content, str):
+                content = json.dumps(content, ensure_ascii=False)
+            prompt_tokens += count_tokens(content) + 4
+        # 预留输出token，未指定上限时按输入的一半估计
+        completion_tokens = max_tokens if max_tokens is not None else prompt_tokens // 2
+        return prompt_tokens + completion_tokens
+
+    def _refill(self, state: Dict[str, float], now: float):
+        if now < state["updated_at"]:
+            return  # 429的retry-after期间不补充
+        elapsed = now - state["updated_at"]
+        state["requests"] = min(self.request_capacity, state["requests"] + elapsed * self.request_capacity / 60)
+        state["tokens"] = min(self.token_capacity, state["tokens"] + elapsed * self.token_capacity / 60)
+        state["updated_at"] = now
+
+    def _reserve_level(self, priority: str):
+        if priority == PRIORITY_INTERACTIVE:
+            return 0.0, 0.0
+        reserve = 1.0 - self.backfill_share
+        return self.request_capacity * reserve, self.token_capacity * reserve
+
+    @contextmanager
+    def _locked_state(self):
+        """获取桶状态；共享模式下从文件读取并在退出时写回"""
+        with self._lock:
+            if self.state_path is None:
+                yield self._state
+                return
+
+            with _file_lock(self.lock_path):
+                state = dict(self._state)
+                try:
+                    if self.state_path.exists():
+                        state.update(json.loads(self.state_path.read_text(encoding='utf-8')))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"读取限流状态失败，使用本地状态: {e}")
+                yield state
+                self._state = state
+                try:
+                    self.state_path.write_text(json.dumps(state), encoding='utf-8')
+                except OSError as e:
+                    logger.warning(f"写入限流状态失败: {e}")
+
+    def _try_consume(self, tokens: int, priority: str) -> float:
+        """尝试扣减额度，成功返回0，否则返回建议等待秒数"""
+        # 令牌需求不能超过桶容量，否则永远无法满足
+        tokens = min(float(tokens), self.token_capacity)
+        with self._locked_state() as state:
+            now = time.time()
+            self._refill(state, now)
+
+            # 有在线请求排队时（本进程或共享状态中的其他进程），回填任务让出
+            if priority != PRIORITY_INTERACTIVE and (
+                    self._interactive_waiting > 0 or state.get("interactive_waiting_until", 0.0) > now):
+                return 0.2
+
+            request_reserve, token_reserve = self._reserve_level(priority)
+            request_deficit = request_reserve + 1 - state["requests"]
+            token_deficit = token_reserve + tokens - state["tokens"]
+
+            if request_deficit <= 0 and token_deficit <= 0:
+                state["requests"] -= 1
+                state["tokens"] -= tokens
+                return 0.0
+
+            wait = max(request_deficit * 60 / self.request_capacity, token_deficit * 60 / self.token_capacity)
+            wait = min(max(wait, 0.05), 5.0)
+            if priority == PRIORITY_INTERACTIVE:
+                # 标记保持到本次等待后的重试，获得额度后不再续期
+                state["interactive_waiting_until"] = max(state.get("interactive_waiting_until", 0.0), now + wait + 0.5)
+            return wait
+
+    def acquire(self, tokens: int, priority: str = PRIORITY_INTERACTIVE, timeout: Optional[float] = None) -> bool:
+        """阻塞直到获得一次请求和指定token数的额度，超过timeout秒仍未获得时返回False"""
+        start = time.time()
+        throttled = False
+        acquired = False
+
+        if priority == PRIORITY_INTERACTIVE:
+            with self._lock:
+                self._interactive_waiting += 1
+        try:
+            while True:
+                wait = self._try_consume(tokens, priority)
+                if wait == 0.0:
+                    acquired = True
+                    break
+                throttled = True
+                if timeout is not None:
+                    remaining = timeout - (time.time() - start)
+                    if remaining <= 0:
+                        break
+                    wait = min(wait, remaining)
+                time.sleep(wait)
+        finally:
+            if priority == PRIORITY_INTERACTIVE:
+                with self._lock:
+                    self._interactive_waiting -= 1
+
+        waited = time.time() - start
+        with self._lock:
+            if acquired:
+                self.stats['acquired'] += 1
+            else:
+                self.stats['timeouts'] += 1
+            if throttled:
+                self.stats['throttled'] += 1
+                self.stats['wait_seconds'] += waited
+        if throttled:
+            logger.debug(f"限流等待 {waited:.2f}秒 (priority={priority}, tokens={tokens}, acquired={acquired})")
+        return acquired
+
+    def try_acquire(self, tokens: int, priority: str = PRIORITY_BACKFILL) -> bool:
+        """不等待地尝试获取额度，成功返回True"""
+        if self._try_consume(tokens, priority) != 0.0:
+            return False
+        with self._lock:
+            self.stats['acquired'] += 1
+        return True
+
+    def adjust(self, estimated_tokens: int, actual_tokens: int):
+        """用实际token用量修正预扣额度"""
+        delta = actual_tokens - min(float(estimated_tokens), self.token_capacity)
+        if delta == 0:
+            return
+        with self._locked_state() as state:
+            self._refill(state, time.time())
+            state["tokens"] = min(self.token_capacity, state["tokens"] - delta)
+
+    def update_from_headers(self, headers):
+        """根据响应头中的x-ratelimit-*字段校准配额和剩余额度"""
+        try:
+            limit_requests = headers.get("x-ratelimit-limit-requests")
+            limit_tokens = headers.get("x-ratelimit-limit-tokens")
+            remaining_requests = headers.get("x-ratelimit-remaining-requests")
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if not any([limit_requests, limit_tokens, remaining_requests, remaining_tokens]):
+                return
+
+            with self._locked_state() as state:
+                self._refill(state, time.time())
+                # 服务端配额比本地配置更低时以服务端为准
+                if limit_requests:
+                    self.request_capacity = min(self.request_capacity, float(limit_requests))
+                if limit_tokens:
+                    self.token_capacity = min(self.token_capacity, float(limit_tokens))
+                if remaining_requests is not None:
+                    state["requests"] = min(state["requests"], float(remaining_requests))
+                if remaining_tokens is not None:
+                    state["tokens"] = min(state["tokens"], float(remaining_tokens))
+
+            with self._lock:
+                self.stats['recalibrated'] += 1
+
+        except (TypeError, ValueError) as e:
+            logger.debug(f"解析限流响应头失败: {e}")
+
+    def on_rate_limited(self, headers=None):
+        """收到429时按响应头校准配额并清空桶，让所有调用方按补充速度重新排队；有retry-after时到期后才开始补充"""
+        retry_after = 0.0
+        if headers is not None:
+            self.update_from_headers(headers)
+            try:
+                retry_after = min(max(float(headers.get("retry-after") or 0.0), 0.0), 60.0)
+            except (TypeError, ValueError):
+                retry_after = 0.0
+        with self._locked_state() as state:
+            state["requests"] = 0.0
+            state["tokens"] = 0.0
+            state["updated_at"] = time.time() + retry_after
+        with self._lock:
+            self.stats['rate_limited'] += 1
+        logger.warning("收到429限流响应，暂停发送请求")
+
+    def get_stats(self) -> dict:
+        """获取限流统计信息"""
+        with self._lock:
+            stats = self.stats.copy()
+        stats['requests_per_minute'] = self.request_capacity
+        stats['tokens_per_minute'] = self.token_capacity
+        return stats
@@ -0,0 +1,70 @@
+import re
+from typing import Optional, Tuple, List
+
+# 单个日期：2019.03 / 2019-3 / 2019/03 / 2019年3月 / 2019 / Mar 2019 / 03/2019
+DATE_TOKEN = (
+    r'(?:(?:19|20)\d{2}\s*(?:[.\-/年]\s*(?:1[0-2]|0?[1-9])(?!\d)\s*月?)?'
+    r'|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s*(?:19|20)\d{2}'
+    r'|(?:1[0-2]|0?[1-9])/(?:19|20)\d{2})'
+)
+PRESENT_TOKEN = r'(?:至今|现在|目前|今|present|now|current)'
+DATE_RANGE = re.compile(
+    rf'({DATE_TOKEN})\s*(?:-|–|—|~|～|至|到|to)\s*({DATE_TOKEN}|{PRESENT_TOKEN})',
+    re.IGNORECASE
+)
+
+_YEAR_MONTH = re.compile(r'((?:19|20)\d{2})\s*(?:[.\-/年]\s*(1[0-2]|0?[1-9])(?!\d))?')
+_MONTH_YEAR = re.compile(r'(1[0-2]|0?[1-9])/((?:19|20)\d{2})')
+_MONTH_NAME_YEAR = re.compile(r'(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s*((?:19|20)\d{2})', re.IGNORECASE)
+_PRESENT = re.compile(PRESENT_TOKEN, re.IGNORECASE)
+_MONTH_NAMES = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+
+PRESENT = "至今"
+
+YearMonth = Tuple[int, Optional[int]]
+
+
+def is_present(text: str) -> bool:
+    """是否为“至今”一类的结束日期"""
+    return bool(text) and bool(_PRESENT.fullmatch(text.strip()))
+
+
+def parse_resume_date(text: str) -> Optional[YearMonth]:
+    """解析简历中的日期，返回(年, 月)，只有年份时月为None，无法解析返回None"""
+    if not text or text == "暂无":
+        return None
+    text = text.strip()
+
+    match = _MONTH_YEAR.search(text)
+    if match:
+        return int(match.group(2)), int(match.group(1))
+    match = _MONTH_NAME_YEAR.search(text)
+    if match:
+        return int(match.group(2)), _MONTH_NAMES.index(match.group(1).lower()) + 1
+    match = _YEAR_MONTH.search(text)
+    if match:
+        return int(match.group(1)), int(match.group(2)) if match.group(2) else None
+    return None
+
+
+def format_resume_date(value: Optional[YearMonth]) -> str:
+    """格式化为 YYYY-MM（只有年份时为 YYYY）"""
+    if value is None:
+        return "暂无"
+    year, month = value
+    return f"{year}-{month:02d}" if month else str(year)
+
+
+def find_date_ranges(text: str) -> List[Tuple[YearMonth, Optional[YearMonth], str]]:
+    """查找文本中的日期区间，返回[(开始, 结束, 原文)]，结束为None表示至今"""
+    ranges = []
+    for match in DATE_RANGE.finditer(text):
+        start = parse_resume_date(match.group(1))
+        if start is None:
+            continue
+        end = None if is_present(match.group(2)) else parse_resume_date(match.group(2))
+        if end is not None and end[0] < start[0]:
+            continue
+        ranges.append((start, end, match.group(0).strip()))
+    return ranges
+
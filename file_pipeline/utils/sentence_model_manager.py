@@ -1,14 +1,100 @@
-from sentence_transformers import SentenceTransformer
 from threading import Lock
+from typing import List, Optional, TYPE_CHECKING
+import numpy as np
+from config.settings import (
+    SENTENCE_MODEL_NAME, SENTENCE_MODEL_BACKEND, SENTENCE_ONNX_QUANTIZATION, SENTENCE_ONNX_DIR, SENTENCE_EMBEDDING_KEY,
+    EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_CACHE_PERSIST, EMBEDDING_CACHE_PATH,
+    EMBEDDING_BATCHING_ENABLED, EMBEDDING_BATCH_MAX_WAIT_MS, EMBEDDING_BATCH_MAX_SIZE
+)
+from utils.embedding_cache import EmbeddingCache
+from utils.embedding_batcher import EmbeddingBatcher
+from utils.onnx_sentence_model import load_quantized_onnx_model
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 class SentenceModelManager:
     _instance = None
+    _cache = None
+    _batcher = None
     _lock = Lock()
 
     @classmethod
-    def get_model(cls) -> SentenceTransformer:
+    def get_model(cls) -> "SentenceTransformer":
+        """获取共享的句向量模型，首次调用时才导入sentence_transformers（及torch）并加载模型"""
         if cls._instance is None:
             with cls._lock:
                 if cls._instance is None:
-                    cls._instance = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
-        return cls._instance
\ No newline at end of file
+                    cls._instance = cls.load_model(SENTENCE_MODEL_BACKEND)
+        return cls._instance
+
+    @staticmethod
+    def load_model(backend: str) -> "SentenceTransformer":
+        """按后端加载句向量模型：torch 或 onnx-int8"""
+        if backend == "torch":
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(SENTENCE_MODEL_NAME)
+        if backend == "onnx-int8":
+            return load_quantized_onnx_model(SENTENCE_MODEL_NAME, SENTENCE_ONNX_DIR, SENTENCE_ONNX_QUANTIZATION)
+        raise ValueError(f"未知的句向量模型后端: {backend}")
+
+    @classmethod
+    def is_loaded(cls) -> bool:
+        return cls._instance is not None
+
+    @classmethod
+    def get_embedding_cache(cls) -> Optional[EmbeddingCache]:
+        if not EMBEDDING_CACHE_ENABLED:
+            return None
+        if cls._cache is None:
+            with cls._lock:
+                if cls._cache is None:
+                    cls._cache = EmbeddingCache(
+                        SENTENCE_EMBEDDING_KEY, EMBEDDING_CACHE_MAX_ENTRIES,
+                        EMBEDDING_CACHE_PATH if EMBEDDING_CACHE_PERSIST else None
+                    )
+        return cls._cache
+
+    @classmethod
+    def get_batcher(cls) -> Optional[EmbeddingBatcher]:
+        if not EMBEDDING_BATCHING_ENABLED:
+            return None
+        if cls._batcher is None:
+            with cls._lock:
+                if cls._batcher is None:
+                    cls._batcher = EmbeddingBatcher(cls._encode_direct, EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_BATCH_MAX_WAIT_MS)
+        return cls._batcher
+
+    @classmethod
+    def _encode_direct(cls, texts: List[str]) -> np.ndarray:
+        return np.asarray(cls.get_model().encode(texts, convert_to_tensor=False, normalize_embeddings=True))
+
+    @classmethod
+    def _encode_model(cls, texts: List[str]) -> np.ndarray:
+        """调用模型编码：启用微批处理时与其他线程的请求合并为一批"""
+        batcher = cls.get_batcher()
+        if batcher is None:
+            return cls._encode_direct(texts)
+        return batcher.encode(texts)
+
+    @classmethod
+    def encode(cls, texts: List[str], use_cache: bool = True) -> np.ndarray:
+        """归一化句向量 shape: [文本数, 维度]
+
+        use_cache为True时经过句向量缓存（按规范化文本，适合技能、领域等短文本），
+        未命中的文本与其他线程的请求合并批量编码。
+        """
+        cache = cls.get_embedding_cache() if use_cache else None
+        if cache is None:
+            return cls._encode_model(texts)
+        return cache.encode(cls._encode_model, texts)
+
+    @classmethod
+    def get_batcher_stats(cls) -> Optional[dict]:
+        """微批处理统计，未启用或尚未使用时返回None"""
+        return cls._batcher.get_stats() if cls._batcher is not None else None
+
+    @classmethod
+    def get_cache_stats(cls) -> Optional[dict]:
+        """句向量缓存统计，未启用或尚未使用时返回None"""
+        return cls._cache.get_stats() if cls._cache is not None else None
\ No newline at end of file
@@ -0,0 +1,76 @@
+import time
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+from utils.deadline import DeadlineExceeded
+from utils.logger import setup_logger
+
+logger = setup_logger("singleflight")
+
+
+class SingleFlight:
+    """合并相同key的并发调用：同一时刻只有第一个调用真正执行，其余调用等待它的结果
+
+    只合并正在进行中的调用，执行结束后key即被移除，不做结果缓存。
+    执行失败时异常同样传给所有等待者；但执行者因自己的时间预算耗尽（DeadlineExceeded）失败时，
+    等待者不继承这个异常，而是重新执行（或加入新的执行者）。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, Future] = {}
+        self._lock = Lock()
+        self.stats = {
+            'executed': 0,
+            'coalesced': 0,
+            'leader_deadline_retries': 0
+        }
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """执行fn或等待进行中的同key调用，返回(结果, 是否复用了其他调用的结果)
+
+        timeout只限制等待其他调用的时间，超时抛出concurrent.futures.TimeoutError
+        """
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = Future()
+                    self._calls[key] = future
+                    self.stats['executed'] += 1
+                else:
+                    self.stats['coalesced'] += 1
+
+            if leader:
+                break
+
+            logger.info(f"[{self.name}] 合并重复的进行中请求: {key[:12]}")
+            remaining = None if expires_at is None else max(expires_at - time.monotonic(), 0.0)
+            try:
+                return future.result(timeout=remaining), True
+            except DeadlineExceeded:
+                # 执行者的预算与本调用无关，重新执行
+                with self._lock:
+                    self.stats['leader_deadline_retries'] += 1
+                logger.info(f"[{self.name}] 进行中的请求超出其时间预算，重新执行: {key[:12]}")
+
+        try:
+            result = fn()
+        except BaseException as e:
+            # 先移除key再通知等待者，重新执行的等待者不会拿到同一个失败的future
+            with self._lock:
+                self._calls.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._calls.pop(key, None)
+        future.set_result(result)
+        return result, False
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = self.stats.copy()
+            stats['inflight'] = len(self._calls)
+        return stats
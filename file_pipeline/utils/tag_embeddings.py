@@ -0,0 +1,39 @@
+from threading import Lock
+from typing import Dict, List
+import numpy as np
+
+from utils.sentence_model_manager import SentenceModelManager
+from utils.logger import setup_logger
+
+logger = setup_logger("tag_embeddings")
+
+
+class TagEmbeddingCache:
+    """标签字典的归一化句向量缓存，按标签名缓存，新增标签时只补算新增部分"""
+
+    _instance = None
+    _instance_lock = Lock()
+
+    def __init__(self):
+        self._embeddings: Dict[str, np.ndarray] = {}
+        self._lock = Lock()
+
+    @classmethod
+    def get_instance(cls) -> "TagEmbeddingCache":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def get_matrix(self, tags: List[str]) -> np.ndarray:
+        """获取标签向量矩阵 shape: [标签数, 维度]，未缓存的标签批量编码"""
+        with self._lock:
+            missing = [tag for tag in tags if tag not in self._embeddings]
+            if missing:
+                model = SentenceModelManager.get_model()
+                embeddings = model.encode(missing, convert_to_tensor=False, normalize_embeddings=True)
+                for tag, embedding in zip(missing, embeddings):
+                    self._embeddings[tag] = embedding
+                logger.info(f"预计算标签向量: 新增{len(missing)}个, 共{len(self._embeddings)}个")
+            return np.stack([self._embeddings[tag] for tag in tags])
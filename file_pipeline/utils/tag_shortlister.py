@@ -0,0 +1,49 @@
+from typing import Dict, List
+import numpy as np
+
+from utils.sentence_model_manager import SentenceModelManager
+from utils.tag_embeddings import TagEmbeddingCache
+from utils.logger import setup_logger
+
+logger = setup_logger("tag_shortlister")
+
+
+class TagShortlister:
+    """用句向量从标签字典中预筛候选标签，缩小标签分析prompt
+
+    标签向量由TagEmbeddingCache预计算并缓存；
+    简历摘要按行一次性批量编码，标签得分取与各行相似度的最大值。
+    """
+
+    def __init__(self, top_k: int = 15):
+        self.top_k = top_k
+        self.tag_embeddings = TagEmbeddingCache.get_instance()
+
+    def shortlist(self, resume_text: str, available_tags: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """按与简历摘要的相似度为每个分类保留top_k个候选标签，保持字典原有顺序"""
+        lines = [line.strip() for line in resume_text.split("\n") if line.strip()]
+        if not lines:
+            return available_tags
+
+        try:
+            query_embeddings = SentenceModelManager.encode(lines, use_cache=False)
+
+            result = {}
+            for category, tags in available_tags.items():
+                if len(tags) <= self.top_k:
+                    result[category] = list(tags)
+                    continue
+
+                tag_matrix = self.tag_embeddings.get_matrix(tags)
+                scores = np.max(tag_matrix @ query_embeddings.T, axis=1)  # shape: [标签数]
+                top_indices = set(np.argsort(-scores)[:self.top_k].tolist())
+                result[category] = [tag for i, tag in enumerate(tags) if i in top_indices]
+
+            logger.info("标签预筛: " + ", ".join(
+                f"{category}{len(available_tags[category])}->{len(result[category])}个" for category in result
+            ))
+            return result
+
+        except Exception as e:
+            logger.warning(f"标签预筛失败，使用完整标签列表: {e}")
+            return available_tags
@@ -0,0 +1,18 @@
+from typing import Optional
+
+# tiktoken为可选依赖，未安装时使用按字符估算
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """统计文本token数：优先使用tiktoken，否则按中日韩字符约1 token/字、其余约4字符/token估算"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    cjk = sum(1 for ch in text if '⺀' <= ch <= '鿿' or '가' <= ch <= '힯')
+    return cjk + (len(text) - cjk + 3) // 4
@@ -0,0 +1,190 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock, local
+from typing import Optional, Dict, Any, List, Callable
+from utils.logger import setup_logger
+
+logger = setup_logger("usage_tracker")
+
+_context_state = local()
+
+
+def get_usage_context() -> Dict[str, Any]:
+    """获取当前线程的用量归属信息（entity_type、entity_id）"""
+    return dict(getattr(_context_state, 'context', {}))
+
+
+@contextmanager
+def usage_context(**fields):
+    """在with块内把LLM调用归属到指定实体，例如 usage_context(entity_type="position", entity_id=...)"""
+    previous = getattr(_context_state, 'context', {})
+    _context_state.context = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _context_state.context = previous
+
+
+def update_usage_context(**fields):
+    """更新当前with块的归属信息，例如数据库记录创建后补上ID"""
+    _context_state.context = {**getattr(_context_state, 'context', {}), **fields}
+
+
+def bind_usage_context(fn: Callable) -> Callable:
+    """把当前线程的归属信息绑定到fn，提交到线程池执行时仍计入同一实体"""
+    context = get_usage_context()
+
+    def wrapper(*args, **kwargs):
+        with usage_context(**context):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+class UsageTracker:
+    """LLM调用用量记录：每次调用的token数、缓存命中、耗时和费用写入本地SQLite表llm_usage"""
+
+    def __init__(self, db_path: Path, pricing: Optional[Dict[str, Dict[str, float]]] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.pricing = pricing or {}
+
+        self._lock = Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_usage (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                entity_type TEXT,
+                entity_id TEXT,
+                stage TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                cached_tokens INTEGER NOT NULL DEFAULT 0,
+                latency_ms REAL NOT NULL DEFAULT 0,
+                cache_hit INTEGER NOT NULL DEFAULT 0,
+                cost_usd REAL NOT NULL DEFAULT 0,
+                prompt_version TEXT
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(llm_usage)")}
+        if "prompt_version" not in columns:
+            self._conn.execute("ALTER TABLE llm_usage ADD COLUMN prompt_version TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_usage_created ON llm_usage(created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_usage_entity ON llm_usage(entity_type, entity_id)")
+        self._conn.commit()
+
+    def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int) -> float:
+        """按每百万token单价估算费用（美元），未配置单价的模型记为0"""
+        price = self.pricing.get(model)
+        if price is None:
+            return 0.0
+        uncached = max(prompt_tokens - cached_tokens, 0)
+        return (uncached * price.get("input", 0.0)
+                + cached_tokens * price.get("cached_input", price.get("input", 0.0))
+                + completion_tokens * price.get("output", 0.0)) / 1_000_000
+
+    def record(self, stage: str, model: str, usage=None, latency: float = 0.0, cache_hit: bool = False,
+               prompt_version: Optional[str] = None):
+        """记录一次调用，usage为OpenAI响应的usage对象（缓存命中时为None），归属实体取自usage_context
+
+        cached_tokens为服务端前缀缓存命中的输入token数（usage.prompt_tokens_details.cached_tokens）
+        """
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        context = get_usage_context()
+
+        try:
+            with self._lock:
+                self._conn.execute(
+                    """INSERT INTO llm_usage (created_at, entity_type, entity_id, stage, model, prompt_tokens,
+                           completion_tokens, cached_tokens, latency_ms, cache_hit, cost_usd, prompt_version)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (time.time(), context.get("entity_type"),
+                     str(context["entity_id"]) if context.get("entity_id") is not None else None,
+                     stage, model, prompt_tokens, completion_tokens, cached_tokens, latency * 1000,
+                     1 if cache_hit else 0,
+                     self.estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens),
+                     prompt_version)
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"写入LLM用量记录失败: {e}")
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            self._conn.row_factory = sqlite3.Row
+            try:
+                return self._conn.execute(sql, params).fetchall()
+            finally:
+                self._conn.row_factory = None
+
+    def stage_report(self, since: float = 0.0) -> List[Dict[str, Any]]:
+        """按阶段汇总：调用次数、缓存命中、token数、耗时、吞吐和费用"""
+        rows = self._query(
+            """SELECT stage,
+                      COUNT(*) AS calls,
+                      SUM(cache_hit) AS cache_hits,
+                      SUM(prompt_tokens) AS prompt_tokens,
+                      SUM(completion_tokens) AS completion_tokens,
+                      SUM(cached_tokens) AS cached_tokens,
+                      SUM(CASE WHEN cache_hit = 0 THEN latency_ms ELSE 0 END) AS latency_ms,
+                      SUM(cost_usd) AS cost_usd
+               FROM llm_usage WHERE created_at >= ?
+               GROUP BY stage ORDER BY cost_usd DESC""",
+            (since,)
+        )
+        report = []
+        for row in rows:
+            item = dict(row)
+            api_calls = item["calls"] - item["cache_hits"]
+            seconds = item["latency_ms"] / 1000
+            item["avg_latency"] = seconds / api_calls if api_calls else 0.0
+            item["completion_tokens_per_sec"] = item["completion_tokens"] / seconds if seconds else 0.0
+            report.append(item)
+        return report
+
+    def prompt_cache_report(self, since: float = 0.0) -> List[Dict[str, Any]]:
+        """按阶段和prompt版本汇总实际发出的请求：服务端前缀缓存命中的输入token占比、平均耗时和平均费用"""
+        rows = self._query(
+            """SELECT stage, COALESCE(prompt_version, '-') AS prompt_version,
+                      COUNT(*) AS requests,
+                      SUM(CASE WHEN cached_tokens > 0 THEN 1 ELSE 0 END) AS cached_requests,
+                      SUM(prompt_tokens) AS prompt_tokens,
+                      SUM(cached_tokens) AS cached_tokens,
+                      AVG(latency_ms) AS avg_latency_ms,
+                      AVG(cost_usd) AS avg_cost_usd
+               FROM llm_usage WHERE created_at >= ? AND cache_hit = 0
+               GROUP BY stage, prompt_version ORDER BY stage, prompt_version""",
+            (since,)
+        )
+        report = []
+        for row in rows:
+            item = dict(row)
+            item["cached_ratio"] = item["cached_tokens"] / item["prompt_tokens"] if item["prompt_tokens"] else 0.0
+            report.append(item)
+        return report
+
+    def entity_report(self, since: float = 0.0, entity_type: Optional[str] = None,
+                      limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按实体汇总并按费用降序排列，用于计算单份简历成本和找出消耗最多的文件/职位"""
+        sql = """SELECT entity_type, entity_id,
+                        COUNT(*) AS calls,
+                        SUM(prompt_tokens + completion_tokens) AS total_tokens,
+                        SUM(latency_ms) AS latency_ms,
+                        SUM(cost_usd) AS cost_usd
+                 FROM llm_usage WHERE created_at >= ? AND entity_id IS NOT NULL"""
+        params: List[Any] = [since]
+        if entity_type:
+            sql += " AND entity_type = ?"
+            params.append(entity_type)
+        sql += " GROUP BY entity_type, entity_id ORDER BY cost_usd DESC, total_tokens DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self._query(sql, params)]